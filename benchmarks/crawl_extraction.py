@@ -0,0 +1,112 @@
+"""
+Article extraction throughput (docs/sec) per extraction mode over a local
+corpus of saved HTML pages.
+
+    python benchmarks/crawl_extraction.py --corpus path/to/pages --workers 4
+
+Every *.html / *.htm file under --corpus is one document. Each mode is run
+serially in this process (extraction plus markdown conversion, as one
+worker does it) and, with --workers > 0, through the ExtractionPool.
+"readability" needs Node.js and readabilipy's JavaScript dependencies; use
+--modes readabilipy,fast to leave it out.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.crawler.extraction import EXTRACTION_MODES, ExtractionPool, extract_markdown
+
+
+def load_corpus(directory):
+    pages = []
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            if filename.lower().endswith((".html", ".htm")):
+                with open(os.path.join(root, filename), "rb") as f:
+                    pages.append((filename, f.read().decode("utf-8", errors="replace")))
+    return pages
+
+
+def run_serial(pages, mode, max_chars):
+    failures, output_chars = 0, 0
+    started = time.perf_counter()
+    for name, html in pages:
+        try:
+            _, markdown = extract_markdown(html, mode, max_chars)
+            output_chars += len(markdown)
+        except Exception as e:
+            failures += 1
+            print(f"  {mode}: {name} failed: {e!r}", file=sys.stderr)
+    return time.perf_counter() - started, failures, output_chars
+
+
+async def run_pool(pages, mode, workers, max_chars, timeout):
+    pool = ExtractionPool(workers=workers, timeout=timeout, max_chars=max_chars)
+    try:
+        # 先让工作进程启动并导入模块，不计入耗时
+        await asyncio.gather(
+            *(pool.extract("<p>warm up</p>", mode) for _ in range(workers))
+        )
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(pool.extract(html, mode) for _, html in pages), return_exceptions=True
+        )
+        failures = sum(isinstance(result, BaseException) for result in results)
+        return time.perf_counter() - started, failures
+    finally:
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--corpus", default=os.path.join(os.path.dirname(__file__), "html_corpus")
+    )
+    parser.add_argument("--modes", default=",".join(EXTRACTION_MODES))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-chars", type=int, default=2_000_000)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        sys.exit(
+            f"No .html files found under {args.corpus}; save some pages there or pass --corpus."
+        )
+    total_bytes = sum(len(html) for _, html in pages)
+    print(
+        f"{len(pages)} documents, {total_bytes / 1024 / 1024:.1f} MB, max {args.max_chars} chars per document\n"
+    )
+
+    pool_failed = False
+    print(
+        f"{'mode':<12} {'serial docs/s':>14} {'ms/doc':>8} {'out chars':>10} {'failed':>7} {'pool docs/s':>12}"
+    )
+    for mode in [mode.strip() for mode in args.modes.split(",") if mode.strip()]:
+        elapsed, failures, output_chars = run_serial(pages, mode, args.max_chars)
+        pool_rate = "-"
+        if args.workers > 0:
+            pool_elapsed, pool_failures = asyncio.run(
+                run_pool(pages, mode, args.workers, args.max_chars, args.timeout)
+            )
+            pool_rate = f"{len(pages) / pool_elapsed:.1f}" + (
+                "*" if pool_failures else ""
+            )
+            pool_failed = pool_failed or bool(pool_failures)
+        print(
+            f"{mode:<12} {len(pages) / elapsed:>14.1f} {elapsed / len(pages) * 1000:>8.1f} "
+            f"{output_chars // max(len(pages) - failures, 1):>10} {failures:>7} {pool_rate:>12}"
+        )
+    if pool_failed:
+        print("\n* some documents failed in the pool")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Load test: several API worker processes sharing one streamable-HTTP tool
+server vs. every worker owning its own stdio tool servers.
+
+    python benchmarks/mcp_http_load_test.py --workers 4 --calls 100 --concurrency 8
+
+Each worker is a separate process with its own MCPSessionPool, like a
+uvicorn worker. By default it calls a tool name the server does not know,
+so only the transport is measured. Use --tool/--arguments for a real tool.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+SERVER_SCRIPT = os.path.join(
+    ROOT, "src", "daily_tools_mcp", "daily_tools_mcp_server.py"
+)
+
+
+async def worker_calls(target, args, barrier):
+    from src.tools.mcp_pool import MCPSessionPool
+
+    arguments = json.loads(args.arguments)
+    pool = MCPSessionPool(target, size=args.pool_size, min_size=1)
+    await pool.astart()
+    # 所有 worker 的会话池就绪后再同时开始发请求
+    await asyncio.to_thread(barrier.wait)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await pool.acall_tool(args.tool, arguments)
+            latencies.append(time.perf_counter() - started)
+
+    try:
+        started = time.time()
+        await asyncio.gather(*(one() for _ in range(args.calls)))
+        finished = time.time()
+        stats = pool.stats()
+    finally:
+        await pool.aclose()
+    return latencies, stats["sessions"], started, finished
+
+
+def run_worker(target, args, barrier, results):
+    import logging
+
+    logging.disable(logging.WARNING)
+    import src.agents  # noqa: F401  src.tools 与 src.agents 互相导入，必须先导入 src.agents
+
+    if isinstance(target, list):
+        from mcp import StdioServerParameters
+
+        target = StdioServerParameters(command=target[0], args=target[1:])
+    results.put(asyncio.run(worker_calls(target, args, barrier)))
+
+
+def run_mode(label, target, args):
+    results = multiprocessing.Queue()
+    barrier = multiprocessing.Barrier(args.workers)
+    workers = [
+        multiprocessing.Process(
+            target=run_worker, args=(target, args, barrier, results)
+        )
+        for _ in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    outputs = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    elapsed = max(output[3] for output in outputs) - min(
+        output[2] for output in outputs
+    )
+    latencies = sorted(latency for output in outputs for latency in output[0])
+    sessions = sum(output[1] for output in outputs)
+    # http 模式下只有一个服务进程，stdio 模式下每个会话都是一个服务进程
+    servers = 1 if label == "http" else sessions
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(
+        f"{label:<8} {len(latencies) / elapsed:>10.1f} {p50:>10.1f} {p99:>10.1f} {servers:>10}"
+    )
+
+
+def wait_for_port(host, port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex((host, port)) == 0:
+                return
+        time.sleep(0.1)
+    raise TimeoutError(f"MCP server did not start on {host}:{port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Number of API worker processes"
+    )
+    parser.add_argument("--calls", type=int, default=100, help="Tool calls per worker")
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Concurrent calls per worker"
+    )
+    parser.add_argument(
+        "--pool-size", type=int, default=2, help="MCP sessions per worker"
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tool", default="benchmark_unknown_tool")
+    parser.add_argument(
+        "--arguments", default="{}", help="JSON object with the tool arguments"
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{args.workers} workers x {args.calls} calls of {args.tool}, "
+        f"concurrency {args.concurrency} per worker\n"
+    )
+    print(f"{'mode':<8} {'calls/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'servers':>10}")
+
+    run_mode("stdio", [sys.executable, SERVER_SCRIPT], args)
+
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            SERVER_SCRIPT,
+            "--transport",
+            "http",
+            "--port",
+            str(args.port),
+        ],
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port("127.0.0.1", args.port)
+        run_mode("http", f"http://127.0.0.1:{args.port}/mcp/", args)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark MCP tool calls: a new stdio session per call vs. the session pool
+vs. the in-process transport.
+
+    python benchmarks/mcp_pool_benchmark.py --calls 50 --concurrency 8
+
+By default it calls a tool name the server does not know. The server answers
+that without touching any external API, so only the transport and session
+overhead is measured. Use --tool/--arguments to benchmark a real tool.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+import src.agents  # noqa: F401  src.tools 与 src.agents 互相导入，必须先导入 src.agents
+from src.daily_tools_mcp.registry import get_registry
+from src.tools.mcp_pool import MCPSessionPool
+
+SERVER_SCRIPT = os.path.join(
+    os.path.dirname(__file__),
+    "..",
+    "src",
+    "daily_tools_mcp",
+    "daily_tools_mcp_server.py",
+)
+
+
+async def call_with_new_session(params, tool, arguments):
+    """What every tool call used to do: spawn the server, initialize, call, exit."""
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            return await session.call_tool(tool, arguments)
+
+
+async def run(label, call, calls, concurrency, serialize):
+    semaphore = asyncio.Semaphore(1 if serialize else concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(f"{label:<10} {calls / elapsed:>10.1f} {p50:>10.1f} {p99:>10.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--tool", default="benchmark_unknown_tool")
+    parser.add_argument(
+        "--arguments", default="{}", help="JSON object with the tool arguments"
+    )
+    args = parser.parse_args()
+    # 未知工具会让客户端对每次调用都打印一条警告
+    logging.getLogger("client").setLevel(logging.ERROR)
+    logging.getLogger("src.daily_tools_mcp.registry").setLevel(logging.CRITICAL)
+
+    params = StdioServerParameters(
+        command=sys.executable, args=[os.path.abspath(SERVER_SCRIPT)]
+    )
+    arguments = json.loads(args.arguments)
+
+    print(f"{args.calls} calls of {args.tool}, concurrency {args.concurrency}\n")
+    print(f"{'mode':<10} {'calls/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+
+    # 旧实现持有全局锁，所有调用串行执行
+    await run(
+        "before",
+        lambda: call_with_new_session(params, args.tool, arguments),
+        args.calls,
+        args.concurrency,
+        serialize=True,
+    )
+
+    pool = MCPSessionPool(params, size=args.pool_size, min_size=1)
+    await pool.astart()
+    try:
+        await run(
+            "after",
+            lambda: pool.acall_tool(args.tool, arguments),
+            args.calls,
+            args.concurrency,
+            serialize=False,
+        )
+    finally:
+        await pool.aclose()
+
+    # 与 MCPTools 的进程内传输相同
+    registry = get_registry()
+    await run(
+        "inprocess",
+        lambda: registry.call(args.tool, arguments),
+        args.calls,
+        args.concurrency,
+        serialize=False,
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,128 @@
+"""
+Tokens per daily-tool result in display vs. compact output mode.
+
+    python benchmarks/tool_output_tokens.py
+
+Uses recorded-shape sample responses from AMap and kuaidi100, so no API
+keys or network are needed. Tokens are counted with the same counter the
+token budget uses (tiktoken when available, otherwise the approximation).
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import src.agents  # noqa: F401  src.tools 与 src.agents 互相导入，必须先导入 src.agents
+from src.agents.token_budget import count_text_tokens
+from src.daily_tools_mcp.tools.base_tool import ToolOutput, render_output
+from src.daily_tools_mcp.tools.kuaidi100 import compact_result
+from src.daily_tools_mcp.tools.weather_tool import WeatherTool
+
+LIVE = {
+    "province": "北京",
+    "city": "北京市",
+    "adcode": "110000",
+    "weather": "晴",
+    "temperature": "21",
+    "winddirection": "西北",
+    "windpower": "≤3",
+    "humidity": "34",
+    "reporttime": "2024-05-01 14:02:11",
+}
+
+FORECAST = {
+    "city": "北京市",
+    "adcode": "110000",
+    "province": "北京",
+    "reporttime": "2024-05-01 11:02:45",
+    "casts": [
+        {
+            "date": f"2024-05-0{day}",
+            "week": str(day + 2),
+            "dayweather": "多云",
+            "nightweather": "晴",
+            "daytemp": "26",
+            "nighttemp": "13",
+            "daywind": "南",
+            "nightwind": "南",
+            "daypower": "1-3",
+            "nightpower": "1-3",
+        }
+        for day in range(1, 5)
+    ],
+}
+
+CITIES = [
+    "深圳市,宝安区",
+    "广州市,白云区",
+    "长沙市,岳麓区",
+    "武汉市,东西湖区",
+    "郑州市,管城回族区",
+    "北京市,朝阳区",
+]
+LOGISTICS = {
+    "message": "ok",
+    "nu": "SF1234567890123",
+    "ischeck": "0",
+    "com": "shunfeng",
+    "status": "200",
+    "state": "0",
+    "condition": "00",
+    "routeInfo": {
+        "from": {"number": "CN440300000000", "name": "中国,广东,深圳市"},
+        "cur": {"number": "CN110105000000", "name": "中国,北京,北京市,朝阳区"},
+        "to": None,
+    },
+    "data": [
+        {
+            "time": f"2024-04-{30 - i:02d} 0{i % 10}:15:00",
+            "ftime": f"2024-04-{30 - i:02d} 0{i % 10}:15:00",
+            "context": f"快件已到达【{CITIES[i % len(CITIES)].split(',')[-1]}营业点】，准备发往下一站",
+            "location": "",
+            "areaCode": "CN440306000000",
+            "areaName": f"广东,{CITIES[i % len(CITIES)]}",
+            "status": "在途",
+            "areaCenter": "113.88,22.55",
+            "areaPinYin": "bao an qu",
+            "statusCode": "0",
+        }
+        for i in range(12)
+    ],
+}
+
+
+def main():
+    weather = WeatherTool()
+    samples = [
+        (
+            "weather live",
+            ToolOutput(
+                weather._compact_live_weather(LIVE), weather._format_live_weather(LIVE)
+            ),
+        ),
+        (
+            "weather forecast",
+            ToolOutput(
+                weather._compact_forecast_weather(FORECAST),
+                weather._format_forecast_weather(FORECAST),
+            ),
+        ),
+        (
+            "logistics",
+            ToolOutput(
+                compact_result(LOGISTICS), json.dumps(LOGISTICS, ensure_ascii=False)
+            ),
+        ),
+    ]
+
+    print(f"{'tool result':<18} {'display':>8} {'compact':>8} {'saved':>8}")
+    for label, output in samples:
+        display = count_text_tokens(render_output(output, "display"))
+        compact = count_text_tokens(render_output(output, "compact"))
+        print(f"{label:<18} {display:>8} {compact:>8} {1 - compact / display:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ from typing import List
 
 from src.prompts import apply_prompt_template
 from .llm import get_llm_by_type
+from .token_budget import prepare_messages
 from src.config.agents import AGENT_LLM_MAP
 import platform
 
@@ -13,6 +14,7 @@ import platform
 from src.tools import (
     tavily_tool,
     crawl_tool,
+    crawl_many_tool,
     python_repl_tool,
     bash_tool,
     browser_tool,
@@ -23,21 +25,21 @@ from src.tools.langchain_wrappers import get_langchain_tools
 
 research_agent = create_react_agent(
     get_llm_by_type(AGENT_LLM_MAP["researcher"]),
-    tools=[tavily_tool, crawl_tool],
-    prompt=lambda state: apply_prompt_template("researcher", state),
+    tools=[tavily_tool, crawl_tool, crawl_many_tool],
+    prompt=lambda state: prepare_messages("researcher", apply_prompt_template("researcher", state)),
 )
 
 
 coder_agent = create_react_agent(
     get_llm_by_type(AGENT_LLM_MAP["coder"]),
     tools=[python_repl_tool, bash_tool],
-    prompt=lambda state: apply_prompt_template("coder", state),
+    prompt=lambda state: prepare_messages("coder", apply_prompt_template("coder", state)),
 )
 
 browser_agent = create_react_agent(
     get_llm_by_type(AGENT_LLM_MAP["browser"]),
     tools=[browser_tool],
-    prompt=lambda state: apply_prompt_template("browser", state),
+    prompt=lambda state: prepare_messages("browser", apply_prompt_template("browser", state)),
 )
 
 
@@ -45,16 +47,24 @@ browser_agent = create_react_agent(
 import logging
 logger = logging.getLogger(__name__)
 
+# (工具目录哈希, 已编译的 Agent)：工具目录不变时复用，避免每次调用都重新编译图
+_life_tools_agent = None
+
+
 def get_life_tools_agent():
-    """创建并返回 Life Tools Agent (使用MCP工具)"""
-    from src.tools.langchain_wrappers import get_langchain_tools
+    """创建并返回 Life Tools Agent (使用MCP工具)，按工具目录哈希缓存"""
+    global _life_tools_agent
+    from src.tools.langchain_wrappers import get_langchain_tools, get_tool_catalog_hash
 
-    # 每次都重新获取工具
     mcp_tools: List[Tool] = get_langchain_tools()
+    catalog_hash = get_tool_catalog_hash()
+    if mcp_tools and _life_tools_agent is not None and _life_tools_agent[0] == catalog_hash:
+        return _life_tools_agent[1]
 
     logger.info(f"Creating life_tools_agent with {len(mcp_tools)} tools: {[tool.name for tool in mcp_tools]}")
 
-    if not mcp_tools:
+    has_tools = bool(mcp_tools)
+    if not has_tools:
         logger.warning("警告: life_tools_agent 未能从 MCP 加载任何工具。")
         # 可以添加一个空工具作为fallback
         from langchain_core.tools import tool
@@ -68,7 +78,7 @@ def get_life_tools_agent():
 
     # 确保prompt函数正确
     def life_tools_prompt(state):
-        return apply_prompt_template("life_tools", state)
+        return prepare_messages("life_tools", apply_prompt_template("life_tools", state))
 
     agent = create_react_agent(
         get_llm_by_type(AGENT_LLM_MAP.get("life_tools", "basic")),
@@ -77,6 +87,9 @@ def get_life_tools_agent():
     )
 
     logger.info(f"Life tools agent created successfully with tools: {[tool.name for tool in mcp_tools]}")
+    # 没有加载到工具时不缓存占位 Agent，下次调用重新尝试
+    if has_tools and catalog_hash is not None:
+        _life_tools_agent = (catalog_hash, agent)
     return agent
 
 from langchain_openai import ChatOpenAI
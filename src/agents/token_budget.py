@@ -0,0 +1,296 @@
+import logging
+import math
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.callbacks import dispatch_custom_event
+from langchain_core.messages import BaseMessage
+
+from src.config import (
+    BASIC_MODEL,
+    REASONING_MODEL,
+    TEAM_MEMBERS,
+    TOKEN_BUDGET_OUTPUT_RESERVE,
+    VL_MODEL,
+)
+from src.config.agents import (
+    AGENT_LLM_MAP,
+    AGENT_TRIM_POLICIES,
+    DEFAULT_CONTEXT_LIMIT,
+    MODEL_CONTEXT_LIMITS,
+    LLMType,
+)
+from src.metrics import metrics
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken ships with langchain-openai
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+LLM_TYPE_MODELS: Dict[LLMType, str] = {
+    "basic": BASIC_MODEL,
+    "reasoning": REASONING_MODEL,
+    "vision": VL_MODEL,
+}
+
+# 每条消息的固定开销（角色、分隔符等），与 OpenAI 的计算方式一致
+MESSAGE_OVERHEAD_TOKENS = 4
+# 一张高清图片大致消耗的 token 数
+IMAGE_TOKENS = 765
+# 裁剪后每条消息至少保留的 token 数
+MIN_KEPT_TOKENS = 200
+
+_CJK = re.compile(r"[　-〿㐀-䶿一-鿿＀-￯]")
+
+_encoders: Dict[str, Any] = {}
+_encoders_lock = threading.Lock()
+
+
+def _get_encoder(model: str):
+    """Return a cached tiktoken encoder for `model`, or None to use the approximation."""
+    if tiktoken is None:
+        return None
+    with _encoders_lock:
+        if model not in _encoders:
+            try:
+                encoder = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoder = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                # 没有网络时无法下载编码表
+                logger.warning(
+                    f"tiktoken unavailable for {model}, using approximation: {e}"
+                )
+                encoder = None
+            _encoders[model] = encoder
+        return _encoders[model]
+
+
+def approximate_tokens(text: str) -> int:
+    """Cheap estimate: one token per CJK character, four characters per token otherwise."""
+    cjk = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def count_text_tokens(text: str, model: str = BASIC_MODEL) -> int:
+    if not text:
+        return 0
+    encoder = _get_encoder(model)
+    if encoder is None:
+        return approximate_tokens(text)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def _content(message) -> Any:
+    return message.get("content", "") if isinstance(message, dict) else message.content
+
+
+def _role(message) -> str:
+    return message.get("role", "") if isinstance(message, dict) else message.type
+
+
+def _name(message) -> Optional[str]:
+    return (
+        message.get("name")
+        if isinstance(message, dict)
+        else getattr(message, "name", None)
+    )
+
+
+def _with_content(message, content: str):
+    """Copy of `message` with new content; messages shared with the graph state are never modified."""
+    if isinstance(message, BaseMessage):
+        return message.model_copy(update={"content": content})
+    return {**message, "content": content}
+
+
+def count_message_tokens(message, model: str = BASIC_MODEL) -> int:
+    content = _content(message)
+    tokens = MESSAGE_OVERHEAD_TOKENS
+    if isinstance(content, str):
+        return tokens + count_text_tokens(content, model)
+    for item in content:
+        if isinstance(item, str):
+            tokens += count_text_tokens(item, model)
+        elif item.get("type") == "text":
+            tokens += count_text_tokens(item.get("text", ""), model)
+        elif item.get("type") == "image_url":
+            tokens += IMAGE_TOKENS
+    return tokens
+
+
+def count_messages_tokens(messages: list, model: str = BASIC_MODEL) -> int:
+    return sum(count_message_tokens(message, model) for message in messages)
+
+
+def context_limit(model: str) -> int:
+    """Context window of `model`, matched by the longest known prefix."""
+    matches = [
+        prefix for prefix in MODEL_CONTEXT_LIMITS if model.lower().startswith(prefix)
+    ]
+    if not matches:
+        return DEFAULT_CONTEXT_LIMIT
+    return MODEL_CONTEXT_LIMITS[max(matches, key=len)]
+
+
+def truncate_text(text: str, max_tokens: int, model: str = BASIC_MODEL) -> str:
+    """Keep the beginning of `text` so that it fits in roughly `max_tokens`."""
+    tokens = count_text_tokens(text, model)
+    if tokens <= max_tokens:
+        return text
+    marker = f"\n\n[... truncated {tokens - max_tokens} tokens to fit the context window ...]"
+    max_tokens = max(0, max_tokens - count_text_tokens(marker, model))
+    keep = int(len(text) * max_tokens / tokens)
+    while keep > 0 and count_text_tokens(text[:keep], model) > max_tokens:
+        keep = int(keep * 0.9)
+    return text[:keep] + marker
+
+
+def _shrink(messages: list, excess: int, model: str, candidates: List[int]) -> list:
+    """Truncate the largest candidate messages first until `excess` tokens are saved."""
+    messages = list(messages)
+    sizes = {
+        index: count_message_tokens(messages[index], model)
+        for index in candidates
+        if isinstance(_content(messages[index]), str)
+    }
+    for index in sorted(sizes, key=sizes.get, reverse=True):
+        if excess <= 0:
+            break
+        target = max(MIN_KEPT_TOKENS, sizes[index] - excess)
+        if target >= sizes[index]:
+            continue
+        messages[index] = _with_content(
+            messages[index],
+            truncate_text(
+                _content(messages[index]), target - MESSAGE_OVERHEAD_TOKENS, model
+            ),
+        )
+        excess -= sizes[index] - count_message_tokens(messages[index], model)
+    return messages
+
+
+def truncate_tool_outputs(messages: list, excess: int, model: str) -> list:
+    candidates = [
+        index for index, message in enumerate(messages) if _role(message) == "tool"
+    ]
+    return _shrink(messages, excess, model, candidates)
+
+
+def truncate_worker_outputs(messages: list, excess: int, model: str) -> list:
+    candidates = [
+        index
+        for index, message in enumerate(messages)
+        if _name(message) in TEAM_MEMBERS
+    ]
+    return _shrink(messages, excess, model, candidates)
+
+
+def drop_oldest_worker_outputs(messages: list, excess: int, model: str) -> list:
+    """Replace worker outputs with a placeholder, oldest first, always keeping the latest one."""
+    messages = list(messages)
+    candidates = [
+        index
+        for index, message in enumerate(messages)
+        if _name(message) in TEAM_MEMBERS
+    ]
+    for index in candidates[:-1]:
+        if excess <= 0:
+            break
+        before = count_message_tokens(messages[index], model)
+        messages[index] = _with_content(
+            messages[index],
+            f"[Response from {_name(messages[index])} omitted to fit the context window]",
+        )
+        excess -= before - count_message_tokens(messages[index], model)
+    return messages
+
+
+def truncate_longest(messages: list, excess: int, model: str) -> list:
+    """Last resort: truncate whatever is largest, except the system prompt."""
+    candidates = [
+        index for index, message in enumerate(messages) if _role(message) != "system"
+    ]
+    return _shrink(messages, excess, model, candidates)
+
+
+TRIM_POLICIES: Dict[str, Callable[[list, int, str], list]] = {
+    "truncate_tool_outputs": truncate_tool_outputs,
+    "truncate_worker_outputs": truncate_worker_outputs,
+    "drop_oldest_worker_outputs": drop_oldest_worker_outputs,
+    "truncate_longest": truncate_longest,
+}
+
+
+@dataclass
+class TokenUsage:
+    agent_name: str
+    model: str
+    prompt_tokens: int
+    original_tokens: int
+    budget: int
+
+    @property
+    def trimmed(self) -> bool:
+        return self.prompt_tokens < self.original_tokens
+
+
+def fit_messages(
+    agent_name: str, messages: list, llm_type: Optional[LLMType] = None
+) -> tuple[list, TokenUsage]:
+    """
+    Count the prompt for `agent_name` and trim it to the model's budget.
+
+    The budget is the model's context window minus the tokens reserved for
+    the response. The agent's policies from AGENT_TRIM_POLICIES are applied
+    in order until the prompt fits.
+    """
+    model = LLM_TYPE_MODELS[llm_type or AGENT_LLM_MAP.get(agent_name, "basic")]
+    budget = context_limit(model) - TOKEN_BUDGET_OUTPUT_RESERVE
+    original = tokens = count_messages_tokens(messages, model)
+
+    for policy in AGENT_TRIM_POLICIES.get(agent_name, ["truncate_longest"]):
+        if tokens <= budget:
+            break
+        messages = TRIM_POLICIES[policy](messages, tokens - budget, model)
+        tokens = count_messages_tokens(messages, model)
+
+    usage = TokenUsage(agent_name, model, tokens, original, budget)
+    if usage.trimmed:
+        metrics.incr("token_budget_trimmed_calls")
+        logger.warning(
+            f"Trimmed {agent_name} prompt from {original} to {tokens} tokens (budget {budget})"
+        )
+    if tokens > budget:
+        logger.error(
+            f"{agent_name} prompt still exceeds its budget: {tokens} > {budget}"
+        )
+    return messages, usage
+
+
+def prepare_messages(
+    agent_name: str, messages: list, llm_type: Optional[LLMType] = None
+) -> list:
+    """Pre-flight step before every LLM call: trim to budget and report the token count."""
+    messages, usage = fit_messages(agent_name, messages, llm_type)
+    metrics.incr("prompt_tokens", usage.prompt_tokens)
+    try:
+        dispatch_custom_event(
+            "token_usage",
+            {
+                "agent_name": usage.agent_name,
+                "model": usage.model,
+                "prompt_tokens": usage.prompt_tokens,
+                "original_tokens": usage.original_tokens,
+                "budget": usage.budget,
+                "trimmed": usage.trimmed,
+            },
+        )
+    except RuntimeError:
+        # 后台线程（提前派发、投机规划）中没有父级 run，无法发送事件
+        pass
+    return messages
@@ -23,6 +23,8 @@ from src.service.workflow_service import run_agent_workflow
 from src.database import get_db
 from src.models.chat import ChatSession, ChatMessageRecord  # 保持原有导入
 from src.service.chat_service import ChatService  # 修正类名
+from src.metrics import metrics
+from src.daily_tools_mcp.tools.kuaidi100 import get_kuaidi100_client
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -337,6 +339,19 @@ async def chat_stream_endpoint(req: Request, db: Session = Depends(get_db)):
             raise e
         raise HTTPException(status_code=500, detail="An internal server error occurred.")
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """返回进程内的运行指标（计数器与比率）"""
+    return metrics.snapshot()
+
+@app.post("/api/kuaidi100/callback")
+async def kuaidi100_callback(req: Request):
+    """接收快递100的订阅推送（表单字段 param、sign），保存最新轨迹供之后的查询直接使用"""
+    form_data = await req.form()
+    if await get_kuaidi100_client().handle_callback(form_data.get("param", ""), form_data.get("sign", "")):
+        return {"result": True, "returnCode": "200", "message": "成功"}
+    return {"result": False, "returnCode": "500", "message": "推送内容无效"}
+
 # 修改现有的 sessions 相关 API
 @app.get("/api/chat/sessions")
 async def get_chat_sessions(db: Session = Depends(get_db)):
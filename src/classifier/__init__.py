@@ -0,0 +1,14 @@
+from .base import Decision, PreClassifier
+from .rules import RuleClassifier
+from .ngram import NgramClassifier
+from .fast_path import FastPathClassifier, get_fast_path, normalize_query
+
+__all__ = [
+    "Decision",
+    "PreClassifier",
+    "RuleClassifier",
+    "NgramClassifier",
+    "FastPathClassifier",
+    "get_fast_path",
+    "normalize_query",
+]
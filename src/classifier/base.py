@@ -0,0 +1,25 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+Label = Literal["task", "chat"]
+
+
+@dataclass(frozen=True)
+class Decision:
+    """A coordinator routing decision made without calling the LLM."""
+
+    label: Label
+    confidence: float
+    source: str
+    # Templated reply for chat decisions that need no LLM answer
+    reply: Optional[str] = None
+
+
+class PreClassifier(ABC):
+    """Base class for classifiers that run before the coordinator LLM."""
+
+    @abstractmethod
+    def classify(self, query: str) -> Optional[Decision]:
+        """Return a decision for `query`, or None when it has no opinion."""
+        pass
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional
+
+from src.config import (
+    COORDINATOR_DECISION_LOG,
+    COORDINATOR_FAST_PATH_THRESHOLD,
+    COORDINATOR_NGRAM_MODEL,
+)
+from .base import Decision, Label, PreClassifier
+from .ngram import NgramClassifier
+from .rules import RuleClassifier
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a user query for classification and caching."""
+    query = unicodedata.normalize("NFKC", query).lower()
+    query = _PUNCTUATION.sub(" ", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+class FastPathClassifier:
+    """
+    Chains pre-classifiers in front of the coordinator LLM.
+
+    The first confident decision wins and is cached for the normalized query.
+    Decisions made by the LLM are recorded too, both in the cache and, when
+    configured, in a JSONL log used to train the n-gram model offline.
+
+    The same words can mean different things later in a conversation, so
+    follow-up turns pass the previous message as `context`: it becomes part
+    of the cache key, and such decisions are kept out of the training log.
+    """
+
+    def __init__(
+        self,
+        classifiers: List[PreClassifier],
+        threshold: float = 0.9,
+        cache_size: int = 1024,
+        decision_log: Optional[str] = None,
+    ):
+        self.classifiers = classifiers
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self.decision_log = decision_log
+        self._cache: "OrderedDict[str, Decision]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cache_key(key: str, context: Optional[str]) -> str:
+        if not context:
+            return key
+        digest = hashlib.sha1(normalize_query(context).encode("utf-8")).hexdigest()[:16]
+        return f"{digest}:{key}"
+
+    def classify(self, query: str, context: Optional[str] = None) -> Optional[Decision]:
+        """Return a confident decision for `query`, or None to ask the LLM."""
+        key = normalize_query(query)
+        if not key:
+            return None
+        cache_key = self._cache_key(key, context)
+
+        with self._lock:
+            decision = self._cache.get(cache_key)
+            if decision is not None:
+                self._cache.move_to_end(cache_key)
+                return decision
+
+        for classifier in self.classifiers:
+            decision = classifier.classify(key)
+            if decision is not None and decision.confidence >= self.threshold:
+                self._remember(cache_key, decision)
+                return decision
+        return None
+
+    def looks_like_task(self, query: str, min_length: int = 8) -> bool:
+        """
+        Cheap guess used to decide whether speculative work is worthwhile.
+
+        Unlike `classify` this ignores the confidence threshold. Queries no
+        classifier has an opinion on count as tasks once they are long enough.
+        """
+        key = normalize_query(query)
+        for classifier in self.classifiers:
+            decision = classifier.classify(key)
+            if decision is not None:
+                return decision.label == "task"
+        return len(key) >= min_length
+
+    def record(self, query: str, label: Label, context: Optional[str] = None) -> None:
+        """Record a decision made by the coordinator LLM."""
+        key = normalize_query(query)
+        if not key:
+            return
+        self._remember(
+            self._cache_key(key, context),
+            Decision(label=label, confidence=1.0, source="llm"),
+        )
+        # 追问的标签依赖上下文，不适合用来训练只看单句的 n-gram 模型
+        if self.decision_log and not context:
+            try:
+                with open(self.decision_log, "a", encoding="utf-8") as f:
+                    record = {
+                        "query": query,
+                        "label": label,
+                        "source": "llm",
+                        "time": time.time(),
+                    }
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except OSError as e:
+                logger.warning(f"Failed to log coordinator decision: {e}")
+
+    def _remember(self, key: str, decision: Decision) -> None:
+        with self._lock:
+            self._cache[key] = decision
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+_fast_path: Optional[FastPathClassifier] = None
+_fast_path_lock = threading.Lock()
+
+
+def get_fast_path() -> FastPathClassifier:
+    """Return the process-wide fast-path classifier built from configuration."""
+    global _fast_path
+    if _fast_path is None:
+        with _fast_path_lock:
+            if _fast_path is None:
+                classifiers: List[PreClassifier] = [RuleClassifier()]
+                if COORDINATOR_NGRAM_MODEL and os.path.exists(COORDINATOR_NGRAM_MODEL):
+                    classifiers.append(NgramClassifier.load(COORDINATOR_NGRAM_MODEL))
+                    logger.info(
+                        f"Loaded coordinator n-gram model from {COORDINATOR_NGRAM_MODEL}"
+                    )
+                _fast_path = FastPathClassifier(
+                    classifiers,
+                    threshold=COORDINATOR_FAST_PATH_THRESHOLD,
+                    decision_log=COORDINATOR_DECISION_LOG or None,
+                )
+    return _fast_path
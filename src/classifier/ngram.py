@@ -0,0 +1,135 @@
+import json
+import logging
+import math
+import sys
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+
+from .base import Decision, PreClassifier
+
+logger = logging.getLogger(__name__)
+
+
+class NgramClassifier(PreClassifier):
+    """
+    Multinomial naive Bayes over character n-grams.
+
+    It is trained offline from logged coordinator decisions (see `train_from_log`)
+    and loaded from a small JSON file at startup.
+    """
+
+    def __init__(self, n_min: int = 1, n_max: int = 3, alpha: float = 1.0):
+        self.n_min = n_min
+        self.n_max = n_max
+        self.alpha = alpha
+        self.doc_counts: Dict[str, int] = {}
+        self.gram_counts: Dict[str, Counter] = {}
+        self.gram_totals: Dict[str, int] = {}
+        self.vocab_size = 0
+
+    def ngrams(self, text: str) -> Counter:
+        padded = f" {text} "
+        grams = Counter()
+        for n in range(self.n_min, self.n_max + 1):
+            for i in range(len(padded) - n + 1):
+                grams[padded[i : i + n]] += 1
+        return grams
+
+    def train(self, samples: Iterable[Tuple[str, str]]) -> "NgramClassifier":
+        """Fit the model on `(normalized query, label)` pairs."""
+        vocab = set()
+        for query, label in samples:
+            grams = self.ngrams(query)
+            self.doc_counts[label] = self.doc_counts.get(label, 0) + 1
+            self.gram_counts.setdefault(label, Counter()).update(grams)
+            vocab.update(grams)
+        self.gram_totals = {
+            label: sum(c.values()) for label, c in self.gram_counts.items()
+        }
+        self.vocab_size = len(vocab)
+        return self
+
+    def predict_proba(self, query: str) -> Dict[str, float]:
+        if not self.doc_counts:
+            return {}
+        total_docs = sum(self.doc_counts.values())
+        grams = self.ngrams(query)
+        scores = {}
+        for label, docs in self.doc_counts.items():
+            counts = self.gram_counts[label]
+            denominator = self.gram_totals[label] + self.alpha * self.vocab_size
+            score = math.log(docs / total_docs)
+            for gram, count in grams.items():
+                score += count * math.log(
+                    (counts.get(gram, 0) + self.alpha) / denominator
+                )
+            scores[label] = score
+
+        best = max(scores.values())
+        exp_scores = {label: math.exp(score - best) for label, score in scores.items()}
+        norm = sum(exp_scores.values())
+        return {label: value / norm for label, value in exp_scores.items()}
+
+    def classify(self, query: str) -> Optional[Decision]:
+        proba = self.predict_proba(query)
+        if not proba:
+            return None
+        label, confidence = max(proba.items(), key=lambda item: item[1])
+        return Decision(label=label, confidence=confidence, source="ngram")
+
+    def save(self, path: str, min_count: int = 2) -> None:
+        """Write the model to `path`, dropping n-grams seen fewer than `min_count` times."""
+        model = {
+            "n_min": self.n_min,
+            "n_max": self.n_max,
+            "alpha": self.alpha,
+            "vocab_size": self.vocab_size,
+            "doc_counts": self.doc_counts,
+            "gram_totals": self.gram_totals,
+            "gram_counts": {
+                label: {gram: c for gram, c in counts.items() if c >= min_count}
+                for label, counts in self.gram_counts.items()
+            },
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(model, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "NgramClassifier":
+        with open(path, encoding="utf-8") as f:
+            model = json.load(f)
+        classifier = cls(model["n_min"], model["n_max"], model["alpha"])
+        classifier.vocab_size = model["vocab_size"]
+        classifier.doc_counts = model["doc_counts"]
+        classifier.gram_totals = model["gram_totals"]
+        classifier.gram_counts = {
+            label: Counter(counts) for label, counts in model["gram_counts"].items()
+        }
+        return classifier
+
+
+def train_from_log(log_path: str, model_path: str) -> NgramClassifier:
+    """Train a model from a coordinator decision log written by `FastPathClassifier`."""
+    from .fast_path import normalize_query
+
+    samples = []
+    with open(log_path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("source") == "llm":
+                samples.append((normalize_query(record["query"]), record["label"]))
+
+    classifier = NgramClassifier().train(samples)
+    classifier.save(model_path)
+    logger.info(
+        f"Trained n-gram classifier on {len(samples)} decisions: {classifier.doc_counts}"
+    )
+    return classifier
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m src.classifier.ngram <decision_log.jsonl> <model.json>")
+        sys.exit(1)
+    logging.basicConfig(level=logging.INFO)
+    train_from_log(sys.argv[1], sys.argv[2])
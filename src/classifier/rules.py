@@ -0,0 +1,98 @@
+import re
+from typing import Optional
+
+from .base import Decision, PreClassifier
+
+_CJK = re.compile(r"[一-鿿]")
+
+# (pattern, template key) for messages that are nothing but small talk
+_CHAT_RULES = [
+    (
+        re.compile(
+            r"^(hi|hello|hey|hiya|good (morning|afternoon|evening)|"
+            r"你好|您好|嗨|哈喽|早上好|上午好|中午好|下午好|晚上好|在吗)"
+            r"( there| buptmanus)?$"
+        ),
+        "greeting",
+    ),
+    (
+        re.compile(
+            r"^(thanks|thank you|thx|thank you very much|谢谢|谢谢你|多谢|感谢|辛苦了)$"
+        ),
+        "thanks",
+    ),
+    (re.compile(r"^(bye|goodbye|see you|再见|拜拜|回见)$"), "bye"),
+    (
+        re.compile(
+            r"^(who are you|what are you|你是谁|你叫什么|介绍一下你自己|你是什么)$"
+        ),
+        "identity",
+    ),
+]
+
+REPLY_TEMPLATES = {
+    "greeting": (
+        "你好！我是 BuptManus，有什么可以帮你的吗？",
+        "Hello! I'm BuptManus. How can I help you today?",
+    ),
+    "thanks": (
+        "不客气！还有其他需要帮忙的吗？",
+        "You're welcome! Is there anything else I can help with?",
+    ),
+    "bye": (
+        "再见，祝你一切顺利！",
+        "Goodbye, have a great day!",
+    ),
+    "identity": (
+        "我是 BuptManus，由 Bupt 团队开发的 AI 助手，可以帮你检索资料、编写代码、查询天气和物流等。",
+        "I'm BuptManus, an AI assistant developed by the Bupt team. I can research topics, write code, check the weather, track packages and more.",
+    ),
+}
+
+_TASK_PATTERN = re.compile(
+    r"(帮我|请帮|查询|查一下|搜索|搜一下|调研|研究|分析|计算|写一个|写一篇|编写|生成|总结|对比|比较|"
+    r"打开|下载|天气|快递|物流|单号|股票|股价|报告|画一个|绘制)"
+    r"|\b(search|research|analy[sz]e|calculate|compute|write|generate|summari[sz]e|compare|"
+    r"plot|draw|weather|track|tracking|download|open|report)\b"
+)
+
+# 明确的请求句式：只有这类句子里的任务关键词才足以直接交给 planner
+_REQUEST_PATTERN = re.compile(
+    r"^(请|麻烦你?|能不能|可以)?(帮我|帮忙|替我|给我)"
+    r"|^(please|can you|could you|would you|help me)\b"
+)
+# 道谢、夸奖和关于助手本身的问题：即使带有任务关键词也多半是闲聊，交给 LLM 判断
+_CHAT_MARKERS = re.compile(
+    r"(谢谢|多谢|感谢|辛苦|真好|真棒|不错|厉害|哈哈|你是|你们是)"
+    r"|\b(thanks|thank you|thx|great|nice|awesome|cool|lol|are you|you are)\b"
+)
+
+
+class RuleClassifier(PreClassifier):
+    """
+    Hand-written rules for obvious small talk and obvious tasks.
+
+    A task keyword alone scores below the fast-path threshold, so the
+    n-gram model or the LLM makes the call; only an explicit request
+    ("帮我…", "please …") is confident enough to skip the LLM.
+    """
+
+    def __init__(self, min_task_length: int = 6):
+        self.min_task_length = min_task_length
+
+    def classify(self, query: str) -> Optional[Decision]:
+        for pattern, template in _CHAT_RULES:
+            if pattern.match(query):
+                chinese, english = REPLY_TEMPLATES[template]
+                reply = chinese if _CJK.search(query) else english
+                return Decision(
+                    label="chat", confidence=1.0, source="rules", reply=reply
+                )
+
+        if _CHAT_MARKERS.search(query):
+            return None
+        if len(query) >= self.min_task_length and _TASK_PATTERN.search(query):
+            confidence = 0.95 if _REQUEST_PATTERN.search(query) else 0.6
+            return Decision(label="task", confidence=confidence, source="rules")
+
+        return None
@@ -15,8 +15,66 @@ from .env import (
     CHROME_INSTANCE_PATH,
     KUAIDI100_API_KEY,
     CUSTOMER_ID,
+    KUAIDI100_BASE_URL,
+    KUAIDI100_CALLBACK_URL,
+    KUAIDI100_CALLBACK_SALT,
+    KUAIDI100_STORE,
+    KUAIDI100_RATE_LIMIT,
+    KUAIDI100_MAX_CONCURRENCY,
 DATABASE_URL,
-AMAP_API_KEY
+AMAP_API_KEY,
+    AMAP_BASE_URL,
+    TOOL_HTTP_TIMEOUT,
+    TOOL_HTTP_MAX_RETRIES,
+    TOOL_CACHE_MAX_ENTRIES,
+    TOOL_CACHE_DB,
+    WEATHER_CACHE_TTL,
+    ADCODE_CACHE,
+    PLANNER_EARLY_DISPATCH,
+    COORDINATOR_FAST_PATH,
+    COORDINATOR_FAST_PATH_THRESHOLD,
+    COORDINATOR_NGRAM_MODEL,
+    COORDINATOR_DECISION_LOG,
+    SPECULATIVE_PLANNING,
+    SPECULATIVE_PLANNING_WORKERS,
+    TOKEN_BUDGET_OUTPUT_RESERVE,
+    PROMPT_HOT_RELOAD,
+    PROMPT_CACHE_CONTROL,
+    WORKER_MAX_RETRIES,
+    WORKER_RETRY_BASE_DELAY,
+    WORKER_RETRY_MAX_DELAY,
+    MCP_POOL_SIZE,
+    MCP_POOL_MIN_SIZE,
+    MCP_POOL_MAX_IN_FLIGHT,
+    MCP_POOL_IDLE_TIMEOUT,
+    MCP_POOL_HEALTH_INTERVAL,
+    MCP_CALL_TIMEOUT,
+    MCP_TRANSPORT,
+    MCP_SERVER_URL,
+    MCP_INIT_TIMEOUT,
+    MCP_CATALOG_CACHE,
+    MCP_TOOL_MANIFEST,
+    MCP_TOOL_PLUGIN_DIRS,
+    JINA_READER_URL,
+    CRAWLER_TIMEOUT,
+    CRAWLER_MAX_RETRIES,
+    CRAWLER_MAX_CONCURRENCY,
+    CRAWLER_PER_HOST_LIMIT,
+    CRAWLER_BACKENDS,
+    CRAWLER_BACKEND_MEMORY_TTL,
+    CRAWLER_USER_AGENT,
+    CRAWLER_RESPECT_ROBOTS,
+    CRAWLER_ALLOW_PRIVATE_HOSTS,
+    CRAWLER_MAX_PAGE_BYTES,
+    CRAWLER_EXTRACT_MODE,
+    CRAWLER_EXTRACT_WORKERS,
+    CRAWLER_EXTRACT_TIMEOUT,
+    CRAWLER_EXTRACT_MAX_CHARS,
+    CRAWL_MANY_MAX_URLS,
+    CRAWL_CACHE_DB,
+    CRAWL_CACHE_TTL,
+    CRAWL_CACHE_MAX_BYTES,
+    CRAWL_CACHE_DOMAIN_TTLS,
 )
 from .tools import TAVILY_MAX_RESULTS
 
@@ -42,6 +100,64 @@ __all__ = [
     "CHROME_INSTANCE_PATH",
     "KUAIDI100_API_KEY",
     "CUSTOMER_ID",
+    "KUAIDI100_BASE_URL",
+    "KUAIDI100_CALLBACK_URL",
+    "KUAIDI100_CALLBACK_SALT",
+    "KUAIDI100_STORE",
+    "KUAIDI100_RATE_LIMIT",
+    "KUAIDI100_MAX_CONCURRENCY",
     "DATABASE_URL",
-    "AMAP_API_KEY"
+    "AMAP_API_KEY",
+    "AMAP_BASE_URL",
+    "TOOL_HTTP_TIMEOUT",
+    "TOOL_HTTP_MAX_RETRIES",
+    "TOOL_CACHE_MAX_ENTRIES",
+    "TOOL_CACHE_DB",
+    "WEATHER_CACHE_TTL",
+    "ADCODE_CACHE",
+    "PLANNER_EARLY_DISPATCH",
+    "COORDINATOR_FAST_PATH",
+    "COORDINATOR_FAST_PATH_THRESHOLD",
+    "COORDINATOR_NGRAM_MODEL",
+    "COORDINATOR_DECISION_LOG",
+    "SPECULATIVE_PLANNING",
+    "SPECULATIVE_PLANNING_WORKERS",
+    "TOKEN_BUDGET_OUTPUT_RESERVE",
+    "PROMPT_HOT_RELOAD",
+    "PROMPT_CACHE_CONTROL",
+    "WORKER_MAX_RETRIES",
+    "WORKER_RETRY_BASE_DELAY",
+    "WORKER_RETRY_MAX_DELAY",
+    "MCP_POOL_SIZE",
+    "MCP_POOL_MIN_SIZE",
+    "MCP_POOL_MAX_IN_FLIGHT",
+    "MCP_POOL_IDLE_TIMEOUT",
+    "MCP_POOL_HEALTH_INTERVAL",
+    "MCP_CALL_TIMEOUT",
+    "MCP_TRANSPORT",
+    "MCP_SERVER_URL",
+    "MCP_INIT_TIMEOUT",
+    "MCP_CATALOG_CACHE",
+    "MCP_TOOL_MANIFEST",
+    "MCP_TOOL_PLUGIN_DIRS",
+    "JINA_READER_URL",
+    "CRAWLER_TIMEOUT",
+    "CRAWLER_MAX_RETRIES",
+    "CRAWLER_MAX_CONCURRENCY",
+    "CRAWLER_PER_HOST_LIMIT",
+    "CRAWLER_BACKENDS",
+    "CRAWLER_BACKEND_MEMORY_TTL",
+    "CRAWLER_USER_AGENT",
+    "CRAWLER_RESPECT_ROBOTS",
+    "CRAWLER_ALLOW_PRIVATE_HOSTS",
+    "CRAWLER_MAX_PAGE_BYTES",
+    "CRAWLER_EXTRACT_MODE",
+    "CRAWLER_EXTRACT_WORKERS",
+    "CRAWLER_EXTRACT_TIMEOUT",
+    "CRAWLER_EXTRACT_MAX_CHARS",
+    "CRAWL_MANY_MAX_URLS",
+    "CRAWL_CACHE_DB",
+    "CRAWL_CACHE_TTL",
+    "CRAWL_CACHE_MAX_BYTES",
+    "CRAWL_CACHE_DOMAIN_TTLS",
 ]
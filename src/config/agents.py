@@ -15,3 +15,43 @@ AGENT_LLM_MAP: dict[str, LLMType] = {
     "life_tools": "basic",  #生活工具调用查询使用basic llm
     "desktop": "vision",
 }
+
+# LLM types whose provider supports JSON mode and tool-calling based
+# structured output (`with_structured_output`).
+STRUCTURED_OUTPUT_LLM_TYPES: list[LLMType] = ["basic", "vision"]
+
+# Agents whose first plan step may start before the planner finishes writing.
+# Only agents without side effects should be listed here.
+EARLY_DISPATCH_AGENTS: list[str] = ["researcher"]
+
+# Workers that receive the images attached by the user. Images are analysed
+# by the planner in `thought`, so by default workers only get the text.
+IMAGE_INPUT_AGENTS: list[str] = []
+
+# Context window (in tokens) of the models in use. Names are matched by
+# prefix, unknown models fall back to DEFAULT_CONTEXT_LIMIT.
+MODEL_CONTEXT_LIMITS: dict[str, int] = {
+    "gpt-4o": 128000,
+    "gpt-4.1": 1000000,
+    "o1": 128000,
+    "o3": 200000,
+    "deepseek": 64000,
+    "qwen-vl": 32000,
+    "qwen": 128000,
+    "glm-4v": 8000,
+    "glm": 128000,
+}
+DEFAULT_CONTEXT_LIMIT = 32000
+
+# Trimming policies applied, in order, when an agent's prompt exceeds its
+# token budget. See src/agents/token_budget.py for the available policies.
+AGENT_TRIM_POLICIES: dict[str, list[str]] = {
+    "coordinator": ["truncate_longest"],
+    "planner": ["truncate_longest"],
+    "supervisor": ["drop_oldest_worker_outputs", "truncate_longest"],
+    "researcher": ["truncate_tool_outputs", "truncate_worker_outputs", "truncate_longest"],
+    "coder": ["truncate_tool_outputs", "truncate_worker_outputs", "truncate_longest"],
+    "browser": ["truncate_tool_outputs", "truncate_worker_outputs", "truncate_longest"],
+    "reporter": ["truncate_worker_outputs", "drop_oldest_worker_outputs", "truncate_longest"],
+    "life_tools": ["truncate_tool_outputs", "truncate_worker_outputs", "truncate_longest"],
+}
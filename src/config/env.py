@@ -25,8 +25,123 @@ CHROME_INSTANCE_PATH = os.getenv("CHROME_INSTANCE_PATH")
 #快递的API_KEY
 KUAIDI100_API_KEY = os.getenv("KUAIDI100_API_KEY")
 CUSTOMER_ID = os.getenv("CUSTOMER_ID")
+KUAIDI100_BASE_URL = os.getenv("KUAIDI100_BASE_URL", "https://poll.kuaidi100.com")
+# 快递100 订阅推送：设置回调地址（指向本服务的 /api/kuaidi100/callback）后，查询过的单号会自动订阅，
+# 推送的最新轨迹保存在本地 SQLite 中；salt 用于校验推送签名，必须设置，否则不订阅并拒绝所有推送
+KUAIDI100_CALLBACK_URL = os.getenv("KUAIDI100_CALLBACK_URL", "")
+KUAIDI100_CALLBACK_SALT = os.getenv("KUAIDI100_CALLBACK_SALT", "")
+KUAIDI100_STORE = os.path.expanduser(os.getenv("KUAIDI100_STORE", "~/.cache/daily_tools_mcp/kuaidi100.db"))
+# 快递100 实时查询的速率上限（次/秒，0 表示不限），以及批量查询工具的并发数
+KUAIDI100_RATE_LIMIT = float(os.getenv("KUAIDI100_RATE_LIMIT", "10"))
+KUAIDI100_MAX_CONCURRENCY = int(os.getenv("KUAIDI100_MAX_CONCURRENCY", "5"))
 
 #数据库的url
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 AMAP_API_KEY= os.getenv("AMAP_API_KEY")
+AMAP_BASE_URL = os.getenv("AMAP_BASE_URL", "https://restapi.amap.com")
+
+# 日常工具的 HTTP 客户端：单次请求超时（秒）和瞬时错误的重试次数
+TOOL_HTTP_TIMEOUT = float(os.getenv("TOOL_HTTP_TIMEOUT", "10"))
+TOOL_HTTP_MAX_RETRIES = int(os.getenv("TOOL_HTTP_MAX_RETRIES", "2"))
+
+# 日常工具结果缓存：内存 LRU 的条目上限，以及可选的 SQLite 文件（为空时只用内存）
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1024"))
+TOOL_CACHE_DB = os.path.expanduser(os.getenv("TOOL_CACHE_DB", ""))
+# 各工具结果的缓存秒数，0 表示不缓存。高德天气大约每小时更新一次
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+# 离线 adcode 索引未命中、经地理编码 API 解析出的城市，写回这个本地文件；设为空字符串则只保存在内存中
+ADCODE_CACHE = os.path.expanduser(os.getenv("ADCODE_CACHE", "~/.cache/daily_tools_mcp/adcode_cache.json"))
+
+# 规划器流式解析出第一个步骤后，是否提前派发给对应的 worker 执行
+PLANNER_EARLY_DISPATCH = os.getenv("PLANNER_EARLY_DISPATCH", "false").lower() == "true"
+
+# 协调器快速通道：规则 + n-gram 模型在调用 LLM 之前直接判断明显的任务或闲聊
+COORDINATOR_FAST_PATH = os.getenv("COORDINATOR_FAST_PATH", "true").lower() == "true"
+COORDINATOR_FAST_PATH_THRESHOLD = float(os.getenv("COORDINATOR_FAST_PATH_THRESHOLD", "0.9"))
+COORDINATOR_NGRAM_MODEL = os.getenv("COORDINATOR_NGRAM_MODEL", "data/coordinator_ngram.json")
+# 记录协调器 LLM 的决策，用于离线训练 n-gram 模型（为空则不记录）
+COORDINATOR_DECISION_LOG = os.getenv("COORDINATOR_DECISION_LOG", "")
+
+# 投机规划（可选）：看起来像任务的请求在协调器运行时并行启动 planner
+SPECULATIVE_PLANNING = os.getenv("SPECULATIVE_PLANNING", "false").lower() == "true"
+# 投机规划使用独立的线程池，不占用提前派发的线程
+SPECULATIVE_PLANNING_WORKERS = int(os.getenv("SPECULATIVE_PLANNING_WORKERS", "2"))
+
+# 为模型输出预留的 token 数，prompt 超出 上下文上限 - 预留 时在调用前裁剪
+TOKEN_BUDGET_OUTPUT_RESERVE = int(os.getenv("TOKEN_BUDGET_OUTPUT_RESERVE", "4096"))
+
+# 开发时修改 src/prompts/*.md 后无需重启即可生效（按文件修改时间重新编译）
+PROMPT_HOT_RELOAD = os.getenv("PROMPT_HOT_RELOAD", "false").lower() == "true"
+# 为系统提示词加上显式的 cache_control 缓存标记，仅在服务商支持时开启
+PROMPT_CACHE_CONTROL = os.getenv("PROMPT_CACHE_CONTROL", "false").lower() == "true"
+
+# worker 临时性失败（超时、限流、5xx 等）的重试策略：指数退避 + 随机抖动
+WORKER_MAX_RETRIES = int(os.getenv("WORKER_MAX_RETRIES", "2"))
+WORKER_RETRY_BASE_DELAY = float(os.getenv("WORKER_RETRY_BASE_DELAY", "1.0"))
+WORKER_RETRY_MAX_DELAY = float(os.getenv("WORKER_RETRY_MAX_DELAY", "30.0"))
+
+# MCP 会话池：长期存活、已初始化的会话，支持并发请求
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "4"))
+MCP_POOL_MIN_SIZE = int(os.getenv("MCP_POOL_MIN_SIZE", "1"))
+# 单个会话上同时进行的请求数超过该值时，才会再启动新的会话
+MCP_POOL_MAX_IN_FLIGHT = int(os.getenv("MCP_POOL_MAX_IN_FLIGHT", "8"))
+MCP_POOL_IDLE_TIMEOUT = float(os.getenv("MCP_POOL_IDLE_TIMEOUT", "300"))
+MCP_POOL_HEALTH_INTERVAL = float(os.getenv("MCP_POOL_HEALTH_INTERVAL", "30"))
+MCP_CALL_TIMEOUT = float(os.getenv("MCP_CALL_TIMEOUT", "30"))
+
+# MCP 传输方式：auto（配置了 MCP_SERVER_URL 时走 http，否则在进程内直接调用内置工具）、
+# inprocess、stdio（子进程）、http（连接独立运行的工具服务）
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "auto").lower()
+# 独立运行的工具服务地址，启动方式：
+# python src/daily_tools_mcp/daily_tools_mcp_server.py --transport http --port 8765
+MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "")
+# 等待 MCP 后台初始化完成的最长秒数（仅在没有缓存的工具目录时才需要等待）
+MCP_INIT_TIMEOUT = float(os.getenv("MCP_INIT_TIMEOUT", "15"))
+# 工具目录的磁盘缓存，用于热启动；设为空字符串可禁用
+MCP_CATALOG_CACHE = os.path.expanduser(
+    os.getenv("MCP_CATALOG_CACHE", "~/.cache/daily_tools_mcp/tool_catalog.json")
+)
+# 工具服务的插件清单缓存（名称、描述、参数架构），文件未变化时启动不再导入工具模块；设为空字符串可禁用
+MCP_TOOL_MANIFEST = os.path.expanduser(
+    os.getenv("MCP_TOOL_MANIFEST", "~/.cache/daily_tools_mcp/tool_manifest.json")
+)
+# 额外的工具插件目录，多个目录用系统路径分隔符分隔；目录下定义 BaseTool 子类的 .py 文件会被注册
+MCP_TOOL_PLUGIN_DIRS = [
+    os.path.expanduser(path) for path in os.getenv("MCP_TOOL_PLUGIN_DIRS", "").split(os.pathsep) if path
+]
+
+# 网页抓取：Jina Reader 地址、单次请求超时（秒）、瞬时错误的重试次数、总并发数和每个站点的并发数
+JINA_READER_URL = os.getenv("JINA_READER_URL", "https://r.jina.ai/")
+CRAWLER_TIMEOUT = float(os.getenv("CRAWLER_TIMEOUT", "30"))
+CRAWLER_MAX_RETRIES = int(os.getenv("CRAWLER_MAX_RETRIES", "2"))
+CRAWLER_MAX_CONCURRENCY = int(os.getenv("CRAWLER_MAX_CONCURRENCY", "8"))
+CRAWLER_PER_HOST_LIMIT = int(os.getenv("CRAWLER_PER_HOST_LIMIT", "2"))
+# 抓取后端按顺序尝试（direct 为直接请求源站，jina 为 Jina Reader），某个站点成功过的后端会被记住一段时间（秒）并优先使用
+CRAWLER_BACKENDS = [name.strip() for name in os.getenv("CRAWLER_BACKENDS", "direct,jina").split(",") if name.strip()]
+CRAWLER_BACKEND_MEMORY_TTL = float(os.getenv("CRAWLER_BACKEND_MEMORY_TTL", "21600"))
+# 直接抓取：User-Agent、是否遵守 robots.txt、单个页面的最大字节数
+CRAWLER_USER_AGENT = os.getenv("CRAWLER_USER_AGENT", "Mozilla/5.0 (compatible; BuptManusCrawler/1.0)")
+CRAWLER_RESPECT_ROBOTS = os.getenv("CRAWLER_RESPECT_ROBOTS", "true").lower() == "true"
+# 直接抓取默认拒绝解析到内网、回环、链路本地（如 169.254.169.254 元数据服务）等非公网地址的站点，包括重定向的每一跳；
+# 请求直接连接检查过的 IP，防止 DNS 重绑定
+CRAWLER_ALLOW_PRIVATE_HOSTS = os.getenv("CRAWLER_ALLOW_PRIVATE_HOSTS", "false").lower() == "true"
+CRAWLER_MAX_PAGE_BYTES = int(os.getenv("CRAWLER_MAX_PAGE_BYTES", str(5 * 1024 * 1024)))
+# 正文提取：默认模式（readability 需要 Node.js，readabilipy 和 fast 为纯 Python）、提取进程数（0 表示在线程中提取）、
+# 单个页面的提取超时（秒，超时后改用 fast 模式），以及提取前 HTML 截断到的最大字符数
+CRAWLER_EXTRACT_MODE = os.getenv("CRAWLER_EXTRACT_MODE", "readability")
+CRAWLER_EXTRACT_WORKERS = int(os.getenv("CRAWLER_EXTRACT_WORKERS", "2"))
+CRAWLER_EXTRACT_TIMEOUT = float(os.getenv("CRAWLER_EXTRACT_TIMEOUT", "20"))
+CRAWLER_EXTRACT_MAX_CHARS = int(os.getenv("CRAWLER_EXTRACT_MAX_CHARS", "2000000"))
+# crawl_many 工具单次最多抓取的网址数
+CRAWL_MANY_MAX_URLS = int(os.getenv("CRAWL_MANY_MAX_URLS", "10"))
+# 网页抓取缓存：SQLite 文件路径（为空则不缓存）、默认有效期（秒）、总大小上限（字节，超出后按最近访问时间淘汰）
+CRAWL_CACHE_DB = os.path.expanduser(os.getenv("CRAWL_CACHE_DB", "~/.cache/bupt_manus/crawl_cache.db"))
+CRAWL_CACHE_TTL = float(os.getenv("CRAWL_CACHE_TTL", "3600"))
+CRAWL_CACHE_MAX_BYTES = int(os.getenv("CRAWL_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# 按域名覆盖有效期，格式 "wikipedia.org=86400,news.ycombinator.com=300"，子域名同样适用
+CRAWL_CACHE_DOMAIN_TTLS = {
+    domain.strip().lower(): float(ttl)
+    for domain, _, ttl in (item.partition("=") for item in os.getenv("CRAWL_CACHE_DOMAIN_TTLS", "").split(","))
+    if domain.strip() and ttl.strip()
+}
@@ -1,7 +1,26 @@
 from .article import Article
+from .async_crawler import AsyncCrawler, get_async_crawler
+from .cache import CrawlCache, get_crawl_cache, normalize_url
 from .crawler import Crawler
+from .extraction import EXTRACTION_MODES, ExtractionPool, get_extraction_pool
+from .fast_extractor import FastExtractor
+from .fetchers import DirectFetcher, FetchError, FetchPolicy, FetchResult, JinaFetcher
 
 __all__ = [
     "Article",
+    "AsyncCrawler",
     "Crawler",
+    "CrawlCache",
+    "DirectFetcher",
+    "EXTRACTION_MODES",
+    "ExtractionPool",
+    "FastExtractor",
+    "FetchError",
+    "FetchPolicy",
+    "FetchResult",
+    "JinaFetcher",
+    "get_async_crawler",
+    "get_crawl_cache",
+    "get_extraction_pool",
+    "normalize_url",
 ]
@@ -1,4 +1,5 @@
 import re
+from typing import Optional
 from urllib.parse import urljoin
 
 from markdownify import markdownify as md
@@ -6,16 +7,22 @@ from markdownify import markdownify as md
 
 class Article:
     url: str
+    # 是否来自抓取缓存（未过期，或经源站确认未修改）
+    cache_hit: bool = False
 
-    def __init__(self, title: str, html_content: str):
+    def __init__(self, title: str, html_content: str, markdown: Optional[str] = None):
         self.title = title
         self.html_content = html_content
+        # 缓存中保存的是转换好的 markdown 正文，命中时不必再次转换
+        self.markdown = markdown
 
     def to_markdown(self, including_title: bool = True) -> str:
         markdown = ""
         if including_title:
             markdown += f"# {self.title}\n\n"
-        markdown += md(self.html_content)
+        markdown += (
+            self.markdown if self.markdown is not None else md(self.html_content)
+        )
         return markdown
 
     def to_message(self) -> list[dict]:
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import weakref
+from typing import Dict, List, Optional, Sequence, Union
+from urllib.parse import urlsplit
+
+import httpx
+from markdownify import markdownify as md
+
+from src.config import (
+    CRAWLER_BACKENDS,
+    CRAWLER_EXTRACT_MODE,
+    CRAWLER_MAX_CONCURRENCY,
+    CRAWLER_MAX_RETRIES,
+    CRAWLER_PER_HOST_LIMIT,
+    CRAWLER_TIMEOUT,
+    JINA_READER_URL,
+)
+from src.metrics import metrics
+
+from .article import Article
+from .cache import CacheEntry, CrawlCache, get_crawl_cache
+from .extraction import get_extraction_pool
+from .fetchers import FetchPolicy, FetchResult, create_fetchers
+
+logger = logging.getLogger(__name__)
+
+
+class _LoopState:
+    """Connection pool and concurrency limits of one event loop; asyncio objects cannot cross loops."""
+
+    def __init__(self, max_concurrency: int):
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_concurrency * 2,
+                max_keepalive_connections=max_concurrency,
+            ),
+            follow_redirects=True,
+        )
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.hosts: Dict[str, asyncio.Semaphore] = {}
+
+
+class AsyncCrawler:
+    """
+    Crawls pages on a pooled httpx.AsyncClient through the fetch backends
+    in `backends`, cheapest first (see FetchPolicy).
+
+    At most `max_concurrency` pages are fetched at once, and at most
+    `per_host_limit` from the same site. Extraction runs in the
+    ExtractionPool worker processes in `extraction_mode` (or the mode given
+    per call); a custom `extractor` runs in a worker thread instead.
+
+    With a `cache`, fresh entries are served without any request. A stale
+    entry is fetched with its ETag / Last-Modified as a conditional request
+    and served again when the origin answers 304; every other miss is
+    crawled and stored.
+    """
+
+    def __init__(
+        self,
+        reader_url: str = JINA_READER_URL,
+        timeout: float = CRAWLER_TIMEOUT,
+        max_retries: int = CRAWLER_MAX_RETRIES,
+        max_concurrency: int = CRAWLER_MAX_CONCURRENCY,
+        per_host_limit: int = CRAWLER_PER_HOST_LIMIT,
+        extractor=None,
+        cache: Optional[CrawlCache] = None,
+        backends: Sequence[str] = CRAWLER_BACKENDS,
+        extraction_mode: str = CRAWLER_EXTRACT_MODE,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_host_limit = max(1, per_host_limit)
+        self.extractor = extractor
+        self.extraction_mode = extraction_mode
+        self.cache = cache
+        self.policy = FetchPolicy(
+            create_fetchers(
+                backends,
+                reader_url=reader_url,
+                timeout=timeout,
+                max_retries=max_retries,
+            )
+        )
+        self._states: (
+            "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]"
+        ) = weakref.WeakKeyDictionary()
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None or state.client.is_closed:
+            state = _LoopState(self.max_concurrency)
+            self._states[loop] = state
+        return state
+
+    def _host_slots(self, state: _LoopState, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        if host not in state.hosts:
+            state.hosts[host] = asyncio.Semaphore(self.per_host_limit)
+        return state.hosts[host]
+
+    async def fetch(
+        self, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> FetchResult:
+        """Fetch `url` through the backends, within the global and per-host limits."""
+        state = self._state()
+        # 先占站点名额再占全局名额，等待同一站点的请求不会占满全局并发
+        async with self._host_slots(state, url), state.slots:
+            return await self.policy.fetch(state.client, url, headers)
+
+    async def fetch_html(self, url: str) -> str:
+        return (await self.fetch(url)).html
+
+    async def crawl(self, url: str, mode: Optional[str] = None) -> Article:
+        """
+        Crawl `url`, extracting in `mode` (default `extraction_mode`);
+        `article.cache_hit` tells whether it was served from the cache.
+        """
+        mode = mode or self.extraction_mode
+        entry = None
+        if self.cache is not None:
+            metrics.incr("crawl_cache_lookups")
+            entry = await asyncio.to_thread(self.cache.get, url)
+            if entry is not None and entry.fresh:
+                metrics.incr("crawl_cache_hits")
+                return await self._cached_article(entry, url, mode)
+
+        result = await self.fetch(
+            url, entry.validators() if entry is not None else None
+        )
+        if result.not_modified and entry is not None:
+            await asyncio.to_thread(self.cache.refresh, url)
+            metrics.incr("crawl_cache_hits")
+            metrics.incr("crawl_cache_revalidated")
+            logger.info(f"Crawl cache entry for {url} revalidated by the origin")
+            return await self._cached_article(entry, url, mode)
+
+        article = await self._extract(result.html, mode)
+        article.url = url
+        if self.cache is not None:
+            await asyncio.to_thread(
+                self.cache.put,
+                url,
+                result.html,
+                article,
+                result.etag,
+                result.last_modified,
+                self._mode_label(mode),
+            )
+        return article
+
+    def _mode_label(self, mode: str) -> Optional[str]:
+        # 自定义提取器的结果不属于任何提取模式
+        return None if self.extractor is not None else mode
+
+    async def _cached_article(self, entry: CacheEntry, url: str, mode: str) -> Article:
+        if entry.mode == self._mode_label(mode):
+            return entry.to_article(url)
+        # 缓存的 markdown 来自另一种提取模式：从保存的 HTML 重新提取，不必重新抓取；不写回缓存，避免不同模式互相覆盖
+        article = await self._extract(entry.html, mode)
+        article.url = url
+        article.cache_hit = True
+        return article
+
+    async def _extract(self, html: str, mode: str) -> Article:
+        if self.extractor is None:
+            return await get_extraction_pool().extract(html, mode)
+        return await asyncio.to_thread(self._extract_with_custom_extractor, html)
+
+    def _extract_with_custom_extractor(self, html: str) -> Article:
+        # 缓存保存 markdown 正文，在工作线程里一并转换好，工具输出时直接复用
+        article = self.extractor.extract_article(html)
+        if article.markdown is None:
+            article.markdown = md(article.html_content or "")
+        return article
+
+    async def crawl_many(
+        self, urls: List[str], mode: Optional[str] = None
+    ) -> List[Union[Article, Exception]]:
+        """Crawl `urls` concurrently. Results are in input order; failures are returned as exceptions."""
+        return await asyncio.gather(
+            *(self.crawl(url, mode) for url in urls), return_exceptions=True
+        )
+
+    async def aclose(self) -> None:
+        state = self._states.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state.client.aclose()
+
+
+_crawler: Optional[AsyncCrawler] = None
+
+
+def get_async_crawler() -> AsyncCrawler:
+    global _crawler
+    if _crawler is None:
+        _crawler = AsyncCrawler(cache=get_crawl_cache())
+    return _crawler
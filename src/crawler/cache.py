@@ -0,0 +1,301 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from markdownify import markdownify as md
+
+from src.config import (
+    CRAWL_CACHE_DB,
+    CRAWL_CACHE_DOMAIN_TTLS,
+    CRAWL_CACHE_MAX_BYTES,
+    CRAWL_CACHE_TTL,
+)
+from src.metrics import metrics
+
+from .article import Article
+
+logger = logging.getLogger(__name__)
+
+metrics.register_ratio(
+    "crawl_cache_hit_rate", "crawl_cache_hits", "crawl_cache_lookups"
+)
+
+# 不影响页面内容的跟踪参数，归一化时去掉
+TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "spm", "ref_src", "share_source"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Cache key of `url`: lowercase scheme and host, no default port, no
+    fragment, no tracking parameters, and the query sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "http"
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def ttl_for(
+    url: str,
+    domain_ttls: Dict[str, float] = CRAWL_CACHE_DOMAIN_TTLS,
+    default: float = CRAWL_CACHE_TTL,
+) -> float:
+    """TTL of `url`: the most specific matching domain rule, else `default`."""
+    host = (urlsplit(url).hostname or "").lower()
+    labels = host.split(".")
+    for i in range(len(labels)):
+        ttl = domain_ttls.get(".".join(labels[i:]))
+        if ttl is not None:
+            return ttl
+    return default
+
+
+def _pack(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), 6)
+
+
+def _unpack(data: bytes) -> str:
+    return zlib.decompress(data).decode("utf-8")
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    title: Optional[str]
+    html: str
+    markdown: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float
+    # 生成 markdown 所用的提取模式，换了模式时从保存的 HTML 重新提取
+    mode: Optional[str] = None
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at > time.time()
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this entry with the origin."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_article(self, url: str) -> Article:
+        article = Article(title=self.title, html_content="", markdown=self.markdown)
+        article.url = url
+        article.cache_hit = True
+        return article
+
+
+class CrawlCache:
+    """
+    On-disk cache of crawled pages, keyed by normalized URL.
+
+    Each entry holds the raw HTML and the extracted article markdown,
+    zlib-compressed, plus the origin's ETag and Last-Modified so a stale
+    entry can be revalidated instead of crawled again. Entries expire after
+    a per-domain TTL; when the payloads exceed `max_bytes`, the least
+    recently used entries are evicted. The file is shared by every process
+    on the host.
+    """
+
+    def __init__(
+        self, db_path: str = CRAWL_CACHE_DB, max_bytes: int = CRAWL_CACHE_MAX_BYTES
+    ):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            if self.db_path != ":memory:":
+                os.makedirs(
+                    os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True
+                )
+            self._db = sqlite3.connect(
+                self.db_path, check_same_thread=False, isolation_level=None
+            )
+            if self.db_path != ":memory:":
+                self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS crawl_cache ("
+                "key TEXT PRIMARY KEY, title TEXT, html BLOB, markdown BLOB, etag TEXT, last_modified TEXT, "
+                "fetched_at REAL, expires_at REAL, accessed_at REAL, size INTEGER)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS crawl_cache_accessed ON crawl_cache (accessed_at)"
+            )
+            columns = {
+                row[1] for row in self._db.execute("PRAGMA table_info(crawl_cache)")
+            }
+            if "mode" not in columns:
+                self._db.execute("ALTER TABLE crawl_cache ADD COLUMN mode TEXT")
+        return self._db
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """Return the entry for `url`, fresh or stale, and mark it as recently used."""
+        key = normalize_url(url)
+        try:
+            with self._lock:
+                db = self._connect()
+                row = db.execute(
+                    "SELECT title, html, markdown, etag, last_modified, expires_at, mode FROM crawl_cache WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if row:
+                    db.execute(
+                        "UPDATE crawl_cache SET accessed_at = ? WHERE key = ?",
+                        (time.time(), key),
+                    )
+        except sqlite3.Error as e:
+            logger.warning(f"Crawl cache read failed: {e}")
+            return None
+        if not row:
+            return None
+        title, html, markdown, etag, last_modified, expires_at, mode = row
+        try:
+            return CacheEntry(
+                key,
+                title,
+                _unpack(html),
+                _unpack(markdown),
+                etag,
+                last_modified,
+                expires_at,
+                mode,
+            )
+        except (zlib.error, UnicodeDecodeError) as e:
+            logger.warning(f"Dropping corrupt crawl cache entry {key}: {e}")
+            self.delete(url)
+            return None
+
+    def put(
+        self,
+        url: str,
+        html: str,
+        article: Article,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        mode: Optional[str] = None,
+    ) -> None:
+        key = normalize_url(url)
+        markdown = (
+            article.markdown
+            if article.markdown is not None
+            else md(article.html_content)
+        )
+        html_blob, markdown_blob = _pack(html), _pack(markdown)
+        size = len(html_blob) + len(markdown_blob)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                db = self._connect()
+                db.execute(
+                    "INSERT OR REPLACE INTO crawl_cache (key, title, html, markdown, etag, last_modified, "
+                    "fetched_at, expires_at, accessed_at, size, mode) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        article.title,
+                        html_blob,
+                        markdown_blob,
+                        etag,
+                        last_modified,
+                        now,
+                        now + ttl_for(url),
+                        now,
+                        size,
+                        mode,
+                    ),
+                )
+                self._evict(db)
+        except sqlite3.Error as e:
+            logger.warning(f"Crawl cache write failed: {e}")
+
+    def refresh(self, url: str) -> None:
+        """Extend a stale entry by its TTL after the origin confirmed it is not modified."""
+        try:
+            with self._lock:
+                now = time.time()
+                self._connect().execute(
+                    "UPDATE crawl_cache SET expires_at = ?, accessed_at = ? WHERE key = ?",
+                    (now + ttl_for(url), now, normalize_url(url)),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Crawl cache write failed: {e}")
+
+    def delete(self, url: str) -> None:
+        try:
+            with self._lock:
+                self._connect().execute(
+                    "DELETE FROM crawl_cache WHERE key = ?", (normalize_url(url),)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Crawl cache write failed: {e}")
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM crawl_cache").fetchone()[
+            0
+        ]
+        if total <= self.max_bytes:
+            return
+        # 按最近访问时间从旧到新删除，直到总大小回到上限以内
+        freed, keys = 0, []
+        for key, size in db.execute(
+            "SELECT key, size FROM crawl_cache ORDER BY accessed_at"
+        ):
+            if total - freed <= self.max_bytes:
+                break
+            keys.append(key)
+            freed += size
+        db.executemany(
+            "DELETE FROM crawl_cache WHERE key = ?", [(key,) for key in keys]
+        )
+        metrics.incr("crawl_cache_evictions", len(keys))
+        logger.info(f"Evicted {len(keys)} crawl cache entries ({freed} bytes)")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries, size = (
+                self._connect()
+                .execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM crawl_cache")
+                .fetchone()
+            )
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM crawl_cache")
+
+
+_crawl_cache: Optional[CrawlCache] = None
+_crawl_cache_lock = threading.Lock()
+
+
+def get_crawl_cache() -> Optional[CrawlCache]:
+    """Return the process-wide crawl cache, or None when CRAWL_CACHE_DB is empty."""
+    global _crawl_cache
+    if _crawl_cache is None and CRAWL_CACHE_DB:
+        with _crawl_cache_lock:
+            if _crawl_cache is None:
+                _crawl_cache = CrawlCache()
+    return _crawl_cache
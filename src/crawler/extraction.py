@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import multiprocessing
+import re
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+
+from markdownify import markdownify as md
+
+from src.config import (
+    CRAWLER_EXTRACT_MAX_CHARS,
+    CRAWLER_EXTRACT_MODE,
+    CRAWLER_EXTRACT_TIMEOUT,
+    CRAWLER_EXTRACT_WORKERS,
+)
+from src.metrics import metrics
+
+from .article import Article
+from .fast_extractor import FastExtractor
+from .readability_extractor import ReadabilityExtractor
+
+logger = logging.getLogger(__name__)
+
+# readability：Node.js 版 Mozilla Readability，效果最好；readabilipy：其纯 Python 实现；fast：html.parser 单遍提取
+EXTRACTION_MODES = ("readability", "readabilipy", "fast")
+
+# 不含正文、但可能非常大的内容：脚本、样式、内联 SVG 和 base64 图片
+_HEAVY_BLOCKS = re.compile(
+    r"<(script|style|svg)\b[^>]*>.*?</\1\s*>", re.IGNORECASE | re.DOTALL
+)
+_DATA_URIS = re.compile(r"""(["'])data:[^"']{256,}\1""")
+
+_extractors: Dict[str, object] = {}
+
+
+def create_extractor(mode: str):
+    if mode == "readability":
+        return ReadabilityExtractor()
+    if mode == "readabilipy":
+        return ReadabilityExtractor(use_readability=False)
+    if mode == "fast":
+        return FastExtractor()
+    raise ValueError(
+        f"Unknown extraction mode {mode!r}, expected one of {EXTRACTION_MODES}"
+    )
+
+
+def _cut(html: str, max_chars: int) -> str:
+    if len(html) <= max_chars:
+        return html
+    # 在标签边界截断，避免留下半个标签
+    end = html.rfind(">", 0, max_chars)
+    return html[: end + 1] if end > 0 else html[:max_chars]
+
+
+def prepare_html(html: str, max_chars: int = CRAWLER_EXTRACT_MAX_CHARS) -> str:
+    """
+    Bound the work of parsing `html`: drop scripts, styles, inline SVG and
+    data URIs, then truncate to `max_chars` at a tag boundary.
+    """
+    # 先粗截断，限制正则在超大页面上的耗时
+    html = _cut(html, max_chars * 4)
+    html = _DATA_URIS.sub('""', _HEAVY_BLOCKS.sub("", html))
+    return _cut(html, max_chars)
+
+
+def extract_markdown(
+    html: str, mode: str, max_chars: int = CRAWLER_EXTRACT_MAX_CHARS
+) -> Tuple[Optional[str], str]:
+    """(title, markdown body) of `html`. Runs in the extraction worker processes."""
+    extractor = _extractors.get(mode)
+    if extractor is None:
+        extractor = _extractors[mode] = create_extractor(mode)
+    article = extractor.extract_article(prepare_html(html, max_chars))
+    markdown = (
+        article.markdown
+        if article.markdown is not None
+        else md(article.html_content or "")
+    )
+    return article.title, markdown
+
+
+class ExtractionPool:
+    """
+    Runs extraction and markdown conversion in worker processes, so large
+    pages neither block the event loop nor hold the GIL the SSE streams need.
+
+    Each document gets `timeout` seconds of running time: at most
+    `workers` jobs per event loop are submitted at once, so time spent
+    waiting for a free worker does not count. A running job cannot be
+    cancelled, so on timeout the workers are terminated and the pool is
+    rebuilt, and the page is extracted again in fast mode on the new pool,
+    under the same timeout. With `workers=0` extraction runs in a thread
+    instead.
+    """
+
+    def __init__(
+        self,
+        workers: int = CRAWLER_EXTRACT_WORKERS,
+        timeout: float = CRAWLER_EXTRACT_TIMEOUT,
+        max_chars: int = CRAWLER_EXTRACT_MAX_CHARS,
+    ):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_chars = max_chars
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # asyncio.Semaphore 只能在一个事件循环中使用，按循环分别创建
+        self._slots: (
+            "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]"
+        ) = weakref.WeakKeyDictionary()
+
+    def _slot(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        slot = self._slots.get(loop)
+        if slot is None:
+            slot = self._slots[loop] = asyncio.Semaphore(self.workers)
+        return slot
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # 服务进程里有多个线程，fork 出的子进程可能继承被占用的锁，所以用 spawn
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _restart(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, html: str, mode: str) -> Tuple[Optional[str], str]:
+        if self.workers <= 0:
+            return await asyncio.wait_for(
+                asyncio.to_thread(extract_markdown, html, mode, self.max_chars),
+                self.timeout,
+            )
+        # 拿到空闲的工作进程后才提交，超时只计算运行时间，不含排队时间
+        async with self._slot():
+            for attempt in range(2):
+                executor = self._get_executor()
+                future = asyncio.get_running_loop().run_in_executor(
+                    executor, extract_markdown, html, mode, self.max_chars
+                )
+                try:
+                    return await asyncio.wait_for(future, self.timeout)
+                except asyncio.TimeoutError:
+                    self._restart(executor)
+                    raise
+                except BrokenProcessPool:
+                    # 其他页面超时重建进程池时，同一进程池中的任务会被中断，在新进程池上重试一次
+                    self._restart(executor)
+                    if attempt:
+                        raise
+
+    async def extract(self, html: str, mode: str = CRAWLER_EXTRACT_MODE) -> Article:
+        if mode not in EXTRACTION_MODES:
+            raise ValueError(
+                f"Unknown extraction mode {mode!r}, expected one of {EXTRACTION_MODES}"
+            )
+        started = time.perf_counter()
+        try:
+            title, markdown = await self._run(html, mode)
+        except asyncio.TimeoutError:
+            metrics.incr("crawler_extract_timeouts")
+            if mode == "fast":
+                raise
+            logger.warning(
+                f"Extracting a {len(html)} character page in {mode} mode took over {self.timeout}s, using fast mode"
+            )
+            # 重试同样在进程池中运行并受超时限制，病态页面不会在服务进程里无限制地占用 CPU
+            try:
+                title, markdown = await self._run(html, "fast")
+            except asyncio.TimeoutError:
+                metrics.incr("crawler_extract_timeouts")
+                raise
+        metrics.incr("crawler_extract_seconds", time.perf_counter() - started)
+        metrics.incr("crawler_extract_documents")
+        return Article(title=title, html_content="", markdown=markdown)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_extraction_pool: Optional[ExtractionPool] = None
+_extraction_pool_lock = threading.Lock()
+
+
+def get_extraction_pool() -> ExtractionPool:
+    global _extraction_pool
+    if _extraction_pool is None:
+        with _extraction_pool_lock:
+            if _extraction_pool is None:
+                _extraction_pool = ExtractionPool()
+    return _extraction_pool
@@ -0,0 +1,265 @@
+import re
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+
+from .article import Article
+
+# 这些标签里的内容不是正文，整体跳过
+SKIP_TAGS = {
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "svg",
+    "canvas",
+    "iframe",
+    "nav",
+    "header",
+    "footer",
+    "aside",
+    "form",
+    "button",
+    "select",
+    "textarea",
+    "head",
+}
+BLOCK_TAGS = {
+    "p",
+    "div",
+    "section",
+    "article",
+    "main",
+    "ul",
+    "ol",
+    "table",
+    "blockquote",
+    "figure",
+    "figcaption",
+    "dl",
+    "dt",
+    "dd",
+    "hr",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "pre",
+    "li",
+    "tr",
+}
+MAIN_TAGS = {"article", "main"}
+# 正文容器中的文字少于这么多时，认为它不是正文，改用整个 body
+MIN_MAIN_TEXT = 200
+
+
+class _MarkdownParser(HTMLParser):
+    """Single pass over the HTML that writes markdown directly, without building a DOM."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title: List[str] = []
+        self.first_heading: Optional[str] = None
+        self.parts: List[Tuple[bool, str]] = []
+        self._tags: List[str] = []
+        self._skip: List[str] = []
+        self._in_title = False
+        self._main_depth = 0
+        self._main_seen = False
+        self._pre = 0
+        self._lists: List[List] = []
+        self._links: List[Tuple[str, int]] = []
+        self._heading_start: Optional[int] = None
+        self._table_rows: List[int] = []
+        self._cells = 0
+
+    def _emit(self, text: str) -> None:
+        if text:
+            self.parts.append((self._main_depth > 0, text))
+
+    def _block_break(self, tag: str, opening: bool) -> str:
+        # 列表项、表格行和嵌套列表只换行，其他块之间空一行
+        if tag in ("li", "tr") and not opening:
+            return ""
+        if tag in ("li", "tr") or (tag in ("ul", "ol") and self._lists):
+            return "" if self.parts and self.parts[-1][1].endswith("\n") else "\n"
+        return "\n\n"
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+            return
+        if self._skip:
+            if tag == self._skip[-1]:
+                self._skip.append(tag)
+            return
+        if tag in SKIP_TAGS:
+            self._skip.append(tag)
+            return
+        attrs = dict(attrs)
+        if tag in MAIN_TAGS and (self._main_depth or not self._main_seen):
+            self._main_depth += 1
+            self._main_seen = True
+        if tag in BLOCK_TAGS:
+            self._emit(self._block_break(tag, opening=True))
+        if tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            self._emit("#" * int(tag[1]) + " ")
+            self._heading_start = len(self.parts)
+        elif tag in ("ul", "ol"):
+            self._lists.append([tag, 0])
+        elif tag == "li":
+            indent = "  " * max(len(self._lists) - 1, 0)
+            if self._lists and self._lists[-1][0] == "ol":
+                self._lists[-1][1] += 1
+                self._emit(f"{indent}{self._lists[-1][1]}. ")
+            else:
+                self._emit(f"{indent}- ")
+        elif tag == "br":
+            self._emit("\n")
+        elif tag == "pre":
+            self._pre += 1
+            self._emit("```\n")
+        elif tag == "code" and not self._pre:
+            self._emit("`")
+        elif tag in ("strong", "b"):
+            self._emit("**")
+        elif tag in ("em", "i"):
+            self._emit("*")
+        elif tag == "blockquote":
+            self._emit("> ")
+        elif tag == "a":
+            self._links.append((attrs.get("href") or "", len(self.parts)))
+        elif tag == "img":
+            src = attrs.get("src") or ""
+            if src and not src.startswith("data:"):
+                self._emit(f"![{(attrs.get('alt') or '').strip()}]({src})")
+        elif tag == "table":
+            self._table_rows.append(0)
+        elif tag == "tr":
+            self._cells = 0
+            self._emit("|")
+        elif tag in ("td", "th"):
+            self._cells += 1
+            self._emit(" ")
+        if tag not in ("br", "img", "hr"):
+            self._tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in ("br", "img", "hr"):
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+            return
+        if self._skip:
+            if tag == self._skip[-1]:
+                self._skip.pop()
+            return
+        if tag not in self._tags:
+            return
+        # 补齐没有闭合的内层标签
+        while self._tags:
+            open_tag = self._tags.pop()
+            self._close(open_tag)
+            if open_tag == tag:
+                break
+
+    def _close(self, tag: str) -> None:
+        if (
+            tag in ("h1", "h2", "h3", "h4", "h5", "h6")
+            and self._heading_start is not None
+        ):
+            if self.first_heading is None:
+                self.first_heading = "".join(
+                    text for _, text in self.parts[self._heading_start :]
+                ).strip()
+            self._heading_start = None
+        elif tag in ("ul", "ol") and self._lists:
+            self._lists.pop()
+        elif tag == "pre":
+            self._pre = max(self._pre - 1, 0)
+            self._emit("\n```")
+        elif tag == "code" and not self._pre:
+            self._emit("`")
+        elif tag in ("strong", "b"):
+            self._emit("**")
+        elif tag in ("em", "i"):
+            self._emit("*")
+        elif tag == "a" and self._links:
+            href, start = self._links.pop()
+            text = "".join(text for _, text in self.parts[start:]).strip()
+            if not text:
+                del self.parts[start:]
+            elif href and not href.startswith(("#", "javascript:")):
+                in_main = self.parts[start][0]
+                self.parts[start:] = [(in_main, f"[{text}]({href})")]
+        elif tag in ("td", "th"):
+            self._emit(" |")
+        elif tag == "tr" and self._table_rows:
+            # 第一行后面补上表头分隔行
+            if self._table_rows[-1] == 0:
+                self._emit("\n|" + " --- |" * max(self._cells, 1))
+            self._table_rows[-1] += 1
+        elif tag == "table" and self._table_rows:
+            self._table_rows.pop()
+        if tag in MAIN_TAGS and self._main_depth:
+            self._main_depth -= 1
+        if tag in BLOCK_TAGS:
+            self._emit(self._block_break(tag, opening=False))
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title.append(data)
+        elif self._skip:
+            return
+        elif self._pre:
+            self._emit(data)
+        else:
+            text = re.sub(r"\s+", " ", data)
+            # 行首的空白丢掉，以免打乱列表缩进
+            if not self.parts or self.parts[-1][1].endswith("\n"):
+                text = text.lstrip()
+            if text.strip() or (text and not self.parts[-1][1].endswith(" ")):
+                self._emit(text)
+
+
+def _tidy(markdown: str) -> str:
+    """Strip trailing spaces (outside code fences) and collapse runs of blank lines."""
+    lines, in_code = [], False
+    for line in markdown.split("\n"):
+        if line.startswith("```"):
+            in_code = not in_code
+        lines.append(line if in_code else line.rstrip())
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def html_to_markdown(html: str) -> Tuple[Optional[str], str]:
+    """(title, markdown body) of the main content of `html`."""
+    parser = _MarkdownParser()
+    parser.feed(html)
+    parser.close()
+    main = "".join(text for in_main, text in parser.parts if in_main)
+    if len(main.strip()) >= MIN_MAIN_TEXT:
+        body = main
+    else:
+        body = "".join(text for _, text in parser.parts)
+    title = " ".join("".join(parser.title).split()) or parser.first_heading
+    return title, _tidy(body)
+
+
+class FastExtractor:
+    """
+    Pure-Python extraction with the standard library html.parser.
+
+    Takes the first <article>/<main> (or the whole body) minus navigation,
+    scripts and forms, and writes markdown in the same pass, so no DOM is
+    built and markdownify is not needed. Less precise than readability at
+    dropping boilerplate, much cheaper on large pages.
+    """
+
+    def extract_article(self, html: str) -> Article:
+        title, markdown = html_to_markdown(html)
+        return Article(title=title, html_content="", markdown=markdown)
@@ -0,0 +1,475 @@
+import asyncio
+import codecs
+import ipaddress
+import logging
+import os
+import random
+import re
+import socket
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+from src.config import (
+    CRAWLER_ALLOW_PRIVATE_HOSTS,
+    CRAWLER_BACKEND_MEMORY_TTL,
+    CRAWLER_MAX_PAGE_BYTES,
+    CRAWLER_MAX_RETRIES,
+    CRAWLER_RESPECT_ROBOTS,
+    CRAWLER_TIMEOUT,
+    CRAWLER_USER_AGENT,
+    JINA_READER_URL,
+)
+from src.metrics import metrics
+
+try:
+    from charset_normalizer import from_bytes
+except ImportError:  # requests 依赖 charset_normalizer，一般总是可用
+    from_bytes = None
+
+logger = logging.getLogger(__name__)
+
+# 可重试的响应状态码：限流和上游临时故障
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+# 页面正文少于这么多可见字符时，认为需要执行 JavaScript 才能渲染，交给 Jina Reader
+MIN_VISIBLE_TEXT = 200
+ROBOTS_TTL = 86400
+ROBOTS_ERROR_TTL = 600
+MAX_REMEMBERED_HOSTS = 4096
+MAX_REDIRECTS = 5
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_META_CHARSET = re.compile(
+    rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w:.-]+)""", re.IGNORECASE
+)
+_INVISIBLE = re.compile(
+    r"<(script|style|noscript|template)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL
+)
+_TAG = re.compile(r"<[^>]+>")
+# 网页常把 gb2312/gbk 当作 GB18030 的别名使用，按超集解码避免生僻字乱码
+CHARSET_ALIASES = {"gb2312": "gb18030", "gbk": "gb18030", "x-gbk": "gb18030"}
+BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+class FetchError(Exception):
+    """A backend could not produce the page; the policy tries the next backend."""
+
+
+@dataclass
+class FetchResult:
+    url: str
+    html: Optional[str]
+    backend: str
+    status_code: int = 200
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status_code == 304
+
+
+def _codec(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    name = CHARSET_ALIASES.get(name.strip().lower(), name.strip().lower())
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def decode_html(body: bytes, content_type: Optional[str] = None) -> str:
+    """
+    Decode an HTML body: a BOM, then the Content-Type charset, then a
+    <meta charset> in the first 4 KB, then UTF-8, then charset detection.
+    """
+    declared = None
+    if content_type and "charset=" in content_type.lower():
+        declared = (
+            content_type.lower().split("charset=", 1)[1].split(";")[0].strip("\"' ")
+        )
+    for bom, encoding in BOMS:
+        if body.startswith(bom):
+            return body.decode(encoding, errors="replace")
+    meta = _META_CHARSET.search(body[:4096])
+    for candidate in (
+        declared,
+        meta.group(1).decode("ascii", "ignore") if meta else None,
+    ):
+        encoding = _codec(candidate)
+        if encoding:
+            try:
+                return body.decode(encoding)
+            except UnicodeDecodeError:
+                logger.debug(f"Declared charset {candidate} does not decode the page")
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        pass
+    if from_bytes is not None:
+        best = from_bytes(body).best()
+        if best is not None and _codec(best.encoding):
+            return body.decode(_codec(best.encoding), errors="replace")
+    return body.decode("utf-8", errors="replace")
+
+
+def visible_text_length(html: str) -> int:
+    return len(" ".join(_TAG.sub(" ", _INVISIBLE.sub(" ", html)).split()))
+
+
+def is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    # is_global 排除了私有、回环、链路本地、保留和未指定地址
+    return ip.is_global and not ip.is_multicast
+
+
+async def check_public_host(url: str) -> str:
+    """
+    Raise FetchError unless every address the host of `url` resolves to is public.
+
+    Returns the first checked address. The caller must connect to that
+    address rather than resolve the host again, or a DNS answer that changes
+    between the check and the connection (DNS rebinding) gets past it.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in DEFAULT_PORTS or not parts.hostname:
+        raise FetchError(f"unsupported URL {url}")
+    try:
+        port = parts.port or DEFAULT_PORTS[parts.scheme]
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            parts.hostname, port, type=socket.SOCK_STREAM
+        )
+    except (OSError, ValueError) as e:
+        raise FetchError(f"cannot resolve {parts.hostname}: {e}")
+    for info in infos:
+        if not is_public_address(info[4][0]):
+            raise FetchError(
+                f"{parts.hostname} resolves to non-public address {info[4][0]}"
+            )
+    return infos[0][4][0]
+
+
+class Fetcher:
+    """A way of getting a page's HTML. `headers` may carry conditional request headers."""
+
+    name: str
+
+    async def fetch(
+        self, client: httpx.AsyncClient, url: str, headers: Dict[str, str]
+    ) -> FetchResult:
+        raise NotImplementedError
+
+
+class DirectFetcher(Fetcher):
+    """
+    GETs the page from the origin with our own User-Agent.
+
+    robots.txt is honoured per origin and cached. Non-HTML responses,
+    oversized pages and pages with almost no text without JavaScript are
+    rejected, so the policy falls back to a rendering backend.
+
+    URLs come from the LLM and from the pages it reads, so unless
+    `allow_private_hosts` is set, hosts that resolve to a private,
+    loopback, link-local or otherwise non-public address are refused.
+    Each request is sent to the address that was checked, with the original
+    Host header and TLS server name, so the host is not resolved a second
+    time. Redirects are followed here rather than by httpx so that every
+    hop, and every robots.txt probe, is checked.
+    """
+
+    name = "direct"
+
+    def __init__(
+        self,
+        user_agent: str = CRAWLER_USER_AGENT,
+        timeout: float = CRAWLER_TIMEOUT,
+        max_bytes: int = CRAWLER_MAX_PAGE_BYTES,
+        respect_robots: bool = CRAWLER_RESPECT_ROBOTS,
+        allow_private_hosts: bool = CRAWLER_ALLOW_PRIVATE_HOSTS,
+        max_redirects: int = MAX_REDIRECTS,
+    ):
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.respect_robots = respect_robots
+        self.allow_private_hosts = allow_private_hosts
+        self.max_redirects = max_redirects
+        self._robots: Dict[str, Tuple[float, Optional[RobotFileParser]]] = {}
+
+    async def _send(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        headers: Dict[str, str],
+        timeout: float,
+        check_robots: bool,
+    ) -> Tuple[httpx.Response, str]:
+        """
+        GET `url`, following redirects one hop at a time.
+
+        Returns the open, streaming final response and its URL. The URL of the
+        response itself may carry the pinned address instead of the host.
+        """
+        target = url
+        for _ in range(self.max_redirects + 1):
+            address = None
+            if not self.allow_private_hosts:
+                address = await check_public_host(target)
+            if check_robots:
+                parts = urlsplit(target)
+                robots = await self._robots_for(
+                    client, f"{parts.scheme}://{parts.netloc}"
+                )
+                if robots is None or not robots.can_fetch(self.user_agent, target):
+                    raise FetchError("disallowed by robots.txt")
+            request = self._build_request(client, target, address, headers, timeout)
+            response = await client.send(request, stream=True, follow_redirects=False)
+            if not response.has_redirect_location:
+                return response, target
+            await response.aclose()
+            # 相对地址按原始主机名解析，而不是按连接用的 IP
+            target = urljoin(target, response.headers["location"])
+        raise FetchError(f"more than {self.max_redirects} redirects")
+
+    @staticmethod
+    def _build_request(
+        client: httpx.AsyncClient,
+        url: str,
+        address: Optional[str],
+        headers: Dict[str, str],
+        timeout: float,
+    ) -> httpx.Request:
+        """Build a GET for `url` that connects to `address` when one was checked."""
+        if address is None:
+            return client.build_request("GET", url, headers=headers, timeout=timeout)
+        original = httpx.URL(url)
+        return client.build_request(
+            "GET",
+            original.copy_with(host=address),
+            headers={**headers, "Host": original.netloc.decode("ascii")},
+            timeout=timeout,
+            # TLS 的 SNI 和证书校验仍然使用原始主机名
+            extensions={"sni_hostname": original.raw_host.decode("ascii")},
+        )
+
+    async def _robots_for(
+        self, client: httpx.AsyncClient, origin: str
+    ) -> Optional[RobotFileParser]:
+        """The parsed robots.txt of `origin`; None means the site cannot be crawled directly."""
+        cached = self._robots.get(origin)
+        if cached and cached[0] > time.time():
+            return cached[1]
+        parser, ttl = RobotFileParser(), ROBOTS_TTL
+        try:
+            response, _ = await self._send(
+                client,
+                f"{origin}/robots.txt",
+                {"User-Agent": self.user_agent},
+                min(self.timeout, 10),
+                check_robots=False,
+            )
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+            if response.status_code >= 500:
+                # RFC 9309：robots.txt 不可用时视为全部禁止
+                parser, ttl = None, ROBOTS_ERROR_TTL
+            elif response.status_code >= 400:
+                parser.parse([])
+            else:
+                parser.parse(response.text.splitlines())
+        except (FetchError, httpx.HTTPError) as e:
+            logger.debug(f"Failed to fetch robots.txt of {origin}: {e!r}")
+            parser, ttl = None, ROBOTS_ERROR_TTL
+        self._robots[origin] = (time.time() + ttl, parser)
+        return parser
+
+    async def fetch(
+        self, client: httpx.AsyncClient, url: str, headers: Dict[str, str]
+    ) -> FetchResult:
+        request_headers = {
+            "User-Agent": self.user_agent,
+            "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.5",
+            **headers,
+        }
+        response, final_url = await self._send(
+            client, url, request_headers, self.timeout, check_robots=self.respect_robots
+        )
+        try:
+            result = FetchResult(
+                url=final_url,
+                html=None,
+                backend=self.name,
+                status_code=response.status_code,
+                etag=response.headers.get("etag"),
+                last_modified=response.headers.get("last-modified"),
+            )
+            if response.status_code == 304:
+                return result
+            if response.status_code != 200:
+                raise FetchError(f"HTTP {response.status_code}")
+            content_type = response.headers.get("content-type", "")
+            if content_type and not content_type.lower().startswith(HTML_CONTENT_TYPES):
+                raise FetchError(f"not HTML ({content_type})")
+            length = response.headers.get("content-length")
+            if length and length.isdigit() and int(length) > self.max_bytes:
+                raise FetchError(f"page larger than {self.max_bytes} bytes")
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) > self.max_bytes:
+                    raise FetchError(f"page larger than {self.max_bytes} bytes")
+        finally:
+            await response.aclose()
+
+        result.html = decode_html(bytes(body), content_type)
+        if visible_text_length(result.html) < MIN_VISIBLE_TEXT:
+            raise FetchError("page needs JavaScript to render")
+        return result
+
+
+class JinaFetcher(Fetcher):
+    """Fetches the rendered page through Jina Reader, retrying rate limits and transient errors."""
+
+    name = "jina"
+
+    def __init__(
+        self,
+        reader_url: str = JINA_READER_URL,
+        timeout: float = CRAWLER_TIMEOUT,
+        max_retries: int = CRAWLER_MAX_RETRIES,
+    ):
+        self.reader_url = reader_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        if not os.getenv("JINA_API_KEY"):
+            logger.warning(
+                "Jina API key is not set. Provide your own key to access a higher rate limit. See https://jina.ai/reader for more information."
+            )
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json", "X-Return-Format": "html"}
+        if os.getenv("JINA_API_KEY"):
+            headers["Authorization"] = f"Bearer {os.getenv('JINA_API_KEY')}"
+        return headers
+
+    async def fetch(
+        self, client: httpx.AsyncClient, url: str, headers: Dict[str, str]
+    ) -> FetchResult:
+        # Jina Reader 不转发条件请求头，总是返回完整页面
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await client.post(
+                    self.reader_url,
+                    headers=self._headers(),
+                    json={"url": url},
+                    timeout=self.timeout,
+                )
+                if (
+                    response.status_code not in RETRY_STATUS_CODES
+                    or attempt == self.max_retries
+                ):
+                    break
+                reason = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise
+                reason = type(e).__name__
+            delay = random.uniform(0, min(8.0, 0.5 * 2**attempt))
+            logger.warning(
+                f"Crawling {url} through Jina Reader failed ({reason}), retrying in {delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
+        response.raise_for_status()
+        return FetchResult(url=url, html=response.text, backend=self.name)
+
+
+FETCHERS = {"direct": DirectFetcher, "jina": JinaFetcher}
+
+
+def create_fetchers(names: Sequence[str], **jina_options) -> List[Fetcher]:
+    """Fetchers for the backend `names`, in order; `jina_options` configure JinaFetcher."""
+    fetchers = []
+    for name in names:
+        if name not in FETCHERS:
+            raise ValueError(
+                f"Unknown crawler backend {name!r}, expected one of {sorted(FETCHERS)}"
+            )
+        fetchers.append(
+            JinaFetcher(**jina_options) if name == "jina" else FETCHERS[name]()
+        )
+    return fetchers
+
+
+class FetchPolicy:
+    """
+    Tries the fetchers in order, cheapest first, and falls back on failure.
+
+    The fetcher that last worked for a host is remembered for `memory_ttl`
+    seconds and tried first for that host; afterwards the cheaper ones get
+    another chance.
+    """
+
+    def __init__(
+        self, fetchers: List[Fetcher], memory_ttl: float = CRAWLER_BACKEND_MEMORY_TTL
+    ):
+        if not fetchers:
+            raise ValueError("At least one crawler backend is required")
+        self.fetchers = fetchers
+        self.memory_ttl = memory_ttl
+        self._hosts: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def remembered(self, host: str) -> Optional[str]:
+        entry = self._hosts.get(host)
+        if entry and entry[0] > time.time():
+            return entry[1]
+        return None
+
+    def _remember(self, host: str, backend: str) -> None:
+        self._hosts[host] = (time.time() + self.memory_ttl, backend)
+        self._hosts.move_to_end(host)
+        while len(self._hosts) > MAX_REMEMBERED_HOSTS:
+            self._hosts.popitem(last=False)
+
+    def order(self, host: str) -> List[Fetcher]:
+        preferred = self.remembered(host)
+        return sorted(self.fetchers, key=lambda fetcher: fetcher.name != preferred)
+
+    async def fetch(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> FetchResult:
+        host = urlsplit(url).netloc.lower()
+        errors = []
+        for fetcher in self.order(host):
+            try:
+                result = await fetcher.fetch(client, url, headers or {})
+            except (FetchError, httpx.HTTPError) as e:
+                errors.append(f"{fetcher.name}: {e}")
+                metrics.incr("crawler_fallbacks")
+                logger.info(
+                    f"Backend {fetcher.name} could not fetch {url} ({e}), trying the next one"
+                )
+                continue
+            if self.remembered(host) != fetcher.name:
+                logger.info(f"Using backend {fetcher.name} for {host}")
+            self._remember(host, fetcher.name)
+            metrics.incr(f"crawler_fetches_{fetcher.name}")
+            return result
+        raise FetchError(f"All crawler backends failed for {url}: {'; '.join(errors)}")
@@ -1,10 +1,34 @@
 import logging
 import os
+from typing import Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.config import CRAWLER_MAX_RETRIES, CRAWLER_TIMEOUT, JINA_READER_URL
 
 logger = logging.getLogger(__name__)
 
+# 所有 JinaClient 共用一个会话，复用连接；连接错误、429 和 5xx 按指数退避重试
+_session: Optional[requests.Session] = None
+
+
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        retry = Retry(
+            total=CRAWLER_MAX_RETRIES,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=None,
+        )
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(max_retries=retry, pool_maxsize=10))
+        session.mount("http://", HTTPAdapter(max_retries=retry, pool_maxsize=10))
+        _session = session
+    return _session
+
 
 class JinaClient:
     def crawl(self, url: str, return_format: str = "html") -> str:
@@ -19,5 +43,7 @@ class JinaClient:
                 "Jina API key is not set. Provide your own key to access a higher rate limit. See https://jina.ai/reader for more information."
             )
         data = {"url": url}
-        response = requests.post("https://r.jina.ai/", headers=headers, json=data)
+        response = _get_session().post(
+            JINA_READER_URL, headers=headers, json=data, timeout=CRAWLER_TIMEOUT
+        )
         return response.text
@@ -4,8 +4,14 @@ from .article import Article
 
 
 class ReadabilityExtractor:
+    def __init__(self, use_readability: bool = True):
+        # use_readability=True 调用 Node.js 版的 Mozilla Readability，否则使用 readabilipy 的纯 Python 实现
+        self.use_readability = use_readability
+
     def extract_article(self, html: str) -> Article:
-        article = simple_json_from_html_string(html, use_readability=True)
+        article = simple_json_from_html_string(
+            html, use_readability=self.use_readability
+        )
         return Article(
             title=article.get("title"),
             html_content=article.get("content"),
@@ -1,6 +1,8 @@
 # src/daily_tools_mcp/daily_tools_mcp_server.py
 
+import argparse
 import asyncio
+import contextlib
 import sys
 import os
 import logging
@@ -16,18 +18,20 @@ sys.path.insert(0, project_root)
 from mcp.server.models import InitializationOptions
 from mcp.server import NotificationOptions, Server
 from mcp.server.stdio import stdio_server
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
 from mcp.types import (
     CallToolRequest,
     CallToolResult,
     ListToolsRequest,
     ListToolsResult,
+    Resource,
     Tool,
     TextContent,
 )
 
-# 导入工具
-from tools.logistics_tool import LogisticsTool
-from tools.weather_tool import WeatherTool
+# 导入工具（与进程内传输共用同一个注册表）
+from src.daily_tools_mcp.registry import create_default_registry
+from src.daily_tools_mcp.tools.cache import get_tool_cache
 
 # 配置日志
 logging.basicConfig(
@@ -39,6 +43,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger("SERVER")
 
+# 工具结果缓存命中统计，以 MCP 资源的形式提供
+TOOL_CACHE_STATS_URI = "metrics://tool-cache"
+
 
 class DailyToolsMCPServer:
     def __init__(self):
@@ -46,6 +53,7 @@ class DailyToolsMCPServer:
         self.server = Server("daily_tools_mcp")
 
         # 工具实例
+        self.registry = None
         self.tools = {}
 
         # 注册处理器
@@ -57,23 +65,9 @@ class DailyToolsMCPServer:
     def _initialize_tools(self):
         """初始化所有工具"""
         logger.info("Starting to load and register tools...")
-
         try:
-            # 初始化物流工具
-            logistics_tool = LogisticsTool()
-            # 关键修改 1: 将工具名改为 LLM 期望的名称 "logistics_tracking"
-            # 这比让 LLM 适应你的内部命名要可靠得多
-            tool_name = "logistics_tracking"
-            self.tools[tool_name] = logistics_tool
-            logger.info(f"Successfully registered tool: {tool_name}")
-
-            logger.info(f"Successfully registered {len(self.tools)} tools: {list(self.tools.keys())}")
-            # 初始化天气工具
-            weather_tool = WeatherTool()
-            weather_tool_name = "weather_query"
-            self.tools[weather_tool_name] = weather_tool
-            logger.info(f"Successfully registered tool: {weather_tool_name}")
-
+            self.registry = create_default_registry()
+            self.tools = self.registry.tools
             logger.info(f"Successfully registered {len(self.tools)} tools: {list(self.tools.keys())}")
 
         except Exception as e:
@@ -90,24 +84,16 @@ class DailyToolsMCPServer:
             """处理工具列表请求"""
             logger.info("Received list_tools request")
 
-            tools = []
-            for tool_name, tool_instance in self.tools.items():
-                try:
-                    # 关键修改 2: 直接调用 get_input_schema() 方法
-                    # 这是修复工具参数无法被 LLM 感知的核心
-                    input_schema = tool_instance.get_input_schema()
-
-                    # 获取工具描述和参数
-                    tool_info = Tool(
-                        name=tool_name,
-                        description=tool_instance.get_description(),
-                        inputSchema=input_schema
-                    )
-                    tools.append(tool_info)
-                    logger.debug(f"Added tool to list: {tool_name} with schema: {input_schema}")
-
-                except Exception as e:
-                    logger.error(f"Error processing tool {tool_name}: {e}")
+            # 支持的输出形式放在 _meta 中，不属于 inputSchema
+            tools = [
+                Tool(
+                    name=info["name"],
+                    description=info["description"],
+                    inputSchema=info["input_schema"],
+                    _meta={"output_modes": info["output_modes"]},
+                )
+                for info in self.registry.list_tools()
+            ]
 
             logger.info(f"Returning {len(tools)} tools")
             return tools
@@ -117,27 +103,66 @@ class DailyToolsMCPServer:
             """处理工具调用请求"""
             logger.info(f"Received call_tool request: {name} with arguments: {arguments}")
 
-            try:
-                if name not in self.tools:
-                    error_msg = f"Tool '{name}' not found. Available tools: {list(self.tools.keys())}"
-                    logger.error(error_msg)
-                    return [TextContent(type="text", text=f"Error: {error_msg}")]
-
-                tool_instance = self.tools[name]
-
-                # 调用工具 (这里逻辑保持不变)
-                result = await tool_instance.execute(arguments)
-
-                logger.info(f"Tool {name} executed successfully")
-                return [TextContent(type="text", text=str(result))]
+            # 未知工具和执行异常都由注册表转换成 "Error: ..." 文本
+            result = await self.registry.call(name, arguments)
+            return [TextContent(type="text", text=result)]
+
+        @self.server.list_resources()
+        async def handle_list_resources() -> list[Resource]:
+            """列出服务端指标资源"""
+            return [
+                Resource(
+                    uri=TOOL_CACHE_STATS_URI,
+                    name="tool_cache_stats",
+                    description="Tool result cache entries and per-tool hit/miss counters",
+                    mimeType="application/json",
+                )
+            ]
 
-            except Exception as e:
-                error_msg = f"Error executing tool {name}: {str(e)}"
-                logger.error(error_msg, exc_info=True)  # 添加 exc_info=True 方便调试
-                return [TextContent(type="text", text=f"Error: {error_msg}")]
+        @self.server.read_resource()
+        async def handle_read_resource(uri) -> str:
+            """读取工具结果缓存的命中统计"""
+            if str(uri) != TOOL_CACHE_STATS_URI:
+                raise ValueError(f"Unknown resource: {uri}")
+            return json.dumps(get_tool_cache().snapshot(), ensure_ascii=False)
 
-    async def run(self):
+    async def run(self, transport: str = "stdio", host: str = "127.0.0.1", port: int = 8765):
         """运行服务器"""
+        if transport == "http":
+            await self.run_http(host, port)
+        else:
+            await self.run_stdio()
+
+    async def run_http(self, host: str, port: int):
+        """
+        以独立服务运行，通过 streamable HTTP（含 SSE 推送）提供 MCP 接口。
+
+        多个 API worker 可以共享同一个工具服务，每个客户端会话由会话管理器
+        独立维护，请求并发处理。
+        """
+        import uvicorn
+        from starlette.applications import Starlette
+        from starlette.routing import Mount
+
+        # 请求的响应直接以 JSON 返回，不为每个 POST 打开一个 SSE 流；服务端通知仍通过 GET 的 SSE 流推送
+        session_manager = StreamableHTTPSessionManager(app=self.server, json_response=True)
+
+        async def handle_mcp(scope, receive, send):
+            await session_manager.handle_request(scope, receive, send)
+
+        @contextlib.asynccontextmanager
+        async def lifespan(app):
+            async with session_manager.run():
+                logger.info(f"Streamable HTTP server is ready at http://{host}:{port}/mcp")
+                yield
+
+        app = Starlette(routes=[Mount("/mcp", app=handle_mcp)], lifespan=lifespan)
+        config = uvicorn.Config(app, host=host, port=port, log_level="warning")
+        await uvicorn.Server(config).serve()
+        logger.info("Server run loop has exited.")
+
+    async def run_stdio(self):
+        """通过 stdio 运行，由客户端作为子进程启动"""
         logger.info("Server capabilities initialized. Starting stdio server...")
 
         # 使用 stdio_server 运行
@@ -152,7 +177,8 @@ class DailyToolsMCPServer:
                         server_name="daily_tools_mcp",
                         server_version="1.0.0",
                         capabilities=self.server.get_capabilities(
-                            notification_options=NotificationOptions(),
+                            # 声明 tools.listChanged，客户端据此只在收到通知时刷新工具目录
+                            notification_options=NotificationOptions(tools_changed=True),
                             experimental_capabilities={}
                         )
                     )
@@ -164,8 +190,17 @@ class DailyToolsMCPServer:
                 logger.info("Server run loop has exited.")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Daily Tools MCP Server")
+    parser.add_argument("--transport", choices=["stdio", "http"], default="stdio")
+    parser.add_argument("--host", default="127.0.0.1", help="Host for the http transport")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the http transport")
+    return parser.parse_args()
+
+
 async def main():
     """主函数"""
+    args = parse_args()
     logger.info("=" * 50)
     logger.info("Starting Daily Tools MCP Server...")
     logger.info(f"Python version: {sys.version}")
@@ -174,7 +209,7 @@ async def main():
     try:
         # 创建并运行服务器
         server = DailyToolsMCPServer()
-        await server.run()
+        await server.run(args.transport, args.host, args.port)
 
     except KeyboardInterrupt:
         logger.info("Received interrupt signal, shutting down...")
@@ -0,0 +1,124 @@
+"""
+Build adcode_index.tsv, the offline city -> adcode index used by WeatherTool.
+
+    pip install pypinyin
+    python src/daily_tools_mcp/data/build_adcode_index.py path/to/adcodes.csv path/to/56_nations.csv
+
+The inputs are the GB/T 2260 division tables shipped with cpca
+(https://github.com/DQinYuan/chinese_province_city_area_mapper, MIT License),
+whose codes are the same as Amap adcodes. pypinyin is only needed here,
+not at runtime.
+
+Each output line is `key<TAB>rank<TAB>adcode<TAB>name`, sorted by the UTF-8
+bytes of the key so the index can be binary searched through mmap. Keys are
+the full name, the name without its administrative suffix, its pinyin and a
+few English names. Lower ranks win when a key is ambiguous: prefecture
+cities, then provinces, then districts and counties (those of the four
+municipalities first).
+"""
+
+import csv
+import os
+import sys
+
+from pypinyin import lazy_pinyin
+
+OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "adcode_index.tsv")
+
+# 省级名称的后缀，其余名称的后缀按从长到短依次尝试
+PROVINCE_SUFFIXES = [
+    "特别行政区",
+    "维吾尔自治区",
+    "壮族自治区",
+    "回族自治区",
+    "自治区",
+    "省",
+    "市",
+]
+AUTONOMOUS_SUFFIXES = ["自治州", "自治县", "自治旗"]
+SUFFIXES = ["地区", "林区", "新区", "矿区", "市", "区", "县", "盟", "旗"]
+
+MUNICIPALITIES = ("11", "12", "31", "50")
+
+# 拼音与常用英文名不同，或拼音有歧义的名称
+ENGLISH_NAMES = {
+    "810000": ["hong kong"],
+    "820000": ["macau", "macao"],
+    "150000": ["inner mongolia"],
+    "540000": ["tibet"],
+    "610000": ["shaanxi"],
+}
+# 陕西和山西的拼音都是 shanxi，只保留给山西
+SKIP_PINYIN = {"610000"}
+
+
+def normalize(key: str) -> str:
+    return "".join(key.lower().split()).replace("'", "").replace("-", "")
+
+
+def short_name(name: str, adcode: str, nations: list) -> str:
+    if adcode.endswith("0000"):
+        suffixes = PROVINCE_SUFFIXES
+    else:
+        for suffix in AUTONOMOUS_SUFFIXES:
+            if name.endswith(suffix):
+                # 去掉 "自治州" 前面的民族名，如 "延边朝鲜族自治州" -> "延边"
+                stripped = name[: -len(suffix)]
+                changed = True
+                while changed:
+                    changed = False
+                    for nation in nations:
+                        if (
+                            stripped.endswith(nation)
+                            and len(stripped) - len(nation) >= 2
+                        ):
+                            stripped = stripped[: -len(nation)]
+                            changed = True
+                return stripped
+        suffixes = SUFFIXES
+    for suffix in suffixes:
+        if name.endswith(suffix) and len(name) - len(suffix) >= 2:
+            return name[: -len(suffix)]
+    return name
+
+
+def rank(adcode: str) -> int:
+    if adcode.endswith("0000"):
+        return 1
+    if adcode.endswith("00"):
+        return 0
+    return 2 if adcode[:2] in MUNICIPALITIES else 3
+
+
+def main(adcodes_csv: str, nations_csv: str) -> None:
+    with open(nations_csv, encoding="utf-8") as f:
+        nations = [line.strip() for line in f if line.strip()]
+    # 民族名也可能不带 "族" 字出现，如 "塔什库尔干塔吉克自治县"
+    nations += [
+        nation[:-1] for nation in nations if nation.endswith("族") and len(nation) > 2
+    ]
+    nations.sort(key=len, reverse=True)
+
+    rows = set()
+    with open(adcodes_csv, encoding="utf-8") as f:
+        for record in csv.DictReader(f):
+            adcode, name = record["adcode"][:6], record["name"]
+            if name in ("市辖区", "县", "省直辖县级行政区划", "自治区直辖县级行政区划"):
+                continue
+            short = short_name(name, adcode, nations)
+            keys = {name, short}
+            if adcode not in SKIP_PINYIN:
+                keys.add("".join(lazy_pinyin(short)))
+            keys.update(ENGLISH_NAMES.get(adcode, []))
+            for key in keys:
+                rows.add((normalize(key), rank(adcode), adcode, name))
+
+    lines = sorted(rows, key=lambda row: (row[0].encode("utf-8"), row[1], row[2]))
+    with open(OUTPUT, "w", encoding="utf-8", newline="\n") as f:
+        for key, row_rank, adcode, name in lines:
+            f.write(f"{key}\t{row_rank}\t{adcode}\t{name}\n")
+    print(f"Wrote {len(lines)} keys to {OUTPUT}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], sys.argv[2])
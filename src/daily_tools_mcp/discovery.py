@@ -0,0 +1,338 @@
+# src/daily_tools_mcp/discovery.py
+
+import ast
+import hashlib
+import importlib
+import importlib.util
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from importlib.metadata import PackageNotFoundError, entry_points, version
+from typing import Any, Dict, List, Optional, Tuple
+
+import src.config as config
+from src.config import MCP_TOOL_MANIFEST, MCP_TOOL_PLUGIN_DIRS
+
+logger = logging.getLogger(__name__)
+
+# 第三方包通过这个入口点组注册工具，值为 "模块:类名"
+ENTRY_POINT_GROUP = "daily_tools_mcp.tools"
+BUILTIN_TOOLS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools")
+BUILTIN_PACKAGE = "src.daily_tools_mcp.tools"
+# 插件目录中的文件以这个前缀作为模块名导入
+PLUGIN_PACKAGE = "daily_tools_plugins"
+MANIFEST_VERSION = 2
+DISTRIBUTION = "Bupt-manus"
+# 密钥类配置不参与清单的环境哈希
+_SECRET_CONFIG = re.compile(r"KEY|SECRET|SALT|TOKEN|PASSWORD")
+
+
+@dataclass
+class ToolSpec:
+    """Everything needed to list a tool without importing it."""
+
+    name: str
+    description: str
+    input_schema: Dict[str, Any]
+    module: str
+    class_name: str
+    # 插件目录中的文件按路径导入，内置工具和入口点按模块名导入
+    path: Optional[str] = None
+
+
+class LazyTool:
+    """
+    Registry entry that answers list requests from its ToolSpec and imports
+    the implementation module on the first call.
+    """
+
+    def __init__(self, spec: ToolSpec, instance=None):
+        self.spec = spec
+        self.name = spec.name
+        self._instance = instance
+        self._lock = threading.Lock()
+
+    def get_name(self) -> str:
+        return self.spec.name
+
+    def get_description(self) -> str:
+        return self.spec.description
+
+    def get_input_schema(self) -> Dict[str, Any]:
+        return self.spec.input_schema
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def load(self):
+        """Import the module and instantiate the tool, once."""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    started = time.perf_counter()
+                    self._instance = load_tool_class(
+                        self.spec.module, self.spec.class_name, self.spec.path
+                    )()
+                    logger.info(
+                        f"Loaded tool {self.name} from {self.spec.module} in "
+                        f"{(time.perf_counter() - started) * 1000:.1f}ms"
+                    )
+        return self._instance
+
+    async def run(self, arguments: Dict[str, Any]) -> str:
+        return await self.load().run(arguments)
+
+
+def load_tool_class(module_name: str, class_name: str, path: Optional[str] = None):
+    if path and module_name not in sys.modules:
+        module_spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(module_spec)
+        sys.modules[module_name] = module
+        try:
+            module_spec.loader.exec_module(module)
+        except BaseException:
+            sys.modules.pop(module_name, None)
+            raise
+    else:
+        module = importlib.import_module(module_name)
+    return getattr(module, class_name)
+
+
+def find_tool_classes(path: str) -> List[str]:
+    """Names of the classes in `path` that subclass BaseTool, found by parsing instead of importing."""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    classes = []
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        for base in node.bases:
+            base_name = (
+                base.attr
+                if isinstance(base, ast.Attribute)
+                else getattr(base, "id", "")
+            )
+            if base_name == "BaseTool":
+                classes.append(node.name)
+                break
+    return classes
+
+
+def _stamp_file(path: str) -> str:
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def environment_stamp() -> str:
+    """
+    Hash of what tool metadata depends on besides the tool's own file: the
+    built-in tools package (base_tool.py and the shared helpers), the
+    non-secret configuration, and the package and Python versions.
+    """
+    try:
+        package_version = version(DISTRIBUTION)
+    except PackageNotFoundError:
+        package_version = ""
+    files = {
+        filename: _stamp_file(os.path.join(BUILTIN_TOOLS_DIR, filename))
+        for filename in sorted(os.listdir(BUILTIN_TOOLS_DIR))
+        if filename.endswith(".py")
+    }
+    settings = {
+        name: getattr(config, name)
+        for name in config.__all__
+        if not _SECRET_CONFIG.search(name)
+    }
+    payload = json.dumps(
+        [package_version, sys.version.split()[0], files, settings],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ToolManifest:
+    """
+    On-disk cache of tool metadata, keyed by source.
+
+    A source is a plugin file (stamped with its mtime and size) or an entry
+    point (stamped with its distribution version). A source is imported only
+    when its stamp changed since the manifest was written. The whole
+    manifest is discarded when the environment stamp changed.
+    """
+
+    def __init__(self, path: str = MCP_TOOL_MANIFEST, environment: str = ""):
+        self.path = path
+        self.environment = environment
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if (
+                    data.get("version") == MANIFEST_VERSION
+                    and data.get("environment") == environment
+                ):
+                    self.entries = data.get("entries", {})
+            except Exception as e:
+                logger.warning(f"Failed to read tool manifest {path}: {e}")
+
+    def get(self, source: str, stamp: str) -> Optional[List[ToolSpec]]:
+        entry = self.entries.get(source)
+        if entry and entry.get("stamp") == stamp:
+            return [ToolSpec(**tool) for tool in entry["tools"]]
+        return None
+
+    def put(self, source: str, stamp: str, specs: List[ToolSpec]) -> None:
+        self.entries[source] = {
+            "stamp": stamp,
+            "tools": [asdict(spec) for spec in specs],
+        }
+        self.dirty = True
+
+    def save(self, sources: List[str]) -> None:
+        """Write the manifest, dropping sources that no longer exist."""
+        stale = set(self.entries) - set(sources)
+        for source in stale:
+            del self.entries[source]
+        if not self.path or not (self.dirty or stale):
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "version": MANIFEST_VERSION,
+                        "environment": self.environment,
+                        "entries": self.entries,
+                    },
+                    f,
+                    ensure_ascii=False,
+                )
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Failed to write tool manifest {self.path}: {e}")
+
+
+def _describe(
+    module: str, class_name: str, path: Optional[str]
+) -> Tuple[ToolSpec, Any]:
+    """Import one tool to read its metadata; the instance is kept so the import is not paid twice."""
+    started = time.perf_counter()
+    instance = load_tool_class(module, class_name, path)()
+    logger.info(
+        f"Loaded tool {instance.get_name()} from {module} in {(time.perf_counter() - started) * 1000:.1f}ms"
+    )
+    spec = ToolSpec(
+        instance.get_name(),
+        instance.get_description(),
+        instance.get_input_schema(),
+        module,
+        class_name,
+        path,
+    )
+    return spec, instance
+
+
+def _directory_sources(
+    directory: str, package: Optional[str]
+) -> List[Tuple[str, str, Optional[str]]]:
+    """(source key, module name, file path for path imports) for each .py file in `directory`."""
+    sources = []
+    if not os.path.isdir(directory):
+        logger.warning(f"Tool plugin directory not found: {directory}")
+        return sources
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".py") or filename.startswith("_"):
+            continue
+        path = os.path.join(directory, filename)
+        stem = filename[:-3]
+        if package:
+            sources.append((path, f"{package}.{stem}", None))
+        else:
+            sources.append((path, f"{PLUGIN_PACKAGE}.{stem}", path))
+    return sources
+
+
+def discover_tools(
+    plugin_dirs: Optional[List[str]] = None,
+    manifest_path: str = MCP_TOOL_MANIFEST,
+    include_entry_points: bool = True,
+) -> List[LazyTool]:
+    """
+    Find the built-in tools, tools in `plugin_dirs` and tools registered under
+    the `daily_tools_mcp.tools` entry point group, sorted by name.
+
+    Sources whose manifest entry is current are not imported.
+    """
+    started = time.perf_counter()
+    manifest = ToolManifest(manifest_path, environment_stamp())
+    tools: Dict[str, LazyTool] = {}
+    sources: List[str] = []
+    imported = 0
+
+    def add(spec: ToolSpec, instance=None):
+        if spec.name in tools:
+            logger.warning(
+                f"Duplicate tool name {spec.name} from {spec.module}, keeping {tools[spec.name].spec.module}"
+            )
+            return
+        tools[spec.name] = LazyTool(spec, instance)
+
+    file_sources = _directory_sources(BUILTIN_TOOLS_DIR, BUILTIN_PACKAGE)
+    for directory in MCP_TOOL_PLUGIN_DIRS if plugin_dirs is None else plugin_dirs:
+        file_sources += _directory_sources(directory, None)
+
+    for source, module, path in file_sources:
+        sources.append(source)
+        try:
+            stamp = _stamp_file(source)
+            specs = manifest.get(source, stamp)
+            if specs is None:
+                described = [
+                    _describe(module, class_name, path)
+                    for class_name in find_tool_classes(source)
+                ]
+                imported += 1 if described else 0
+                manifest.put(source, stamp, [spec for spec, _ in described])
+                for spec, instance in described:
+                    add(spec, instance)
+            else:
+                for spec in specs:
+                    add(spec)
+        except Exception as e:
+            logger.error(f"Failed to load tools from {source}: {e}", exc_info=True)
+
+    if include_entry_points:
+        for ep in entry_points(group=ENTRY_POINT_GROUP):
+            source = f"entry_point:{ep.name}={ep.value}"
+            sources.append(source)
+            try:
+                stamp = ep.dist.version if ep.dist else ""
+                specs = manifest.get(source, stamp)
+                if specs is None:
+                    spec, instance = _describe(ep.module, ep.attr, None)
+                    imported += 1
+                    manifest.put(source, stamp, [spec])
+                    add(spec, instance)
+                else:
+                    add(specs[0])
+            except Exception as e:
+                logger.error(
+                    f"Failed to load tool entry point {ep.name}: {e}", exc_info=True
+                )
+
+    manifest.save(sources)
+    logger.info(
+        f"Discovered {len(tools)} tools in {(time.perf_counter() - started) * 1000:.1f}ms "
+        f"({imported} of {len(sources)} sources imported to read metadata)"
+    )
+    return [tools[name] for name in sorted(tools)]
@@ -76,9 +76,8 @@ async def main():
         test_args = {}
         if tool_name == "track_logistics":
             test_args = {
-                "com": "shunfeng",
-                "num": "SF3190621662050",
-                "phone": "18138199852"
+                "tracking_number": "SF3190621662050",
+                "phone_number": "18138199852"
             }
         # elif tool_name == "get_weather":
         #     test_args = {"city": "北京", "days": 3}
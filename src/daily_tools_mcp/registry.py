@@ -0,0 +1,99 @@
+# src/daily_tools_mcp/registry.py
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from src.daily_tools_mcp.discovery import LazyTool, discover_tools
+from src.daily_tools_mcp.tools.base_tool import OUTPUT_MODES, BaseTool
+
+logger = logging.getLogger(__name__)
+
+
+class ToolRegistry:
+    """
+    The built-in daily tools, shared by the MCP server and the in-process transport.
+
+    Both sides list and call tools through this class, so schemas and the
+    text of error results are identical whichever transport is used.
+    Listeners are called whenever the tool list changes, the in-process
+    counterpart of `notifications/tools/list_changed`.
+    """
+
+    def __init__(self):
+        self.tools: Dict[str, Union[BaseTool, LazyTool]] = {}
+        self._listeners: List[Callable[[], None]] = []
+
+    def register(
+        self, tool: Union[BaseTool, LazyTool], name: Optional[str] = None
+    ) -> None:
+        name = name or tool.get_name()
+        self.tools[name] = tool
+        logger.info(f"Successfully registered tool: {name}")
+        for listener in list(self._listeners):
+            listener()
+
+    def add_listener(self, listener: Callable[[], None]) -> None:
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def list_tools(self) -> List[Dict[str, Any]]:
+        """Tool descriptions in the same shape as `MCPTools.available_tools`."""
+        tools = []
+        for tool_name, tool_instance in self.tools.items():
+            try:
+                tools.append(
+                    {
+                        "name": tool_name,
+                        "description": tool_instance.get_description(),
+                        "input_schema": tool_instance.get_input_schema(),
+                        # 内置工具都支持 `_output_mode` 参数，客户端据此决定是否传入
+                        "output_modes": list(OUTPUT_MODES),
+                    }
+                )
+            except Exception as e:
+                logger.error(f"Error processing tool {tool_name}: {e}")
+        return tools
+
+    async def call(self, name: str, arguments: Dict[str, Any]) -> str:
+        """Execute a tool. Failures are returned as `Error: ...` text, never raised."""
+        if name not in self.tools:
+            error_msg = (
+                f"Tool '{name}' not found. Available tools: {list(self.tools.keys())}"
+            )
+            logger.error(error_msg)
+            return f"Error: {error_msg}"
+
+        try:
+            result = await self.tools[name].run(arguments)
+            logger.info(f"Tool {name} executed successfully")
+            return str(result)
+        except Exception as e:
+            error_msg = f"Error executing tool {name}: {str(e)}"
+            logger.error(error_msg, exc_info=True)
+            return f"Error: {error_msg}"
+
+
+def create_default_registry() -> ToolRegistry:
+    """Registry with every discovered tool; implementations are imported on first call."""
+    registry = ToolRegistry()
+    for tool in discover_tools():
+        registry.register(tool)
+    return registry
+
+
+_registry: Optional[ToolRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ToolRegistry:
+    """Return the process-wide registry of bundled tools."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = create_default_registry()
+    return _registry
@@ -1,19 +1,24 @@
 """
 日常生活工具集
 
-在这里导入所有工具类，方便管理和使用
+工具类按需导入：工具服务通过 discovery 从清单中注册工具，只有第一次调用时才导入实现模块，
+这里的名称在第一次访问时才加载对应模块
 """
 
-from .logistics_tool import LogisticsTool
+import importlib
 
-# 未来添加更多工具时在这里导入
-from .weather_tool import WeatherTool
-# from .calendar_tool import CalendarTool
-# from .translator_tool import TranslatorTool
+_TOOL_MODULES = {
+    'LogisticsTool': '.logistics_tool',
+    'LogisticsBatchTool': '.logistics_batch_tool',
+    'WeatherTool': '.weather_tool',
+    # 'CalendarTool': '.calendar_tool',
+    # 'TranslatorTool': '.translator_tool',
+}
 
-__all__ = [
-    'LogisticsTool',
-    'WeatherTool',
-    # 'CalendarTool',
-    # 'TranslatorTool',
-]
\ No newline at end of file
+__all__ = list(_TOOL_MODULES)
+
+
+def __getattr__(name):
+    if name in _TOOL_MODULES:
+        return getattr(importlib.import_module(_TOOL_MODULES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,199 @@
+import difflib
+import json
+import logging
+import mmap
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from src.config import ADCODE_CACHE
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data",
+    "adcode_index.tsv",
+)
+
+
+@dataclass
+class AdcodeMatch:
+    adcode: str
+    name: str
+    # exact / qualified / prefix / fuzzy / learned
+    how: str
+
+
+def normalize_query(query: str) -> str:
+    return "".join(query.lower().split()).replace("'", "").replace("-", "")
+
+
+class AdcodeIndex:
+    """
+    Offline city name -> adcode index built by data/build_adcode_index.py.
+
+    The file is opened lazily and memory-mapped; lookups binary search the
+    sorted keys, so nothing is parsed up front and pages are shared between
+    tool server processes.
+    """
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        self._mm: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+
+    def _map(self) -> mmap.mmap:
+        if self._mm is None:
+            with self._lock:
+                if self._mm is None:
+                    with open(self.path, "rb") as f:
+                        self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mm
+
+    def _lower_bound(self, key: bytes) -> int:
+        """Offset of the first line whose key is >= `key`."""
+        mm = self._map()
+        lo, hi = 0, len(mm)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = mm.rfind(b"\n", 0, mid) + 1
+            end = mm.find(b"\n", start)
+            if mm[start : mm.find(b"\t", start)] < key:
+                lo = end + 1
+            else:
+                hi = start
+        return lo
+
+    def _scan(self, key: str, prefix: bool, limit: int = 200) -> List[tuple]:
+        """Rows `(key, rank, adcode, name)` whose key equals (or starts with) `key`."""
+        mm = self._map()
+        target = key.encode("utf-8")
+        pos = self._lower_bound(target)
+        rows = []
+        while pos < len(mm) and len(rows) < limit:
+            end = mm.find(b"\n", pos)
+            if end < 0:
+                end = len(mm)
+            row_key, rank, adcode, name = mm[pos:end].decode("utf-8").split("\t")
+            encoded = row_key.encode("utf-8")
+            if not (encoded.startswith(target) if prefix else encoded == target):
+                break
+            rows.append((row_key, int(rank), adcode, name))
+            pos = end + 1
+        return rows
+
+    @staticmethod
+    def _best(rows: List[tuple], parent: str = "") -> Optional[tuple]:
+        rows = [row for row in rows if row[2].startswith(parent)]
+        return min(rows, key=lambda row: (row[1], len(row[0]), row[2]), default=None)
+
+    def lookup(self, query: str) -> Optional[AdcodeMatch]:
+        """Resolve a city, district or province name (Chinese, pinyin or English)."""
+        key = normalize_query(query)
+        if not key:
+            return None
+
+        row = self._best(self._scan(key, prefix=False))
+        if row:
+            return AdcodeMatch(row[2], row[3], "exact")
+
+        match = self._lookup_qualified(key)
+        if match:
+            return match
+
+        # 前缀匹配：中文至少 2 个字，拼音/英文至少 3 个字母，避免过短的输入误命中
+        if len(key) >= (3 if key.isascii() else 2):
+            row = self._best(self._scan(key, prefix=True))
+            if row:
+                return AdcodeMatch(row[2], row[3], "prefix")
+
+        return self._lookup_fuzzy(key)
+
+    def _lookup_qualified(self, key: str) -> Optional[AdcodeMatch]:
+        """带上级名称的输入，如 "北京朝阳区"、"辽宁省朝阳市"：先匹配上级，再在其下查找"""
+        for split in range(len(key) - 1, 1, -1):
+            parent = self._best(
+                [row for row in self._scan(key[:split], prefix=False) if row[1] <= 1]
+            )
+            if not parent:
+                continue
+            # 省级按前 2 位、地级按前 4 位限定范围
+            scope = parent[2][:2] if parent[2].endswith("0000") else parent[2][:4]
+            rest = key[split:]
+            row = self._best(self._scan(rest, prefix=False), scope) or self._best(
+                self._scan(rest, prefix=True), scope
+            )
+            if row:
+                return AdcodeMatch(row[2], row[3], "qualified")
+        return None
+
+    def _lookup_fuzzy(self, key: str) -> Optional[AdcodeMatch]:
+        """与首字（拼音为前两个字母）相同的键做相似度匹配，容忍错别字和拼写错误"""
+        head = key[:2] if key.isascii() else key[:1]
+        rows = self._scan(head, prefix=True, limit=2000)
+        candidates = difflib.get_close_matches(
+            key, {row[0] for row in rows}, n=1, cutoff=0.75
+        )
+        if not candidates:
+            return None
+        row = self._best([row for row in rows if row[0] == candidates[0]])
+        return AdcodeMatch(row[2], row[3], "fuzzy")
+
+
+class LearnedAdcodes:
+    """Adcodes resolved through the geocoding API, kept on disk so each miss is paid only once."""
+
+    def __init__(self, path: str = ADCODE_CACHE):
+        self.path = path
+        self._entries: Optional[Dict[str, List[str]]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, List[str]]:
+        if self._entries is None:
+            self._entries = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        self._entries = json.load(f)
+                except Exception as e:
+                    logger.warning(f"Failed to read adcode cache: {e}")
+        return self._entries
+
+    def get(self, query: str) -> Optional[AdcodeMatch]:
+        entry = self._load().get(normalize_query(query))
+        return AdcodeMatch(entry[0], entry[1], "learned") if entry else None
+
+    def add(self, query: str, adcode: str, name: str) -> None:
+        with self._lock:
+            entries = self._load()
+            entries[normalize_query(query)] = [adcode, name]
+            if not self.path:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(entries, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.warning(f"Failed to write adcode cache: {e}")
+
+
+_adcode_index: Optional[AdcodeIndex] = None
+_learned_adcodes: Optional[LearnedAdcodes] = None
+
+
+def get_adcode_index() -> AdcodeIndex:
+    global _adcode_index
+    if _adcode_index is None:
+        _adcode_index = AdcodeIndex()
+    return _adcode_index
+
+
+def get_learned_adcodes() -> LearnedAdcodes:
+    global _learned_adcodes
+    if _learned_adcodes is None:
+        _learned_adcodes = LearnedAdcodes()
+    return _learned_adcodes
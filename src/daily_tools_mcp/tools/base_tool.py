@@ -1,11 +1,112 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Union
+import asyncio
+import hashlib
 import json
+import logging
+import random
+import weakref
+
+import httpx
+
+from src.config import TOOL_HTTP_MAX_RETRIES, TOOL_HTTP_TIMEOUT
+from .cache import get_tool_cache
+
+logger = logging.getLogger(__name__)
+
+# 每个事件循环一个共享的 AsyncClient：连接池只能在创建它的循环中使用
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+# 可重试的响应状态码：限流和上游临时故障
+_RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """返回当前事件循环共享的 httpx.AsyncClient（keep-alive 连接池）"""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            follow_redirects=True,
+        )
+        _http_clients[loop] = client
+    return client
+
+
+async def request_with_retries(
+    method: str, url: str, timeout: float, max_retries: int, label: str, **kwargs
+) -> httpx.Response:
+    """
+    通过共享连接池发送请求。连接错误、超时、429 和 5xx 按指数退避重试 `max_retries` 次，
+    最后一次仍失败时抛出 httpx.HTTPError 或返回最后的响应。
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            response = await get_http_client().request(method, url, timeout=timeout, **kwargs)
+            if response.status_code not in _RETRY_STATUS_CODES or attempt == max_retries:
+                return response
+            reason = f"HTTP {response.status_code}"
+        except httpx.TransportError as e:
+            if attempt == max_retries:
+                raise
+            reason = type(e).__name__
+        delay = random.uniform(0, min(4.0, 0.5 * 2 ** attempt))
+        logger.warning(f"{label} request to {url} failed ({reason}), retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+
+# 调用方通过这个保留参数选择输出形式，它不属于工具的 input_schema，也不参与缓存键
+OUTPUT_MODE_ARG = "_output_mode"
+# display：给人看的格式化文本；compact：只含必要字段的紧凑 JSON，给 LLM 用；
+# both：{"compact": ..., "display": ...}，由调用方拆分
+OUTPUT_MODES = ("display", "compact", "both")
+_TOOL_OUTPUT_MARKER = "__tool_output__"
+
+
+@dataclass
+class ToolOutput:
+    """工具的成功结果：`data` 为紧凑的结构化字段，`text` 为格式化的展示文本"""
+
+    data: Any
+    text: str
+
+    def encode(self) -> str:
+        return json.dumps({_TOOL_OUTPUT_MARKER: 1, "data": self.data, "text": self.text}, ensure_ascii=False)
+
+    @staticmethod
+    def decode(value: str) -> Union["ToolOutput", str]:
+        if value.startswith(f'{{"{_TOOL_OUTPUT_MARKER}"'):
+            payload = json.loads(value)
+            return ToolOutput(payload["data"], payload["text"])
+        return value
+
+
+def render_output(result: Union[ToolOutput, str], mode: str) -> str:
+    """按输出形式渲染执行结果；错误提示等纯文本结果在各形式下都原样返回"""
+    if isinstance(result, str):
+        return result
+    compact = json.dumps(result.data, ensure_ascii=False, separators=(",", ":"))
+    if mode == "compact":
+        return compact
+    if mode == "both":
+        return json.dumps({"compact": compact, "display": result.text}, ensure_ascii=False)
+    return result.text
 
 
 class BaseTool(ABC):
     """MCP工具基类"""
 
+    # 上游服务地址，子类从配置中读取，便于切换到代理或本地桩服务
+    base_url: str = ""
+    # 单次请求超时（秒）和瞬时错误的重试次数
+    timeout: float = TOOL_HTTP_TIMEOUT
+    max_retries: int = TOOL_HTTP_MAX_RETRIES
+    # 结果缓存秒数，0 表示不缓存；cache_key_fields 为组成缓存键的参数，None 表示全部参数
+    cache_ttl: float = 0
+    cache_key_fields: Optional[List[str]] = None
+
     def __init__(self):
         self.name = self.get_name()
         self.description = self.get_description()
@@ -27,12 +128,58 @@ class BaseTool(ABC):
         pass
 
     @abstractmethod
-    async def execute(self, arguments: Dict[str, Any]) -> str:
-        """执行工具"""
+    async def execute(self, arguments: Dict[str, Any]) -> Union[ToolOutput, str]:
+        """执行工具：成功时可返回 ToolOutput 以支持紧凑输出，错误提示返回纯文本"""
         pass
 
+    def cache_key(self, arguments: Dict[str, Any]) -> str:
+        """由工具名和 `cache_key_fields` 中的参数组成缓存键"""
+        fields = self.cache_key_fields if self.cache_key_fields is not None else sorted(arguments)
+        values = {field: str(arguments.get(field, "")).strip().lower() for field in fields}
+        digest = hashlib.sha256(json.dumps(values, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+        return f"{self.get_name()}:{digest[:32]}"
+
+    def should_cache(self, result: Union[ToolOutput, str]) -> bool:
+        """是否缓存本次结果；子类据此排除错误提示等失败结果"""
+        return True
+
+    async def _execute_encoded(self, arguments: Dict[str, Any]) -> str:
+        result = await self.execute(arguments)
+        return result.encode() if isinstance(result, ToolOutput) else result
+
+    async def run(self, arguments: Dict[str, Any]) -> str:
+        """
+        执行工具并按 `_output_mode` 参数（默认 display）渲染结果。
+        声明了 `cache_ttl` 时先查缓存，并合并并发的相同调用。
+        """
+        arguments = dict(arguments)
+        mode = arguments.pop(OUTPUT_MODE_ARG, "display")
+        if mode not in OUTPUT_MODES:
+            mode = "display"
+        if self.cache_ttl <= 0:
+            return render_output(await self.execute(arguments), mode)
+        encoded = await get_tool_cache().get_or_run(
+            self.get_name(),
+            self.cache_key(arguments),
+            self.cache_ttl,
+            lambda: self._execute_encoded(arguments),
+            lambda value: self.should_cache(ToolOutput.decode(value)),
+        )
+        return render_output(ToolOutput.decode(encoded), mode)
+
     def validate_arguments(self, arguments: Dict[str, Any], required_fields: list) -> None:
         """验证参数"""
         for field in required_fields:
             if field not in arguments:
                 raise ValueError(f"Missing required field: {field}")
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """
+        通过共享连接池向 `base_url + path` 发送请求，不阻塞事件循环。
+
+        连接错误、超时、429 和 5xx 会按指数退避重试 `max_retries` 次，
+        最后一次仍失败时抛出 httpx.HTTPError；调用方负责 raise_for_status。
+        """
+        return await request_with_retries(
+            method, f"{self.base_url}{path}", self.timeout, self.max_retries, self.get_name(), **kwargs
+        )
@@ -0,0 +1,216 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from src.config import TOOL_CACHE_DB, TOOL_CACHE_MAX_ENTRIES
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.register_ratio("tool_cache_hit_rate", "tool_cache_hits", "tool_cache_lookups")
+
+
+class ToolCache:
+    """
+    TTL cache for tool results: an in-memory LRU, optionally backed by SQLite.
+
+    The SQLite file is written through and read on memory misses, so entries
+    survive restarts and are shared by every tool server process on the host.
+    Concurrent lookups of the same missing key share one execution
+    (singleflight) instead of all calling the upstream API. In `get_or_run`
+    the SQLite reads and writes run in a worker thread, so a slow disk does
+    not stall the tool server's event loop.
+    """
+
+    def __init__(
+        self, max_entries: int = TOOL_CACHE_MAX_ENTRIES, db_path: str = TOOL_CACHE_DB
+    ):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+        self._lock = threading.Lock()
+        # SQLite 访问单独加锁，磁盘较慢时不会挡住内存缓存的读写
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, tool: str, event: str) -> None:
+        with self._lock:
+            tool_stats = self.stats.setdefault(
+                tool, {"hits": 0, "misses": 0, "deduplicated": 0, "stores": 0}
+            )
+            tool_stats[event] += 1
+        metrics.incr(f"tool_cache_{event}")
+        if event in ("hits", "misses"):
+            metrics.incr("tool_cache_lookups")
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if not self.db_path:
+            return None
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._db = sqlite3.connect(
+                self.db_path, check_same_thread=False, isolation_level=None
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tool_cache (key TEXT PRIMARY KEY, expires_at REAL, value TEXT)"
+            )
+        return self._db
+
+    def get(self, key: str) -> Optional[str]:
+        cached = self._get_memory(key)
+        return cached if cached is not None else self._load(key)
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+        self._store(key, expires_at, value)
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                return entry[1]
+            self._entries.pop(key, None)
+        return None
+
+    def _load(self, key: str) -> Optional[str]:
+        """Read `key` from SQLite into the memory cache. Blocking."""
+        if not self.db_path:
+            return None
+        try:
+            with self._db_lock:
+                row = (
+                    self._connect()
+                    .execute(
+                        "SELECT expires_at, value FROM tool_cache WHERE key = ? AND expires_at > ?",
+                        (key, time.time()),
+                    )
+                    .fetchone()
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Tool cache database read failed: {e}")
+            return None
+        if not row:
+            return None
+        with self._lock:
+            self._remember(key, row[0], row[1])
+        return row[1]
+
+    def _store(self, key: str, expires_at: float, value: str) -> None:
+        """Write an entry through to SQLite. Blocking."""
+        if not self.db_path:
+            return
+        try:
+            with self._db_lock:
+                db = self._connect()
+                db.execute(
+                    "INSERT OR REPLACE INTO tool_cache VALUES (?, ?, ?)",
+                    (key, expires_at, value),
+                )
+                self._writes += 1
+                if self._writes % 100 == 0:
+                    db.execute(
+                        "DELETE FROM tool_cache WHERE expires_at <= ?", (time.time(),)
+                    )
+        except sqlite3.Error as e:
+            logger.warning(f"Tool cache database write failed: {e}")
+
+    def _remember(self, key: str, expires_at: float, value: str) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_run(
+        self,
+        tool: str,
+        key: str,
+        ttl: float,
+        run: Callable[[], Awaitable[str]],
+        should_cache: Callable[[str], bool],
+    ) -> str:
+        """Return the cached result for `key`, or run `run()` once for all concurrent callers."""
+        cached = self._get_memory(key)
+        if cached is not None:
+            self._count(tool, "hits")
+            return cached
+
+        # Future 只能在创建它的事件循环中等待，所以按循环分别去重
+        inflight_key = (asyncio.get_running_loop(), key)
+        pending = self._inflight.get(inflight_key)
+        if pending is not None:
+            self._count(tool, "deduplicated")
+            return await asyncio.shield(pending)
+
+        # 先登记为进行中再读 SQLite，读盘期间到达的相同请求也会合并到这里
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[inflight_key] = future
+        try:
+            result = await asyncio.to_thread(self._load, key) if self.db_path else None
+            if result is not None:
+                self._count(tool, "hits")
+            else:
+                self._count(tool, "misses")
+                result = await run()
+                if should_cache(result):
+                    expires_at = time.time() + ttl
+                    with self._lock:
+                        self._remember(key, expires_at, result)
+                    if self.db_path:
+                        await asyncio.to_thread(self._store, key, expires_at, result)
+                    self._count(tool, "stores")
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(inflight_key, None)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "db_path": self.db_path or None,
+                "tools": json.loads(json.dumps(self.stats)),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if not self.db_path:
+            return
+        try:
+            with self._db_lock:
+                self._connect().execute("DELETE FROM tool_cache")
+        except sqlite3.Error as e:
+            logger.warning(f"Tool cache database clear failed: {e}")
+
+
+_tool_cache: Optional[ToolCache] = None
+_tool_cache_lock = threading.Lock()
+
+
+def get_tool_cache() -> ToolCache:
+    """Return the process-wide tool result cache."""
+    global _tool_cache
+    if _tool_cache is None:
+        with _tool_cache_lock:
+            if _tool_cache is None:
+                _tool_cache = ToolCache()
+    return _tool_cache
@@ -0,0 +1,489 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import (
+    CUSTOMER_ID,
+    KUAIDI100_API_KEY,
+    KUAIDI100_BASE_URL,
+    KUAIDI100_CALLBACK_SALT,
+    KUAIDI100_CALLBACK_URL,
+    KUAIDI100_RATE_LIMIT,
+    KUAIDI100_STORE,
+    TOOL_HTTP_MAX_RETRIES,
+    TOOL_HTTP_TIMEOUT,
+)
+from .base_tool import request_with_retries
+
+logger = logging.getLogger(__name__)
+
+# --- 快递公司名称到快递100编码的映射 ---
+COURIER_MAP = {
+    # 顺丰速运 (SF Express)
+    "shunfeng": "shunfeng",
+    "顺丰": "shunfeng",
+    "顺丰速运": "shunfeng",
+    "sf": "shunfeng",
+    "sf express": "shunfeng",
+    # 中通快递 (ZTO Express)
+    "zhongtong": "zhongtong",
+    "中通": "zhongtong",
+    "zto": "zhongtong",
+    # 圆通速递 (YTO Express)
+    "yuantong": "yuantong",
+    "圆通": "yuantong",
+    "yto": "yuantong",
+    # 申通快递 (STO Express)
+    "shentong": "shentong",
+    "申通": "shentong",
+    "sto": "shentong",
+    # 韵达快递 (Yunda Express)
+    "yunda": "yunda",
+    "韵达": "yunda",
+    # 京东物流
+    "jd": "jd",
+    "jingdong": "jd",
+    "京东": "jd",
+    "京东物流": "jd",
+    # 极兔速递
+    "jtexpress": "jtexpress",
+    "极兔": "jtexpress",
+    "极兔速递": "jtexpress",
+    "j&t": "jtexpress",
+    # 德邦快递
+    "debangkuaidi": "debangkuaidi",
+    "德邦": "debangkuaidi",
+    "德邦快递": "debangkuaidi",
+    # 中国邮政 EMS
+    "ems": "ems",
+    "邮政": "ems",
+    "中国邮政": "ems",
+    "邮政ems": "ems",
+}
+
+# 单号格式 -> 快递公司。带字母前缀的格式可以唯一确定快递公司；
+# 纯数字单号各家号段会重叠，只作为用户没有说明快递公司时的候选
+COURIER_PATTERNS: List[Tuple[re.Pattern, str, bool]] = [
+    (re.compile(r"^SF\d{12,13}$"), "shunfeng", True),
+    (re.compile(r"^JD[A-Z0-9]{11,14}$"), "jd", True),
+    (re.compile(r"^YT\d{13,15}$"), "yuantong", True),
+    (re.compile(r"^JT\d{13}$"), "jtexpress", True),
+    (re.compile(r"^DPK\d{12}$"), "debangkuaidi", True),
+    (re.compile(r"^[A-Z]{2}\d{9}CN$"), "ems", True),
+    (re.compile(r"^(73|75|76|78)\d{10}$"), "zhongtong", False),
+    (re.compile(r"^(31|43|46)\d{11}$"), "yunda", False),
+    (re.compile(r"^(77|88)\d{11}$"), "shentong", False),
+]
+
+# 快递100 的 state：3 签收、4 退签、14 拒签，之后状态不会再变化
+FINAL_STATES = {"3", "4", "14"}
+# 查询结果的缓存时间随最后一条轨迹的时间变化：轨迹越久没更新，下一次更新也越不可能很快到来
+MIN_STATUS_TTL = 60
+MAX_STATUS_TTL = 30 * 60
+FINAL_STATUS_TTL = 24 * 60 * 60
+# 进程内查询结果缓存的条数上限，超出后淘汰最久未用的单号
+MAX_STATUS_CACHE = 4096
+
+# 快递100 的 state 编码
+STATE_NAMES = {
+    "0": "在途",
+    "1": "揽收",
+    "2": "疑难",
+    "3": "签收",
+    "4": "退签",
+    "5": "派件",
+    "6": "退回",
+    "7": "转投",
+    "8": "清关",
+    "14": "拒签",
+}
+
+# 快递100 的时间都是北京时间
+CHINA_TZ = timezone(timedelta(hours=8))
+
+
+def courier_code(name: Optional[str]) -> Optional[str]:
+    """将用户易读的公司名转为API代码"""
+    if not name:
+        return None
+    return COURIER_MAP.get(str(name).lower().strip())
+
+
+def detect_couriers(tracking_number: str) -> Tuple[List[str], bool]:
+    """根据单号格式识别快递公司，返回 (候选编码, 是否唯一确定)"""
+    number = tracking_number.strip().upper()
+    candidates = []
+    for pattern, code, unique in COURIER_PATTERNS:
+        if pattern.match(number):
+            if unique:
+                return [code], True
+            candidates.append(code)
+    return candidates, False
+
+
+def resolve_courier(
+    tracking_number: str, courier_company: Optional[str]
+) -> Optional[str]:
+    """单号格式能唯一确定快递公司时以单号为准，否则使用用户给出的公司，最后才用号段猜测"""
+    candidates, unique = detect_couriers(tracking_number)
+    given = courier_code(courier_company)
+    if unique:
+        if given and given != candidates[0]:
+            logger.info(
+                f"Tracking number {tracking_number} belongs to {candidates[0]}, not {given}"
+            )
+        return candidates[0]
+    return given or (candidates[0] if candidates else None)
+
+
+def status_ttl(result: Dict[str, Any], now: Optional[datetime] = None) -> float:
+    """根据签收状态和最后一条轨迹的时间决定查询结果的缓存秒数"""
+    if result.get("ischeck") == "1" or str(result.get("state")) in FINAL_STATES:
+        return FINAL_STATUS_TTL
+    events = result.get("data") or []
+    try:
+        last_event = max(
+            datetime.strptime(event.get("ftime") or event["time"], "%Y-%m-%d %H:%M:%S")
+            for event in events
+        )
+    except (KeyError, ValueError):
+        return MIN_STATUS_TTL
+    now = now or datetime.now(CHINA_TZ).replace(tzinfo=None)
+    age = (now - last_event).total_seconds()
+    return min(max(age / 4, MIN_STATUS_TTL), MAX_STATUS_TTL)
+
+
+def summarize_result(text: str) -> Dict[str, str]:
+    """把查询结果压缩为一行摘要：快递公司、状态、最新轨迹及其时间"""
+    try:
+        result = json.loads(text)
+    except ValueError:
+        return {"com": "", "state": "查询失败", "context": text[:80], "time": ""}
+    if result.get("message") != "ok":
+        return {
+            "com": result.get("com", ""),
+            "state": "查询失败",
+            "context": result.get("message", ""),
+            "time": "",
+        }
+    latest = (result.get("data") or [{}])[0]
+    return {
+        "com": result.get("com", ""),
+        "state": STATE_NAMES.get(
+            str(result.get("state")), str(result.get("state", ""))
+        ),
+        "context": latest.get("context", ""),
+        "time": latest.get("ftime") or latest.get("time", ""),
+    }
+
+
+def compact_result(result: Dict[str, Any], events: int = 3) -> Dict[str, Any]:
+    """给 LLM 的紧凑结果：状态和最近几条轨迹 [时间, 内容]，省略区域解析等其余字段"""
+    return {
+        "num": result.get("nu"),
+        "com": result.get("com"),
+        "state": STATE_NAMES.get(str(result.get("state")), result.get("state")),
+        "signed": result.get("ischeck") == "1",
+        "events": [
+            [event.get("ftime") or event.get("time"), event.get("context")]
+            for event in (result.get("data") or [])[:events]
+        ],
+    }
+
+
+def sign(text: str) -> str:
+    return hashlib.md5(text.encode()).hexdigest().upper()
+
+
+class SubscriptionStore:
+    """订阅过的单号以及快递100推送的最新结果，保存在本地 SQLite 中"""
+
+    def __init__(self, path: str = KUAIDI100_STORE):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS subscriptions ("
+                "com TEXT, num TEXT, subscribed_at REAL, updated_at REAL, last_result TEXT, "
+                "PRIMARY KEY (com, num))"
+            )
+        return self._db
+
+    def is_subscribed(self, com: str, num: str) -> bool:
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT 1 FROM subscriptions WHERE com = ? AND num = ?", (com, num)
+                )
+                .fetchone()
+            )
+        return row is not None
+
+    def mark_subscribed(self, com: str, num: str) -> None:
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR IGNORE INTO subscriptions (com, num, subscribed_at) VALUES (?, ?, ?)",
+                (com, num, time.time()),
+            )
+
+    def save_result(self, com: str, num: str, result: str) -> None:
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO subscriptions (com, num, subscribed_at, updated_at, last_result) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (com, num) DO UPDATE SET updated_at = excluded.updated_at, last_result = excluded.last_result",
+                (com, num, time.time(), time.time(), result),
+            )
+
+    def get_result(self, com: str, num: str) -> Optional[Tuple[float, str]]:
+        """(推送时间, 推送的结果)，没有推送过时返回 None"""
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT updated_at, last_result FROM subscriptions "
+                    "WHERE com = ? AND num = ? AND last_result IS NOT NULL",
+                    (com, num),
+                )
+                .fetchone()
+            )
+        return (row[0], row[1]) if row else None
+
+
+class Kuaidi100Client:
+    """
+    The one kuaidi100 client used by the MCP LogisticsTool and the LangChain
+    track_logistics tool.
+
+    Couriers are detected locally from the tracking number. Query results
+    are cached per number with a TTL derived from the last tracking event.
+    When KUAIDI100_CALLBACK_URL and KUAIDI100_CALLBACK_SALT are both set,
+    every queried number is also subscribed, and pushed updates stored by
+    `handle_callback` answer later questions without polling, until they
+    are older than their status TTL. Without a salt pushes cannot be
+    authenticated, so subscriptions are off and callbacks are rejected.
+    """
+
+    def __init__(
+        self,
+        base_url: str = KUAIDI100_BASE_URL,
+        api_key: Optional[str] = KUAIDI100_API_KEY,
+        customer_id: Optional[str] = CUSTOMER_ID,
+        callback_url: str = KUAIDI100_CALLBACK_URL,
+        callback_salt: str = KUAIDI100_CALLBACK_SALT,
+        store: Optional[SubscriptionStore] = None,
+    ):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.customer_id = customer_id
+        self.callback_url = callback_url
+        self.callback_salt = callback_salt
+        self.store = store or SubscriptionStore()
+        self._status_cache: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = (
+            OrderedDict()
+        )
+        # 实时请求的速率上限（次/秒），按时间槽排队，与调用方所在的事件循环无关
+        self.rate_limit = KUAIDI100_RATE_LIMIT
+        self._next_slot = 0.0
+        self._slot_lock = threading.Lock()
+
+    @property
+    def subscriptions_enabled(self) -> bool:
+        return bool(self.callback_url and self.callback_salt)
+
+    def _cache_status(self, com: str, num: str, expires_at: float, text: str) -> None:
+        self._status_cache[(com, num)] = (expires_at, text)
+        self._status_cache.move_to_end((com, num))
+        while len(self._status_cache) > MAX_STATUS_CACHE:
+            self._status_cache.popitem(last=False)
+
+    async def _throttle(self) -> None:
+        if self.rate_limit <= 0:
+            return
+        with self._slot_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1 / self.rate_limit
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _post(self, path: str, data: Dict[str, str]) -> str:
+        await self._throttle()
+        response = await request_with_retries(
+            "POST",
+            f"{self.base_url}{path}",
+            TOOL_HTTP_TIMEOUT,
+            TOOL_HTTP_MAX_RETRIES,
+            "kuaidi100",
+            data=data,
+        )
+        response.raise_for_status()
+        return response.text
+
+    async def query(
+        self,
+        tracking_number: str,
+        courier_company: Optional[str] = None,
+        phone: str = "",
+        ship_from: str = "",
+        ship_to: str = "",
+    ) -> str:
+        """
+        查询物流轨迹，返回快递100的 JSON 文本。凭证缺失或无法识别快递公司时抛出 ValueError，
+        网络错误抛出 httpx.HTTPError。
+        """
+        if not self.api_key or not self.customer_id:
+            raise ValueError("必须配置 KUAIDI100_API_KEY 和 CUSTOMER_ID。")
+        num = tracking_number.strip()
+        com = resolve_courier(num, courier_company)
+        if not com:
+            raise ValueError(
+                f"无法识别单号 '{num}' 所属的快递公司，请提供快递公司名称。"
+            )
+
+        # 1. 订阅推送过来的结果，超过其状态 TTL 后不再使用
+        if self.subscriptions_enabled:
+            pushed = await asyncio.to_thread(self.store.get_result, com, num)
+            if pushed:
+                pushed_at, text = pushed
+                try:
+                    fresh = pushed_at + status_ttl(json.loads(text)) > time.time()
+                except (ValueError, AttributeError):
+                    fresh = False
+                if fresh:
+                    logger.info(
+                        f"Answering {com} {num} from pushed subscription result"
+                    )
+                    return text
+
+        # 2. 按最后轨迹时间缓存的查询结果
+        cached = self._status_cache.get((com, num))
+        if cached and cached[0] > time.time():
+            self._status_cache.move_to_end((com, num))
+            logger.info(f"Answering {com} {num} from status cache")
+            return cached[1]
+
+        # 3. 实时查询
+        param = {
+            "com": com,
+            "num": num,
+            "phone": phone,
+            "from": ship_from,
+            "to": ship_to,
+            "resultv2": "1",
+            "show": "0",
+            "order": "desc",
+        }
+        param_str = json.dumps(param)
+        logger.info(f"正在为运单号: {num} ({com}) 发送请求")
+        text = await self._post(
+            "/poll/query.do",
+            {
+                "customer": self.customer_id,
+                "param": param_str,
+                "sign": sign(param_str + self.api_key + self.customer_id),
+            },
+        )
+
+        try:
+            result = json.loads(text)
+        except ValueError:
+            return text
+        if result.get("message") == "ok":
+            self._cache_status(com, num, time.time() + status_ttl(result), text)
+            if self.subscriptions_enabled and not await asyncio.to_thread(
+                self.store.is_subscribed, com, num
+            ):
+                await self.subscribe(com, num, phone)
+        return text
+
+    async def subscribe(self, com: str, num: str, phone: str = "") -> bool:
+        """订阅单号的轨迹推送，之后的更新由 `handle_callback` 写入本地存储"""
+        if not self.subscriptions_enabled:
+            # 没有 salt 时无法校验推送的签名，不订阅
+            logger.warning(
+                "Not subscribing: KUAIDI100_CALLBACK_URL and KUAIDI100_CALLBACK_SALT are both required"
+            )
+            return False
+        parameters = {
+            "callbackurl": self.callback_url,
+            "resultv2": "1",
+            "phone": phone,
+            "salt": self.callback_salt,
+        }
+        param = {
+            "company": com,
+            "number": num,
+            "key": self.api_key,
+            "parameters": parameters,
+        }
+        try:
+            text = await self._post(
+                "/poll", {"schema": "json", "param": json.dumps(param)}
+            )
+            response = json.loads(text)
+        except Exception as e:
+            logger.warning(f"Failed to subscribe {com} {num}: {e}")
+            return False
+        # 501 表示重复订阅，同样视为已订阅
+        if response.get("result") or str(response.get("returnCode")) == "501":
+            await asyncio.to_thread(self.store.mark_subscribed, com, num)
+            return True
+        logger.warning(
+            f"kuaidi100 rejected subscription for {com} {num}: {response.get('message')}"
+        )
+        return False
+
+    async def handle_callback(self, param: str, signature: str = "") -> bool:
+        """处理快递100的推送（表单字段 param 和 sign），保存最新结果"""
+        if not self.callback_salt:
+            logger.warning(
+                "Rejected kuaidi100 callback: KUAIDI100_CALLBACK_SALT is not set"
+            )
+            return False
+        if not hmac.compare_digest(sign(param + self.callback_salt), signature or ""):
+            logger.warning("Rejected kuaidi100 callback with an invalid signature")
+            return False
+        try:
+            last_result = json.loads(param)["lastResult"]
+            com, num = last_result["com"], last_result["nu"]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Malformed kuaidi100 callback: {e}")
+            return False
+        await asyncio.to_thread(
+            self.store.save_result,
+            com,
+            num,
+            json.dumps(last_result, ensure_ascii=False),
+        )
+        self._status_cache.pop((com, num), None)
+        logger.info(f"Stored pushed tracking update for {com} {num}")
+        return True
+
+
+_client: Optional[Kuaidi100Client] = None
+
+
+def get_kuaidi100_client() -> Kuaidi100Client:
+    global _client
+    if _client is None:
+        _client = Kuaidi100Client()
+    return _client
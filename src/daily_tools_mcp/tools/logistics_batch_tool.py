@@ -0,0 +1,131 @@
+import asyncio
+import httpx
+import logging
+from typing import Dict, Any, List
+from .base_tool import BaseTool, ToolOutput
+from .kuaidi100 import get_kuaidi100_client, summarize_result
+from src.config import KUAIDI100_MAX_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+
+class LogisticsBatchTool(BaseTool):
+    """批量物流跟踪工具：一次调用查询多个单号，返回紧凑的表格摘要"""
+
+    # 单次调用最多查询的单号数量
+    max_items = 50
+    concurrency = KUAIDI100_MAX_CONCURRENCY
+
+    def __init__(self):
+        super().__init__()
+
+    def get_name(self) -> str:
+        return "logistics_tracking_batch"
+
+    def get_description(self) -> str:
+        return (
+            f"批量查询多个包裹的物流状态（最多 {self.max_items} 个），返回每个单号的快递公司、状态和最新轨迹的表格。"
+            "用户一次给出多个快递单号时使用本工具，一次调用即可，不要逐个调用 logistics_tracking。"
+        )
+
+    def get_input_schema(self) -> Dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "shipments": {
+                    "type": "array",
+                    "description": "要查询的包裹列表。",
+                    "maxItems": self.max_items,
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "tracking_number": {
+                                "type": "string",
+                                "description": "快递单号。",
+                            },
+                            "courier_company": {
+                                "type": "string",
+                                "description": "可选，快递公司名称，未提供时根据单号自动识别。",
+                            },
+                            "phone_number": {
+                                "type": "string",
+                                "description": "可选，收件人或寄件人的手机号码（通常是后四位）。",
+                            },
+                        },
+                        "required": ["tracking_number"],
+                    },
+                }
+            },
+            "required": ["shipments"],
+        }
+
+    async def _query_one(
+        self, semaphore: asyncio.Semaphore, shipment: Dict[str, Any]
+    ) -> Dict[str, str]:
+        number = str(shipment.get("tracking_number", "")).strip()
+        async with semaphore:
+            try:
+                text = await get_kuaidi100_client().query(
+                    number,
+                    shipment.get("courier_company"),
+                    shipment.get("phone_number", ""),
+                )
+                row = summarize_result(text)
+            except (ValueError, httpx.HTTPError) as e:
+                row = {"com": "", "state": "查询失败", "context": str(e), "time": ""}
+            except Exception as e:
+                logger.error(f"批量查询 {number} 时发生未知错误: {e}", exc_info=True)
+                row = {"com": "", "state": "查询失败", "context": str(e), "time": ""}
+        row["num"] = number
+        return row
+
+    @staticmethod
+    def _format_table(rows: List[Dict[str, str]]) -> str:
+        lines = ["| 单号 | 快递 | 状态 | 最新轨迹 | 时间 |", "|---|---|---|---|---|"]
+        for row in rows:
+            context = " ".join(row["context"].split()).replace("|", "/")
+            lines.append(
+                f"| {row['num']} | {row['com']} | {row['state']} | {context} | {row['time']} |"
+            )
+        return "\n".join(lines)
+
+    async def execute(self, arguments: Dict[str, Any]):
+        try:
+            self.validate_arguments(arguments, self.get_input_schema()["required"])
+        except ValueError as e:
+            return f"参数错误: {e}"
+        shipments = [
+            s
+            for s in arguments["shipments"]
+            if isinstance(s, dict) and s.get("tracking_number")
+        ]
+        if not shipments:
+            return "参数错误: shipments 中没有有效的快递单号。"
+
+        # 同一单号只查一次
+        by_number: Dict[str, Dict[str, Any]] = {}
+        for shipment in shipments:
+            by_number.setdefault(str(shipment["tracking_number"]).strip(), shipment)
+        unique = list(by_number.values())
+        skipped = len(unique) - self.max_items
+        unique = unique[: self.max_items]
+
+        # 并发数由信号量限制，实时请求的速率由客户端限制，缓存命中不占用速率
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        rows = await asyncio.gather(*(self._query_one(semaphore, s) for s in unique))
+
+        failed = sum(1 for row in rows if row["state"] == "查询失败")
+        summary = f"共查询 {len(rows)} 个单号，成功 {len(rows) - failed} 个，失败 {failed} 个。"
+        if skipped > 0:
+            summary += f"超出上限的 {skipped} 个单号未查询，请分批提交。"
+        compact = {
+            "total": len(rows),
+            "failed": failed,
+            "skipped": max(skipped, 0),
+            "columns": ["num", "com", "state", "latest", "time"],
+            "rows": [
+                [row["num"], row["com"], row["state"], row["context"], row["time"]]
+                for row in rows
+            ],
+        }
+        return ToolOutput(compact, f"{summary}\n{self._format_table(rows)}")
@@ -1,9 +1,10 @@
 import json
-import requests
+import httpx
 import logging
 from typing import Dict, Any
-from .base_tool import BaseTool
-from src.config import AMAP_API_KEY
+from .adcode_index import get_adcode_index, get_learned_adcodes
+from .base_tool import BaseTool, ToolOutput
+from src.config import AMAP_API_KEY, AMAP_BASE_URL, WEATHER_CACHE_TTL
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +12,10 @@ logger = logging.getLogger(__name__)
 class WeatherTool(BaseTool):
     """天气查询工具，继承自 BaseTool"""
 
+    base_url = AMAP_BASE_URL
+    cache_ttl = WEATHER_CACHE_TTL
+    cache_key_fields = ["city", "extensions"]
+
     def __init__(self):
         super().__init__()
 
@@ -41,7 +46,11 @@ class WeatherTool(BaseTool):
             "required": ["city"]
         }
 
-    def _get_geo_info(self, city_name: str) -> Dict[str, Any]:
+    def should_cache(self, result) -> bool:
+        # 只缓存查询成功的结果，参数错误和网络错误是纯文本，不缓存
+        return isinstance(result, ToolOutput)
+
+    async def _get_geo_info(self, city_name: str) -> Dict[str, Any]:
         """
         使用高德地图地理编码API获取城市的详细信息
         这样可以支持更灵活的城市名称输入
@@ -49,7 +58,6 @@ class WeatherTool(BaseTool):
         if not AMAP_API_KEY:
             return None
 
-        geo_url = 'https://restapi.amap.com/v3/geocode/geo'
         geo_params = {
             'address': city_name,
             'key': AMAP_API_KEY,
@@ -57,7 +65,7 @@ class WeatherTool(BaseTool):
         }
 
         try:
-            response = requests.get(geo_url, params=geo_params, timeout=10)
+            response = await self.request("GET", "/v3/geocode/geo", params=geo_params)
             response.raise_for_status()
             geo_data = response.json()
 
@@ -74,7 +82,7 @@ class WeatherTool(BaseTool):
 
         return None
 
-    def _validate_and_normalize_city(self, city: str) -> str:
+    async def _validate_and_normalize_city(self, city: str) -> str:
         """
         验证并标准化城市输入
         高德天气API支持多种城市输入格式，这里做基本的预处理
@@ -88,19 +96,26 @@ class WeatherTool(BaseTool):
         if city.isdigit():
             return city
 
-        # 对于中文城市名，可以尝试获取更准确的adcode
-        geo_info = self._get_geo_info(city)
+        # 先查离线 adcode 索引和之前解析过的结果，省去一次地理编码请求
+        match = get_learned_adcodes().get(city) or get_adcode_index().lookup(city)
+        if match:
+            logger.info(f"将城市名称 '{city}' 转换为adcode: {match.adcode} ({match.name}, {match.how})")
+            return match.adcode
+
+        # 索引未命中时才调用地理编码API，并把结果写回本地缓存
+        geo_info = await self._get_geo_info(city)
         if geo_info and geo_info.get('adcode'):
             logger.info(f"将城市名称 '{city}' 转换为adcode: {geo_info['adcode']}")
+            get_learned_adcodes().add(city, geo_info['adcode'], geo_info.get('formatted_address') or city)
             return geo_info['adcode']
 
         # 如果获取不到地理编码信息，直接使用原始输入
         # 高德API通常能够识别大部分城市名称
         return city
 
-    async def execute(self, arguments: Dict[str, Any]) -> str:
+    async def execute(self, arguments: Dict[str, Any]):
         """
-        执行天气查询
+        执行天气查询，成功时返回 ToolOutput（紧凑字段 + 格式化文本），失败时返回错误提示
         """
         try:
             # 提取参数
@@ -108,7 +123,7 @@ class WeatherTool(BaseTool):
             extensions = arguments.get("extensions", "base")
 
             # 验证和标准化城市输入
-            normalized_city = self._validate_and_normalize_city(city)
+            normalized_city = await self._validate_and_normalize_city(city)
 
         except ValueError as e:
             return f"参数错误: {e}"
@@ -120,7 +135,6 @@ class WeatherTool(BaseTool):
             return "错误: 必须配置 AMAP_API_KEY。请在环境变量中设置您的高德地图API密钥。"
 
         # 构造请求参数
-        url = 'https://restapi.amap.com/v3/weather/weatherInfo'
         params = {
             'city': normalized_city,
             'key': api_key,
@@ -131,7 +145,7 @@ class WeatherTool(BaseTool):
         # 发送请求
         logger.info(f"正在查询城市: {city} (标准化后: {normalized_city}) 的天气信息")
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = await self.request("GET", "/v3/weather/weatherInfo", params=params)
             response.raise_for_status()
 
             # 解析响应
@@ -145,11 +159,13 @@ class WeatherTool(BaseTool):
                 if lives:
                     # 实时天气
                     weather_info = lives[0]
-                    return self._format_live_weather(weather_info)
+                    return ToolOutput(self._compact_live_weather(weather_info), self._format_live_weather(weather_info))
                 elif forecasts:
                     # 天气预报
                     forecast_info = forecasts[0]
-                    return self._format_forecast_weather(forecast_info)
+                    return ToolOutput(
+                        self._compact_forecast_weather(forecast_info), self._format_forecast_weather(forecast_info)
+                    )
                 else:
                     return f"未找到城市 '{city}' 的天气信息，请检查城市名称是否正确。"
 
@@ -166,7 +182,7 @@ class WeatherTool(BaseTool):
                     logger.error(f"天气API返回错误: {error_msg} (代码: {error_code})")
                     return f"天气API错误: {error_msg}"
 
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"天气API请求失败: {e}", exc_info=True)
             return f"网络请求失败: {e}。请检查网络连接后重试。"
         except json.JSONDecodeError as e:
@@ -176,6 +192,34 @@ class WeatherTool(BaseTool):
             logger.error(f"天气查询时发生未知错误: {e}", exc_info=True)
             return f"查询出错: {e}"
 
+    def _compact_live_weather(self, weather_info: Dict[str, Any]) -> Dict[str, Any]:
+        """实时天气的紧凑字段：温度单位 °C，湿度单位 %"""
+        return {
+            "city": weather_info.get('city'),
+            "weather": weather_info.get('weather'),
+            "temp": weather_info.get('temperature'),
+            "humidity": weather_info.get('humidity'),
+            "wind": f"{weather_info.get('winddirection', '')}{weather_info.get('windpower', '')}级",
+            "time": weather_info.get('reporttime'),
+        }
+
+    def _compact_forecast_weather(self, forecast_info: Dict[str, Any]) -> Dict[str, Any]:
+        """天气预报的紧凑字段：每天一项 [日期, 白天天气, 夜间天气, 最高温, 最低温, 白天风力]"""
+        return {
+            "city": forecast_info.get('city'),
+            "days": [
+                [
+                    cast.get('date'),
+                    cast.get('dayweather'),
+                    cast.get('nightweather'),
+                    cast.get('daytemp'),
+                    cast.get('nighttemp'),
+                    f"{cast.get('daywind', '')}{cast.get('daypower', '')}级",
+                ]
+                for cast in forecast_info.get('casts', [])
+            ],
+        }
+
     def _format_live_weather(self, weather_info: Dict[str, Any]) -> str:
         """格式化实时天气信息"""
         city = weather_info.get('city', '未知城市')
@@ -0,0 +1,72 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTasks:
+    """
+    Registry for work that a node starts ahead of the node that consumes it.
+
+    Futures are addressed by an opaque key that is stored in the graph state,
+    so the state itself only ever carries plain data.
+    """
+
+    def __init__(self, max_workers: int = 4, max_age: float = 600.0):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="graph-background"
+        )
+        self._tasks: Dict[str, Tuple[Future, float]] = {}
+        self._lock = threading.Lock()
+        self._max_age = max_age
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> str:
+        """Start `fn` in the background and return the key to collect it with."""
+        key = uuid.uuid4().hex
+        future = self._executor.submit(fn, *args, **kwargs)
+        with self._lock:
+            self._prune()
+            self._tasks[key] = (future, time.monotonic())
+        return key
+
+    def take(self, key: Optional[str]) -> Optional[Future]:
+        """Remove and return the future for `key`, or None if it is unknown."""
+        if not key:
+            return None
+        with self._lock:
+            entry = self._tasks.pop(key, None)
+        return entry[0] if entry else None
+
+    def discard(self, key: Optional[str]) -> None:
+        """
+        Drop the task for `key` because its result will never be used.
+
+        A task that has not started yet is cancelled. A running task cannot be
+        interrupted; it finishes in the background and its result is thrown
+        away, since nobody can collect it any more.
+        """
+        future = self.take(key)
+        if future is None:
+            return
+        if future.cancel():
+            logger.info(f"Cancelled background task {key}")
+        else:
+            future.add_done_callback(
+                lambda _: logger.info(f"Discarded result of background task {key}")
+            )
+
+    def _prune(self):
+        """Drop futures nobody collected within `max_age` seconds."""
+        now = time.monotonic()
+        for key, (future, started) in list(self._tasks.items()):
+            if now - started > self._max_age:
+                future.cancel()
+                del self._tasks[key]
+                logger.debug(f"Discarded stale background task {key}")
+
+
+background_tasks = BackgroundTasks()
@@ -0,0 +1,124 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import HumanMessage
+
+from src.config import TEAM_MEMBERS
+
+RESPONSE_FORMAT = "Response from {}:\n\n<response>\n{}\n</response>\n\n*Please execute the next step.*"
+
+# Worker outputs longer than this are summarized in the conversation
+SUMMARY_MAX_CHARS = 800
+
+
+def summarize_output(content: str, max_chars: int = SUMMARY_MAX_CHARS) -> str:
+    """Compact a worker output for the running conversation, keeping head and tail."""
+    if len(content) <= max_chars:
+        return content
+    head = content[: max_chars * 2 // 3].rstrip()
+    tail = content[-(max_chars // 3) :].lstrip()
+    omitted = len(content) - len(head) - len(tail)
+    return f"{head}\n\n[... {omitted} characters omitted, the full output is kept for the reporter ...]\n\n{tail}"
+
+
+def worker_update(
+    agent_name: str, content: Any, result: Optional[dict] = None
+) -> Dict[str, Any]:
+    """
+    Build the state update for a finished worker.
+
+    The full output goes to the `worker_outputs` side store. The conversation
+    only receives its summary, which is computed once here. `result` is the
+    envelope from `run_worker` and becomes `last_result`.
+    """
+    if not isinstance(content, str):
+        content = str(content)
+    summary = summarize_output(content)
+    status = result["status"] if result else "success"
+    return {
+        "messages": [
+            HumanMessage(
+                content=RESPONSE_FORMAT.format(agent_name, summary), name=agent_name
+            )
+        ],
+        "worker_outputs": [
+            {
+                "agent_name": agent_name,
+                "content": content,
+                "summary": summary,
+                "status": status,
+            }
+        ],
+        "last_result": result,
+    }
+
+
+def is_worker_message(message) -> bool:
+    return getattr(message, "name", None) in TEAM_MEMBERS
+
+
+def expand_worker_outputs(state) -> List:
+    """Return the conversation with every worker summary replaced by its full output."""
+    pending: Dict[str, List[dict]] = {}
+    for output in state.get("worker_outputs", []):
+        pending.setdefault(output["agent_name"], []).append(output)
+
+    messages = []
+    for message in state["messages"]:
+        if is_worker_message(message) and pending.get(message.name):
+            output = pending[message.name].pop(0)
+            if output["summary"] != output["content"]:
+                message = HumanMessage(
+                    content=RESPONSE_FORMAT.format(
+                        output["agent_name"], output["content"]
+                    ),
+                    name=message.name,
+                )
+        messages.append(message)
+    return messages
+
+
+def step_statuses(state) -> List[Dict[str, Any]]:
+    """
+    Match finished worker outputs to the plan steps, in order.
+
+    Each status carries the step itself and the worker output that finished
+    it, or None while the step is still open.
+    """
+    try:
+        steps = json.loads(state.get("full_plan") or "{}").get("steps", [])
+    except json.JSONDecodeError:
+        return []
+
+    # 失败的输出不算完成了步骤
+    pending: Dict[str, List[dict]] = {}
+    for output in state.get("worker_outputs", []):
+        if output.get("status", "success") == "success":
+            pending.setdefault(output["agent_name"], []).append(output)
+
+    statuses = []
+    for index, step in enumerate(steps):
+        agent_name = step.get("agent_name")
+        output = pending[agent_name].pop(0) if pending.get(agent_name) else None
+        statuses.append(
+            {
+                "index": index,
+                "agent_name": agent_name,
+                "title": step.get("title", ""),
+                "step": step,
+                "output": output,
+                "done": output is not None,
+            }
+        )
+    return statuses
+
+
+def progress_message(state) -> HumanMessage:
+    """A compact checklist of the plan for the supervisor."""
+    lines = [
+        f"- [{'x' if status['done'] else ' '}] Step {status['index'] + 1} ({status['agent_name']}): {status['title']}"
+        for status in step_statuses(state)
+    ]
+    return HumanMessage(
+        content="# Plan Progress\n\n" + "\n".join(lines), name="progress"
+    )
@@ -0,0 +1,76 @@
+HANDOFF_TOKEN = "handoff_to_planner"
+
+# The coordinator may wrap the handoff in a code fence despite the prompt.
+_HANDOFF_FORMS = tuple(
+    prefix + HANDOFF_TOKEN for prefix in ("", "```python\n", "```\n", "```")
+)
+
+
+class HandoffDetector:
+    """
+    Recognises the coordinator's `handoff_to_planner` token in a streamed reply.
+
+    `feed` returns the part of every chunk that is safe to show to the user.
+    Text is only held back while it could still turn into the handoff token,
+    so direct answers are forwarded without an artificial delay. The token is
+    looked for in the first `window` chunks; after that the reply is treated
+    as a direct answer.
+    """
+
+    def __init__(self, window: int = 8):
+        self.handoff = False
+        self._window = window
+        self._chunks = 0
+        self._held = ""
+        self._forwarded = False
+        self._decided = False
+
+    def feed(self, chunk: str) -> str:
+        if self.handoff or not chunk:
+            return ""
+        if self._decided:
+            return chunk
+
+        self._chunks += 1
+        pending = self._held + chunk
+        if HANDOFF_TOKEN in pending:
+            self.handoff = True
+            self._held = ""
+            return ""
+
+        if self._chunks >= self._window:
+            self._decided = True
+            self._held = ""
+            return self._forward(pending)
+
+        if not self._forwarded and self._may_become_handoff(pending):
+            self._held = pending
+            return ""
+
+        keep = self._partial_token_length(pending)
+        self._held = pending[len(pending) - keep :] if keep else ""
+        return self._forward(pending[: len(pending) - keep])
+
+    def flush(self) -> str:
+        """Release any text still held back once the reply has finished."""
+        held, self._held = self._held, ""
+        self._decided = True
+        return "" if self.handoff else self._forward(held)
+
+    def _forward(self, text: str) -> str:
+        if text:
+            self._forwarded = True
+        return text
+
+    @staticmethod
+    def _may_become_handoff(text: str) -> bool:
+        stripped = text.lstrip()
+        return any(form.startswith(stripped) for form in _HANDOFF_FORMS)
+
+    @staticmethod
+    def _partial_token_length(text: str) -> int:
+        """Length of the longest suffix of `text` that starts the handoff token."""
+        for length in range(min(len(text), len(HANDOFF_TOKEN) - 1), 0, -1):
+            if text.endswith(HANDOFF_TOKEN[:length]):
+                return length
+        return 0
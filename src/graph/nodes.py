@@ -1,41 +1,87 @@
 import logging
 import json
-from copy import deepcopy
-from typing import Literal
-from langchain_core.messages import HumanMessage
+import time
+import uuid
+from typing import Literal, Optional
+from langchain_core.callbacks import dispatch_custom_event
+from langchain_core.messages import AIMessage, HumanMessage
 from langgraph.types import Command
 from langgraph.graph import END
+from pydantic import ValidationError
 
 from src.agents import research_agent, coder_agent, browser_agent, get_life_tools_agent,get_desktop_agent
 from src.agents.llm import get_llm_by_type
-from src.config import TEAM_MEMBERS
-from src.config.agents import AGENT_LLM_MAP
+from src.agents.token_budget import (
+    LLM_TYPE_MODELS,
+    count_messages_tokens,
+    count_text_tokens,
+    prepare_messages,
+)
+from src.classifier import get_fast_path
+from src.config import (
+    TEAM_MEMBERS,
+    PLANNER_EARLY_DISPATCH,
+    COORDINATOR_FAST_PATH,
+    SPECULATIVE_PLANNING,
+)
+from src.config.agents import AGENT_LLM_MAP, EARLY_DISPATCH_AGENTS, STRUCTURED_OUTPUT_LLM_TYPES
+from src.metrics import metrics
 from src.prompts.template import apply_prompt_template
 from src.tools.search import tavily_tool
-from .types import State, Router
+from .background import background_tasks
+from .compaction import expand_worker_outputs, progress_message, worker_update
+from .handoff import HandoffDetector
+from .plan_parser import IncrementalPlanParser
+from .projection import project_step_input, project_worker_input
+from .retry import RetryPolicy, route_signature, run_worker
+from .speculation import Speculation, cancel_speculation, commit_speculation, start_speculation
+from .types import State, Router, Plan
 
 logger = logging.getLogger(__name__)
 
-RESPONSE_FORMAT = "Response from {}:\n\n<response>\n{}\n</response>\n\n*Please execute the next step.*"
+metrics.register_ratio("planner_parse_success_rate", "planner_plans_parsed", "planner_plans_total")
+
+retry_policy = RetryPolicy()
+
+def emit_message(content: str, message_id: Optional[str] = None):
+    """Send a message that was not produced by a streaming LLM call to the client."""
+    dispatch_custom_event(
+        "agent_message", {"message_id": message_id or uuid.uuid4().hex, "content": content}
+    )
+
+
+def _take_early_result(state: State, agent_name: str):
+    """Collect the result of a plan step dispatched while the planner was still streaming."""
+    early_dispatch = state.get("early_dispatch")
+    if not early_dispatch or early_dispatch.get("agent_name") != agent_name:
+        return None
+    future = background_tasks.take(early_dispatch.get("key"))
+    if future is None:
+        return None
+    try:
+        result = future.result(timeout=300)
+        logger.info(f"Using early dispatched result for {agent_name}")
+        return result
+    except Exception as e:
+        logger.warning(f"Early dispatched {agent_name} task failed, running it again: {e}")
+        return None
 
 
 def research_node(state: State) -> Command[Literal["supervisor"]]:
     """Node for the researcher agent that performs research tasks."""
     logger.info("Research agent starting task")
-    result = research_agent.invoke(state)
+
+    def run():
+        result = _take_early_result(state, "researcher") or research_agent.invoke(
+            project_worker_input(state, "researcher")
+        )
+        return result["messages"][-1].content
+
+    content, result = run_worker("researcher", run)
     logger.info("Research agent completed task")
-    logger.debug(f"Research agent response: {result['messages'][-1].content}")
+    logger.debug(f"Research agent response: {content}")
     return Command(
-        update={
-            "messages": [
-                HumanMessage(
-                    content=RESPONSE_FORMAT.format(
-                        "researcher", result["messages"][-1].content
-                    ),
-                    name="researcher",
-                )
-            ]
-        },
+        update=worker_update("researcher", content, result),
         goto="supervisor",
     )
 
@@ -43,20 +89,18 @@ def research_node(state: State) -> Command[Literal["supervisor"]]:
 def code_node(state: State) -> Command[Literal["supervisor"]]:
     """Node for the coder agent that executes Python code."""
     logger.info("Code agent starting task")
-    result = coder_agent.invoke(state)
+
+    def run():
+        result = _take_early_result(state, "coder") or coder_agent.invoke(
+            project_worker_input(state, "coder")
+        )
+        return result["messages"][-1].content
+
+    content, result = run_worker("coder", run)
     logger.info("Code agent completed task")
-    logger.debug(f"Code agent response: {result['messages'][-1].content}")
+    logger.debug(f"Code agent response: {content}")
     return Command(
-        update={
-            "messages": [
-                HumanMessage(
-                    content=RESPONSE_FORMAT.format(
-                        "coder", result["messages"][-1].content
-                    ),
-                    name="coder",
-                )
-            ]
-        },
+        update=worker_update("coder", content, result),
         goto="supervisor",
     )
 
@@ -65,13 +109,14 @@ def browser_node(state: State) -> Command[Literal["supervisor"]]:
     """Node for the browser agent that performs web browsing tasks."""
     logger.info("Browser agent starting task")
 
-    # 处理多模态输入，移除图片信息
-    first_msg = state["messages"][0]
+    # 只传入当前步骤所需的消息，并处理多模态输入，移除图片信息
+    worker_input = project_worker_input(state, "browser")
+    first_msg = worker_input["messages"][0]
     if isinstance(first_msg.content, list):
         first_msg.content = [item for item in first_msg.content if item.get("type") == "text"]
         logger.debug(f"去除图片信息后的内容：{first_msg.content}")
 
-    try:
+    def run():
         # 检查是否在异步上下文中
         try:
             loop = asyncio.get_running_loop()
@@ -79,7 +124,7 @@ def browser_node(state: State) -> Command[Literal["supervisor"]]:
             import concurrent.futures
 
             def run_browser_sync():
-                return browser_agent.invoke(state)
+                return browser_agent.invoke(worker_input)
 
             with concurrent.futures.ThreadPoolExecutor() as executor:
                 future = executor.submit(run_browser_sync)
@@ -87,25 +132,15 @@ def browser_node(state: State) -> Command[Literal["supervisor"]]:
 
         except RuntimeError:
             # 不在异步上下文中，直接调用
-            result = browser_agent.invoke(state)
-
-        logger.info("Browser agent completed task")
-        logger.debug(f"Browser agent response: {result['messages'][-1].content}")
-        response_content = result["messages"][-1].content
+            result = browser_agent.invoke(worker_input)
+        return result["messages"][-1].content
 
-    except Exception as e:
-        logger.exception(f"browser_agent.invoke 执行失败: {e}")
-        response_content = f"Browser agent encountered an error: {str(e)}"
+    response_content, result = run_worker("browser", run)
+    logger.info("Browser agent completed task")
+    logger.debug(f"Browser agent response: {response_content}")
 
     return Command(
-        update={
-            "messages": [
-                HumanMessage(
-                    content=RESPONSE_FORMAT.format("browser", response_content),
-                    name="browser",
-                )
-            ]
-        },
+        update=worker_update("browser", response_content, result),
         goto="supervisor",
     )
 
@@ -114,28 +149,42 @@ def supervisor_node(state: State) -> Command[Literal[*TEAM_MEMBERS, "__end__"]]:
     """Supervisor node that decides which agent should act next."""
     logger.info("Supervisor evaluating next action")
 
-    # --- 新增：重试逻辑 ---
-    MAX_RETRIES = 2  # 设置每个任务的最大重试次数
-    # 初始化或获取重试计数器
-    retry_counts = state.get("task_retry_counts", {})
-
-    # 获取上一个执行的节点名称
-    last_node = state.get("next")
-
-    # 检查上一个节点是否是工具节点并且失败了 (通过检查最后一条消息的内容)
-    # 这是一个简化的判断，您可以根据需要做得更精确
-    if last_node and last_node in TEAM_MEMBERS and "错误" in state["messages"][-1].content:
-        # 增加对应任务的重试次数
-        retry_counts[last_node] = retry_counts.get(last_node, 0) + 1
-        logger.warning(f"任务 '{last_node}' 失败，重试次数: {retry_counts[last_node]}")
-
-        # 如果超过最大重试次数，则强制结束或转到报告节点
-        if retry_counts[last_node] > MAX_RETRIES:
-            logger.error(f"任务 '{last_node}' 已超过最大重试次数，工作流将结束。")
-            return Command(goto="__end__", update={"task_retry_counts": retry_counts})
+    retry_counts = dict(state.get("task_retry_counts") or {})
+
+    # 根据上一个 worker 的结果信封决定是否重试：临时性错误指数退避后重试，永久性错误直接升级
+    last_result = state.get("last_result")
+    if last_result and last_result["status"] == "error":
+        failed = last_result["agent_name"]
+        attempts = retry_counts.get(failed, 0)
+        if retry_policy.should_retry(last_result, attempts):
+            delay = retry_policy.backoff(attempts)
+            retry_counts[failed] = attempts + 1
+            metrics.incr("worker_retries")
+            logger.warning(
+                f"任务 '{failed}' 失败 ({last_result['error_class']})，{delay:.1f}s 后第 {attempts + 1} 次重试"
+            )
+            time.sleep(delay)
+            return Command(
+                goto=failed,
+                update={"next": failed, "task_retry_counts": retry_counts, "last_result": None},
+            )
+
+        goto = "__end__" if failed == "reporter" else "reporter"
+        metrics.incr("worker_escalations")
+        logger.error(f"任务 '{failed}' 失败 ({last_result['error_class']})，不再重试，转到 {goto}")
+        return Command(
+            goto=goto,
+            update={"next": goto, "task_retry_counts": retry_counts, "last_result": None},
+        )
+    if last_result:
+        retry_counts[last_result["agent_name"]] = 0
 
     # --- 原有逻辑开始 ---
+    # 消息历史中的 worker 结果已是摘要，再附上计划各步骤的完成情况
     messages = apply_prompt_template("supervisor", state)
+    if state.get("full_plan"):
+        messages.append(progress_message(state))
+    messages = prepare_messages("supervisor", messages)
     response = (
         get_llm_by_type(AGENT_LLM_MAP["supervisor"])
         .with_structured_output(Router)
@@ -145,96 +194,107 @@ def supervisor_node(state: State) -> Command[Literal[*TEAM_MEMBERS, "__end__"]]:
     logger.debug(f"Current state messages: {state['messages']}")
     logger.debug(f"Supervisor response: {response}")
 
+    route_history = list(state.get("route_history") or [])
     if goto == "FINISH":
         goto = "__end__"
         logger.info("Workflow completed")
     else:
-        logger.info(f"Supervisor delegating to: {goto}")
-        # 如果分配了新任务，可以清零它的计数器（可选，但推荐）
-        retry_counts[goto] = 0
-
-    return Command(goto=goto, update={"next": goto, "task_retry_counts": retry_counts})
-
-
-def convert_yaml_like_to_json(yaml_like_text: str) -> str:
-    """尝试将类似 YAML 的文本转换为 JSON 格式"""
-    try:
-        import re
-
-        # 提取 thought, title, 和 steps 部分
-        thought_match = re.search(r'thought:\s*(.*?)(?=\n\w+:|$)', yaml_like_text, re.DOTALL)
-        title_match = re.search(r'title:\s*(.*?)(?=\n\w+:|$)', yaml_like_text, re.DOTALL)
-
-        thought = thought_match.group(1).strip() if thought_match else ""
-        title = title_match.group(1).strip() if title_match else "Generated Plan"
-
-        # 提取 steps 数组
-        steps_match = re.search(r'steps:\s*\[(.*?)\]', yaml_like_text, re.DOTALL)
-        if not steps_match:
-            return None
-
-        steps_text = steps_match.group(1)
+        # 同一个 worker 在输出没有任何变化的情况下被再次选中，说明陷入了死循环
+        outputs = state.get("worker_outputs") or []
+        signature = route_signature(goto, outputs[-1] if outputs else None)
+        if signature in route_history:
+            reported = any(output["agent_name"] == "reporter" for output in outputs)
+            metrics.incr("supervisor_loops_detected")
+            logger.error(f"Supervisor is looping on {goto}")
+            goto = "__end__" if reported or goto == "reporter" else "reporter"
+        else:
+            route_history.append(signature)
+            logger.info(f"Supervisor delegating to: {goto}")
 
-        # 解析每个 step
-        steps = []
-        step_pattern = r'\{\s*agent_name:\s*"([^"]+)",\s*title:\s*"([^"]+)",\s*description:\s*"([^"]+)"(?:,\s*note:\s*"([^"]+)")?\s*\}'
+    return Command(
+        goto=goto,
+        update={"next": goto, "task_retry_counts": retry_counts, "route_history": route_history},
+    )
 
-        for match in re.finditer(step_pattern, steps_text):
-            step = {
-                "agent_name": match.group(1),
-                "title": match.group(2),
-                "description": match.group(3)
-            }
-            if match.group(4):  # note 是可选的
-                step["note"] = match.group(4)
-            steps.append(step)
 
-        # 构建 JSON 结构
-        json_structure = {
-            "thought": thought,
-            "title": title,
-            "steps": steps
-        }
+_EARLY_DISPATCH_RUNNERS = {
+    "researcher": research_agent.invoke,
+    "coder": coder_agent.invoke,
+}
 
-        return json.dumps(json_structure, ensure_ascii=False, indent=2)
 
-    except Exception as e:
-        logger.error(f"Error converting YAML-like format: {e}")
+def _dispatch_early_step(state: State, step: dict):
+    """Start the first plan step on its worker while the planner keeps writing."""
+    agent_name = step.get("agent_name")
+    if agent_name not in EARLY_DISPATCH_AGENTS or agent_name not in _EARLY_DISPATCH_RUNNERS:
         return None
 
+    # 第一个步骤没有前序依赖，只需要用户请求和步骤本身
+    key = background_tasks.submit(
+        _EARLY_DISPATCH_RUNNERS[agent_name], project_step_input(state, agent_name, step)
+    )
+    logger.info(f"Early dispatched first plan step to {agent_name}")
+    return {"key": key, "agent_name": agent_name}
 
-def create_basic_plan_json(original_text: str) -> str:
-    """创建一个基本的 JSON 计划结构"""
-    # 尝试从原始文本中提取有用信息
-    import re
-
-    # 查找是否提到了特定的 agent
-    agent_mentions = re.findall(r'(coder|researcher|browser|reporter|life_tools)', original_text.lower())
-
-    # 默认使用 coder，或者使用找到的第一个 agent
-    agent_name = agent_mentions[0] if agent_mentions else "coder"
-
-    # 创建基本计划
-    plan = {
-        "thought": "Processing user request for 3D animation",
-        "title": "3D Animation Display Plan",
-        "steps": [
-            {
-                "agent_name": agent_name,
-                "title": "Create and run 3D animation",
-                "description": "Generate Python code to create a 3D animation using matplotlib and execute it",
-                "note": "Ensure matplotlib and numpy are available"
-            }
-        ]
-    }
-
-    return json.dumps(plan, ensure_ascii=False, indent=2)
 
 def planner_node(state: State) -> Command[Literal["supervisor", "__end__"]]:
     """
     Planner node that generates the full plan.
     It dynamically selects a vision-capable LLM if an image is present in the input.
     """
+    early_dispatch = None
+
+    # 投机规划：协调器运行时已经并行生成了计划，直接提交
+    plan = commit_speculation(state.get("speculation_key"))
+    if plan is not None:
+        logger.info("Committing speculative plan")
+        for index, step in enumerate(plan.steps):
+            dispatch_custom_event("plan_step", {"index": index, "step": step.model_dump(exclude_none=True)})
+        emit_message(plan.model_dump_json(indent=2, exclude_none=True))
+    else:
+        def on_step(index: int, step: dict):
+            nonlocal early_dispatch
+            dispatch_custom_event("plan_step", {"index": index, "step": step})
+            if index == 0 and PLANNER_EARLY_DISPATCH:
+                early_dispatch = _dispatch_early_step(state, step)
+
+        try:
+            plan = generate_plan(state, on_step=on_step)
+        except BaseException:
+            if early_dispatch:
+                background_tasks.discard(early_dispatch["key"])
+            raise
+
+    if plan is None:
+        # 没有计划就不会有 worker 来取提前派发的结果，取消它或丢弃它的结果
+        if early_dispatch:
+            background_tasks.discard(early_dispatch["key"])
+        reply = "Sorry, I could not create a valid plan for this request. Please rephrase it and try again."
+        emit_message(reply)
+        return Command(
+            update={"messages": [HumanMessage(content=reply, name="planner")]},
+            goto="__end__",
+        )
+
+    full_plan = plan.model_dump_json(indent=2, exclude_none=True)
+    return Command(
+        update={
+            "messages": [HumanMessage(content=full_plan, name="planner")],
+            "full_plan": full_plan,
+            "early_dispatch": early_dispatch,
+        },
+        goto="supervisor",
+    )
+
+
+def generate_plan(state: State, on_step=None, speculation: Speculation = None) -> Optional[Plan]:
+    """
+    Generate and validate the plan for the current state.
+
+    `on_step(index, step)` is called for every step as soon as it has been
+    streamed. When running speculatively, generation stops early once the
+    speculation is cancelled and None is returned.
+    """
     logger.info("Planner generating full plan")
 
     # 1. Preparar los mensajes para el LLM
@@ -246,18 +306,19 @@ def planner_node(state: State) -> Command[Literal["supervisor", "__end__"]]:
     is_multimodal_input = isinstance(last_message.content, list)
 
     # 3. Seleccionar el LLM dinámicamente
-    llm = None
     if is_multimodal_input:
         logger.info("Multimodal input detected. Using vision LLM for planning.")
         # Usamos el LLM de visión que ya tienes configurado en llm.py
-        llm = get_llm_by_type("vision")
+        llm_type = "vision"
     else:
         logger.info("Text-only input detected. Selecting LLM based on thinking mode.")
         # Mantenemos la lógica original para entradas de solo texto
-        if state.get("deep_thinking_mode"):
-            llm = get_llm_by_type("reasoning")
-        else:
-            llm = get_llm_by_type("basic")
+        llm_type = "reasoning" if state.get("deep_thinking_mode") else "basic"
+    llm = get_llm_by_type(llm_type)
+    supports_structured_output = llm_type in STRUCTURED_OUTPUT_LLM_TYPES
+
+    if speculation and speculation.cancelled:
+        return None
 
     # 4. (Opcional) Añadir resultados de búsqueda si es necesario
     if state.get("search_before_planning"):
@@ -273,119 +334,201 @@ def planner_node(state: State) -> Command[Literal["supervisor", "__end__"]]:
 
         if user_prompt_text:
             searched_content = tavily_tool.invoke({"query": user_prompt_text})
-            messages = deepcopy(messages)
-            messages[
-                -1].content += f"\n\n# Relative Search Results\n\n{json.dumps([{'titile': elem['title'], 'content': elem['content']} for elem in searched_content], ensure_ascii=False)}"
+            search_results = HumanMessage(
+                content=f"# Relative Search Results\n\n{json.dumps([{'titile': elem['title'], 'content': elem['content']} for elem in searched_content], ensure_ascii=False)}"
+            )
+            messages = messages + [search_results]
         else:
             logger.warning("Search before planning was enabled, but no text was found in the user message.")
 
     # 5. Invocar el LLM y procesar la respuesta
+    messages = prepare_messages("planner", messages, llm_type)
     logger.debug(f"Current state messages: {state['messages']}")
-    stream = llm.stream(messages)
-    full_response = ""
-    for chunk in stream:
-        full_response += chunk.content
+    if speculation:
+        # 提示词同样计费，投机结果被丢弃时和生成的 token 一起计入浪费
+        speculation.add_tokens(count_messages_tokens(messages, LLM_TYPE_MODELS[llm_type]))
+    stream_llm = llm.bind(response_format={"type": "json_object"}) if supports_structured_output else llm
+    parser = IncrementalPlanParser()
+    stream = stream_llm.stream(messages)
+    try:
+        for chunk in stream:
+            if speculation:
+                if speculation.cancelled:
+                    logger.info("Speculative planning cancelled")
+                    return None
+                speculation.add_tokens(count_text_tokens(chunk.content, LLM_TYPE_MODELS[llm_type]))
+            for index, step in parser.feed(chunk.content):
+                logger.debug(f"Planner step {index} completed: {step}")
+                if on_step:
+                    on_step(index, step)
+    finally:
+        stream.close()
+    full_response = parser.text
     logger.debug(f"Planner response: {full_response}")
 
-    # 6. 改进的 JSON 处理逻辑
-    # 先清理响应格式
-    if full_response.startswith("```json"):
-        full_response = full_response.removeprefix("```json").strip()
-    if full_response.endswith("```"):
-        full_response = full_response.removesuffix("```").strip()
+    # 6. 校验计划，失败时带着错误信息做一次定向修复
+    metrics.incr("planner_plans_total")
+    try:
+        plan = parse_plan(full_response)
+        metrics.incr("planner_plans_parsed")
+        logger.info("Planner response successfully validated as Plan")
+    except ValidationError as e:
+        logger.warning(f"Planner response failed validation: {e}")
+        plan = repair_plan(llm, supports_structured_output, messages, full_response, e)
+
+    if plan is None:
+        metrics.incr("planner_plans_failed")
+    return plan
+
+
+def parse_plan(response: str) -> Plan:
+    """Validate the planner response against the `Plan` schema."""
+    response = response.strip()
+    if response.startswith("```json"):
+        response = response.removeprefix("```json")
+    if response.endswith("```"):
+        response = response.removesuffix("```")
+    return Plan.model_validate_json(response.strip())
+
+
+def repair_plan(llm, supports_structured_output: bool, messages: list, response: str, error: ValidationError):
+    """Ask the planner once to fix a plan that failed validation."""
+    repair_messages = messages + [
+        AIMessage(content=response),
+        HumanMessage(
+            content=(
+                "The plan above is not a valid `Plan` JSON object. Validation errors:\n\n"
+                f"{error}\n\nReturn the corrected plan as raw JSON only."
+            )
+        ),
+    ]
+    try:
+        if supports_structured_output:
+            plan = llm.with_structured_output(Plan).invoke(repair_messages)
+        else:
+            plan = parse_plan(llm.invoke(repair_messages).content)
+    except (ValidationError, ValueError) as e:
+        # 只处理修复后仍然无效的计划（结构化输出的解析错误也是 ValueError），其他错误照常抛出
+        logger.error(f"Plan repair failed: {e}")
+        return None
 
-    goto = "supervisor"
+    metrics.incr("planner_plans_repaired")
+    logger.info("Planner response repaired")
+    return plan
 
-    # 尝试解析 JSON
-    try:
-        parsed_json = json.loads(full_response)
-        logger.info("Planner response successfully parsed as JSON")
-    except json.JSONDecodeError as e:
-        logger.warning(f"Planner response is not a valid JSON. Error: {e}")
-        logger.info("Attempting to convert YAML-like format to JSON...")
 
-        # 尝试转换类似 YAML 的格式为 JSON
-        try:
-            # 如果响应包含类似 YAML 的结构，尝试转换
-            if "steps:" in full_response and "agent_name:" in full_response:
-                # 简单的启发式转换：将 YAML 风格转换为 JSON
-                converted_response = convert_yaml_like_to_json(full_response)
-                if converted_response:
-                    full_response = converted_response
-                    parsed_json = json.loads(full_response)
-                    logger.info("Successfully converted YAML-like format to JSON")
-                else:
-                    # 如果转换失败，创建一个基本的 JSON 结构
-                    logger.warning("Failed to convert format. Creating basic JSON structure.")
-                    full_response = create_basic_plan_json(full_response)
-                    parsed_json = json.loads(full_response)
-            else:
-                # 如果不是预期的格式，创建基本结构
-                logger.warning("Unexpected format. Creating basic JSON structure.")
-                full_response = create_basic_plan_json(full_response)
-                parsed_json = json.loads(full_response)
-
-        except Exception as conversion_error:
-            logger.error(f"Failed to convert or create valid JSON: {conversion_error}")
-            logger.error(f"Original response: {full_response}")
-            # 最后的备用方案：创建一个简单的默认计划
-            full_response = json.dumps({
-                "thought": "Plan generation failed, using default structure",
-                "title": "Default Plan",
-                "steps": [
-                    {
-                        "agent_name": "coder",
-                        "title": "Execute user request",
-                        "description": "Process the user's request using available tools",
-                        "note": "Fallback plan due to planning format issues"
-                    }
-                ]
-            }, ensure_ascii=False, indent=2)
-            logger.info("Created fallback JSON plan")
+def _latest_user_input(state: State) -> tuple[str, bool]:
+    """Return the text of the latest user message and whether it carries images."""
+    for message in reversed(state["messages"]):
+        if message.type != "human" or getattr(message, "name", None):
+            continue
+        if isinstance(message.content, str):
+            return message.content, False
+        text = " ".join(
+            item.get("text", "") for item in message.content if item.get("type") == "text"
+        )
+        has_image = any(item.get("type") == "image_url" for item in message.content)
+        return text, has_image
+    return "", False
 
-    return Command(
-        update={
-            "messages": [HumanMessage(content=full_response, name="planner")],
-            "full_plan": full_response,
-        },
-        goto=goto,
-    )
+
+def _previous_turn(state: State) -> Optional[str]:
+    """Return the text of the message before the latest user message, None on the first turn."""
+    messages = state["messages"]
+    for i in range(len(messages) - 1, -1, -1):
+        if messages[i].type == "human" and not getattr(messages[i], "name", None):
+            if i == 0:
+                return None
+            content = messages[i - 1].content
+            if isinstance(content, str):
+                return content
+            return " ".join(item.get("text", "") for item in content if item.get("type") == "text")
+    return None
 
 
 def coordinator_node(state: State) -> Command[Literal["planner", "__end__"]]:
     """Coordinator node that communicate with customers."""
     logger.info("Coordinator talking.")
-    messages = apply_prompt_template("coordinator", state)
-    response = get_llm_by_type(AGENT_LLM_MAP["coordinator"]).invoke(messages)
-    logger.debug(f"Current state messages: {state['messages']}")
-    logger.debug(f"reporter response: {response}")
+    user_input, has_image = _latest_user_input(state)
+    # 追问的含义依赖上一轮对话，快速通道的缓存按上一条消息区分
+    context = _previous_turn(state)
+
+    # 快速通道：明显的任务直接交给 planner，简单寒暄直接用模板回复
+    if COORDINATOR_FAST_PATH and not has_image:
+        decision = get_fast_path().classify(user_input, context)
+        if decision is not None and (decision.label == "task" or decision.reply):
+            metrics.incr(f"coordinator_fast_path_{decision.label}")
+            logger.info(f"Coordinator fast path ({decision.source}): {decision.label}")
+            if decision.label == "task":
+                # 没有经过 LLM，handoff 检测器看不到，单独通知服务层
+                dispatch_custom_event("handoff", {"source": decision.source})
+                return Command(goto="planner")
+            emit_message(decision.reply)
+            return Command(goto="__end__")
+        metrics.incr("coordinator_fast_path_miss")
+
+    # 投机规划：看起来像任务时，与协调器并行启动 planner
+    speculation_key = None
+    if SPECULATIVE_PLANNING and get_fast_path().looks_like_task(user_input):
+        logger.info("Starting speculative planning")
+        speculation_key = start_speculation(
+            lambda planner_state, speculation: generate_plan(planner_state, speculation=speculation),
+            state,
+        )
 
-    goto = "__end__"
-    if "handoff_to_planner" in response.content:
-        goto = "planner"
+    messages = prepare_messages("coordinator", apply_prompt_template("coordinator", state))
+    logger.debug(f"Current state messages: {state['messages']}")
 
+    # 流式读取回复，一旦识别出 handoff 就关闭流，取消剩余的生成。
+    # 检测只在这里进行：可以展示的文本由节点转发，服务层不再自行判断
+    detector = HandoffDetector()
+    message_id = None
+    try:
+        stream = get_llm_by_type(AGENT_LLM_MAP["coordinator"]).stream(messages)
+        try:
+            for chunk in stream:
+                message_id = message_id or chunk.id
+                visible = detector.feed(chunk.content)
+                if visible:
+                    emit_message(visible, message_id)
+                if detector.handoff:
+                    logger.info("Handoff detected, aborting coordinator generation")
+                    # 关闭流后不会再有 on_chat_model_end，由服务层据此结束 LLM 事件
+                    dispatch_custom_event("handoff", {"source": "llm"})
+                    break
+        finally:
+            stream.close()
+        held = detector.flush()
+        if held:
+            emit_message(held, message_id)
+    finally:
+        if not detector.handoff:
+            cancel_speculation(speculation_key)
+
+    if COORDINATOR_FAST_PATH and not has_image:
+        get_fast_path().record(user_input, "task" if detector.handoff else "chat", context)
+
+    if detector.handoff:
+        return Command(goto="planner", update={"speculation_key": speculation_key})
     return Command(
-        goto=goto,
+        goto="__end__",
     )
 
 
 def reporter_node(state: State) -> Command[Literal["supervisor"]]:
     """Reporter node that write a final report."""
     logger.info("Reporter write final report")
-    messages = apply_prompt_template("reporter", state)
-    response = get_llm_by_type(AGENT_LLM_MAP["reporter"]).invoke(messages)
+    # reporter 需要完整的 worker 输出，只在这里展开一次
+    messages = apply_prompt_template("reporter", {**state, "messages": expand_worker_outputs(state)})
+    messages = prepare_messages("reporter", messages)
+    content, result = run_worker(
+        "reporter", lambda: get_llm_by_type(AGENT_LLM_MAP["reporter"]).invoke(messages).content
+    )
     logger.debug(f"Current state messages: {state['messages']}")
-    logger.debug(f"reporter response: {response}")
+    logger.debug(f"reporter response: {content}")
 
     return Command(
-        update={
-            "messages": [
-                HumanMessage(
-                    content=RESPONSE_FORMAT.format("reporter", response.content),
-                    name="reporter",
-                )
-            ]
-        },
+        update=worker_update("reporter", content, result),
         goto="supervisor",
     )
 
@@ -397,19 +540,15 @@ def life_tools_node(state: State) -> Command[Literal["supervisor"]]:
     """Node for the life tools agent that handles daily life tasks."""
     logger.info("Life tools agent starting task")
 
-    # 直接获取工具列表进行调试
-    from src.tools.langchain_wrappers import get_langchain_tools
-    available_tools = get_langchain_tools()
-    logger.info(f"Available MCP tools: {[tool.name for tool in available_tools]}")
-
+    # 工具列表和编译好的 Agent 都按工具目录哈希缓存
     life_tools_agent = get_life_tools_agent()
 
     # 修改调试信息 - create_react_agent 返回的是图，不是简单的agent
     logger.info(f"Life tools agent type: {type(life_tools_agent)}")
 
-    try:
+    def run():
         # 调用生活工具 agent
-        result = life_tools_agent.invoke(state)
+        result = life_tools_agent.invoke(project_worker_input(state, "life_tools"))
         logger.info("Life tools agent completed task")
 
         # 检查结果
@@ -422,21 +561,12 @@ def life_tools_node(state: State) -> Command[Literal["supervisor"]]:
             if hasattr(last_msg, 'tool_calls') and last_msg.tool_calls:
                 logger.info(f"Tool calls found: {last_msg.tool_calls}")
 
-        response_content = result["messages"][-1].content
+        return result["messages"][-1].content
 
-    except Exception as e:
-        logger.exception(f"life_tools_agent.invoke failed: {e}")
-        response_content = f"Life tools agent encountered an error: {str(e)}"
+    response_content, result = run_worker("life_tools", run)
 
     return Command(
-        update={
-            "messages": [
-                HumanMessage(
-                    content=RESPONSE_FORMAT.format("life_tools", response_content),
-                    name="life_tools",
-                )
-            ]
-        },
+        update=worker_update("life_tools", response_content, result),
         goto="supervisor",
     )
 
@@ -552,34 +682,21 @@ def desktop_node(state: State) -> Command[Literal["supervisor"]]:
     if "所有桌面任务已完成" in task_description or "所有任务已完成" in task_description:
         logger.info("所有桌面任务已完成，返回完成状态")
         return Command(
-            update={
-                "messages": [
-                    HumanMessage(
-                        content=RESPONSE_FORMAT.format("desktop",
-                                                       "所有桌面任务已成功完成。用户的QQ音乐已打开并播放了指定歌曲。"),
-                        name="desktop",
-                    )
-                ]
-            },
+            update=worker_update("desktop", "所有桌面任务已成功完成。用户的QQ音乐已打开并播放了指定歌曲。"),
             goto="supervisor",
         )
 
     # 调用桌面自动化工具
-    observation = remote_desktop_agent.invoke({"task_description": task_description})
+    observation, result = run_worker(
+        "desktop", lambda: remote_desktop_agent.invoke({"task_description": task_description})
+    )
 
     logger.info("Desktop agent node completed task")
     logger.debug(f"Desktop agent tool observation: {observation}")
 
     # 将工具的执行结果作为一条新消息返回给 supervisor
     return Command(
-        update={
-            "messages": [
-                HumanMessage(
-                    content=RESPONSE_FORMAT.format("desktop", observation),
-                    name="desktop",
-                )
-            ]
-        },
+        update=worker_update("desktop", observation, result),
         goto="supervisor",
     )
 
@@ -590,15 +707,14 @@ def count_completed_desktop_tasks(state: State) -> int:
     """
     completed_count = 0
 
-    # 遍历消息历史，查找来自 desktop 节点且标记为成功的消息
-    for message in state["messages"]:
-        if (hasattr(message, 'name') and
-                message.name == "desktop" and
-                isinstance(message.content, str) and
-                ("completed successfully" in message.content or
-                 "任务完成" in message.content)):
+    # 遍历完整的 worker 输出（消息历史中只有摘要），查找来自 desktop 节点且标记为成功的输出
+    for output in state.get("worker_outputs", []):
+        content = output["content"]
+        if (output["agent_name"] == "desktop" and
+                ("completed successfully" in content or
+                 "任务完成" in content)):
             completed_count += 1
-            logger.debug(f"找到已完成任务 #{completed_count}: {message.content[:100]}...")
+            logger.debug(f"找到已完成任务 #{completed_count}: {content[:100]}...")
 
     return completed_count
 
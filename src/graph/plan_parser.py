@@ -0,0 +1,104 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalPlanParser:
+    """
+    Incrementally scans a streamed planner response and emits every
+    `steps[i]` object as soon as it is syntactically complete.
+
+    The parser only tracks JSON structure (strings, escapes and nesting), so
+    text around the JSON body such as a leading ```json fence is ignored.
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._text = ""
+        self._pos = 0
+
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start: Optional[int] = None
+        self._last_key: Optional[str] = None
+
+        self._steps_depth: Optional[int] = None
+        self._step_start: Optional[int] = None
+        self.steps: List[Dict[str, Any]] = []
+
+    @property
+    def text(self) -> str:
+        """The full response received so far."""
+        if self._buffer:
+            self._text += "".join(self._buffer)
+            self._buffer = []
+        return self._text
+
+    def feed(self, chunk: str) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Feed the next chunk of the response.
+
+        Returns:
+            A list of `(index, step)` tuples for the steps completed by this chunk.
+        """
+        if not chunk:
+            return []
+        self._buffer.append(chunk)
+        text = self.text
+
+        completed = []
+        while self._pos < len(text):
+            i = self._pos
+            char = text[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_key = text[self._string_start + 1 : i]
+                continue
+
+            if char == '"' and self._stack:
+                self._in_string = True
+                self._string_start = i
+            elif char in "{[":
+                if (
+                    char == "["
+                    and len(self._stack) == 1
+                    and self._steps_depth is None
+                    and self._last_key == "steps"
+                ):
+                    self._steps_depth = 2
+                elif char == "{" and self._steps_depth == len(self._stack):
+                    self._step_start = i
+                self._stack.append(char)
+            elif char in "}]" and self._stack:
+                self._stack.pop()
+                if (
+                    char == "}"
+                    and self._step_start is not None
+                    and len(self._stack) == self._steps_depth
+                ):
+                    step = self._load_step(text[self._step_start : i + 1])
+                    self._step_start = None
+                    if step is not None:
+                        completed.append((len(self.steps), step))
+                        self.steps.append(step)
+
+        return completed
+
+    def _load_step(self, raw: str) -> Optional[Dict[str, Any]]:
+        try:
+            step = json.loads(raw)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Skipping malformed plan step: {e}")
+            return None
+        return step if isinstance(step, dict) else None
@@ -0,0 +1,99 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import HumanMessage
+
+from src.config.agents import IMAGE_INPUT_AGENTS
+from .compaction import step_statuses
+
+logger = logging.getLogger(__name__)
+
+
+def user_message(state, keep_images: bool = False) -> Optional[HumanMessage]:
+    """Return the latest message written by the user, without images unless asked to keep them."""
+    for message in reversed(state["messages"]):
+        if message.type != "human" or getattr(message, "name", None):
+            continue
+        if keep_images or isinstance(message.content, str):
+            return message
+        content = [item for item in message.content if item.get("type") == "text"]
+        return HumanMessage(content=content)
+    return None
+
+
+def step_message(step: Dict[str, Any], thought: str = "") -> HumanMessage:
+    """The instruction for a single plan step, as the worker sees it."""
+    content = f"# {step.get('title', '')}\n\n{step.get('description', '')}"
+    if step.get("note"):
+        content += f"\n\nNote: {step['note']}"
+    if thought:
+        content += f"\n\n# Plan Context\n\n{thought}"
+    return HumanMessage(content=content, name="planner")
+
+
+def dependency_messages(
+    statuses: List[dict], step: Dict[str, Any], index: int
+) -> List[HumanMessage]:
+    """
+    Results of earlier steps that `step` needs.
+
+    Declared dependencies get the full output. Plans without `depends_on`
+    fall back to the summaries of every finished step before this one.
+    """
+    depends_on = step.get("depends_on")
+    messages = []
+    for status in statuses[:index]:
+        output = status["output"]
+        if output is None:
+            continue
+        if depends_on is None:
+            content = output["summary"]
+        elif status["index"] in depends_on:
+            content = output["content"]
+        else:
+            continue
+        messages.append(
+            HumanMessage(
+                content=f"# Result of step {status['index'] + 1}: {status['title']} ({status['agent_name']})\n\n{content}",
+                name="planner",
+            )
+        )
+    return messages
+
+
+def project_step_input(state, agent_name: str, step: Dict[str, Any]) -> dict:
+    """Input for a step that does not depend on anything, e.g. one started before the plan is complete."""
+    messages = [
+        user_message(state, keep_images=agent_name in IMAGE_INPUT_AGENTS),
+        step_message(step),
+    ]
+    return {"messages": [message for message in messages if message is not None]}
+
+
+def project_worker_input(state, agent_name: str) -> dict:
+    """
+    Build the minimal input for the next step assigned to `agent_name`.
+
+    The worker gets the user query, the results it depends on and its own
+    step, instead of the whole conversation. Without a matching plan step
+    the full state is passed through unchanged.
+    """
+    statuses = step_statuses(state)
+    current = next(
+        (
+            status
+            for status in statuses
+            if status["agent_name"] == agent_name and not status["done"]
+        ),
+        None,
+    )
+    if current is None:
+        logger.debug(f"No open plan step for {agent_name}, passing the full state")
+        return state
+
+    thought = json.loads(state["full_plan"]).get("thought", "")
+    messages = [user_message(state, keep_images=agent_name in IMAGE_INPUT_AGENTS)]
+    messages += dependency_messages(statuses, current["step"], current["index"])
+    messages.append(step_message(current["step"], thought))
+    return {"messages": [message for message in messages if message is not None]}
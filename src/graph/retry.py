@@ -0,0 +1,91 @@
+import hashlib
+import logging
+import random
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+import httpx
+import openai
+
+from src.config import (
+    WORKER_MAX_RETRIES,
+    WORKER_RETRY_BASE_DELAY,
+    WORKER_RETRY_MAX_DELAY,
+)
+
+logger = logging.getLogger(__name__)
+
+# 网络抖动、限流、服务端 5xx 等临时性错误，重试可能成功
+TRANSIENT_ERRORS: Tuple[type, ...] = (
+    TimeoutError,
+    FutureTimeoutError,
+    ConnectionError,
+    httpx.TimeoutException,
+    httpx.NetworkError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+def classify_error(error: BaseException) -> Tuple[str, bool]:
+    """Return the error class name and whether retrying can help."""
+    return type(error).__name__, isinstance(error, TRANSIENT_ERRORS)
+
+
+def run_worker(agent_name: str, fn: Callable[[], str]) -> Tuple[str, dict]:
+    """
+    Run a worker and wrap the outcome in a result envelope.
+
+    Returns the content for the conversation (the error description on
+    failure) and the envelope stored as `last_result` in the state.
+    """
+    started = time.monotonic()
+    try:
+        content = fn()
+        error_class, retryable = None, False
+    except Exception as e:
+        logger.exception(f"{agent_name} agent failed: {e}")
+        content = f"{agent_name} agent encountered an error: {e}"
+        error_class, retryable = classify_error(e)
+
+    result = {
+        "agent_name": agent_name,
+        "status": "error" if error_class else "success",
+        "error_class": error_class,
+        "retryable": retryable,
+        "latency": round(time.monotonic() - started, 3),
+    }
+    logger.info(f"{agent_name} finished: {result}")
+    return content, result
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter for transient worker failures."""
+
+    max_retries: int = WORKER_MAX_RETRIES
+    base_delay: float = WORKER_RETRY_BASE_DELAY
+    max_delay: float = WORKER_RETRY_MAX_DELAY
+
+    def should_retry(self, result: dict, attempts: int) -> bool:
+        return result["retryable"] and attempts < self.max_retries
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (starting at 0)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+def route_signature(goto: str, latest_output: Optional[dict]) -> str:
+    """
+    Identify a routing decision by its target and the output it was based on.
+
+    Routing to the same worker again after it produced exactly the same
+    output gives the same signature, which means the workflow is looping.
+    """
+    content = latest_output["content"] if latest_output else ""
+    digest = hashlib.sha1(content.encode("utf-8")).hexdigest()[:12]
+    return f"{goto}:{digest}"
@@ -0,0 +1,125 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.config import SPECULATIVE_PLANNING_WORKERS
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.register_ratio(
+    "speculative_planning_hit_rate",
+    "speculative_planning_hits",
+    "speculative_planning_started",
+)
+
+
+class Speculation:
+    """
+    Book-keeping for one speculative run.
+
+    The worker reports the prompt and the generated tokens with
+    `add_tokens` and checks `cancelled` between chunks. Whichever of
+    `finish` and `cancel` happens last records the tokens of a cancelled
+    run as wasted.
+    """
+
+    def __init__(self):
+        self.tokens = 0
+        self._cancel_event = threading.Event()
+        self._finished = False
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def add_tokens(self, count: int) -> None:
+        with self._lock:
+            self.tokens += count
+
+    def finish(self) -> None:
+        with self._lock:
+            self._finished = True
+            if self.cancelled:
+                self._record_waste()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self.cancelled:
+                return
+            self._cancel_event.set()
+            if self._finished:
+                self._record_waste()
+
+    def _record_waste(self) -> None:
+        metrics.incr("speculative_planning_wasted_tokens", self.tokens)
+        logger.info(f"Speculative plan discarded, {self.tokens} tokens wasted")
+
+
+# 与提前派发的 background_tasks 分开，投机任务排队时不会拖住真正要执行的步骤
+_executor = ThreadPoolExecutor(
+    max_workers=SPECULATIVE_PLANNING_WORKERS, thread_name_prefix="graph-speculation"
+)
+_speculations: Dict[str, Tuple[Speculation, Future]] = {}
+_lock = threading.Lock()
+
+
+def start_speculation(fn: Callable[[Any, Speculation], Any], state: Any) -> str:
+    """Run `fn(state, speculation)` in the background and return its key."""
+    speculation = Speculation()
+
+    def run():
+        try:
+            return fn(state, speculation)
+        finally:
+            speculation.finish()
+
+    key = uuid.uuid4().hex
+    future = _executor.submit(run)
+    with _lock:
+        _speculations[key] = (speculation, future)
+    metrics.incr("speculative_planning_started")
+    return key
+
+
+def commit_speculation(key: Optional[str], timeout: float = 300) -> Optional[Any]:
+    """
+    Wait for the speculative result. Returns None if it is unknown, failed,
+    or never got a worker; the caller then runs the work inline.
+    """
+    with _lock:
+        entry = _speculations.pop(key, None) if key else None
+    if entry is None:
+        return None
+    speculation, future = entry
+    # 还在排队的投机任务不值得等待，取消后由调用方直接执行
+    if future.cancel():
+        speculation.cancel()
+        metrics.incr("speculative_planning_not_started")
+        logger.info("Speculative run had not started, running inline")
+        return None
+    try:
+        result = future.result(timeout=timeout)
+    except Exception as e:
+        logger.warning(f"Speculative run failed: {e}")
+        speculation.cancel()
+        return None
+    if result is None:
+        # 没有可用的结果，调用方会重新执行，投机花掉的 token 算作浪费
+        speculation.cancel()
+        return None
+    metrics.incr("speculative_planning_hits")
+    return result
+
+
+def cancel_speculation(key: Optional[str]) -> None:
+    """Stop a speculative run whose result is not needed."""
+    with _lock:
+        entry = _speculations.pop(key, None) if key else None
+    if entry is not None:
+        speculation, future = entry
+        future.cancel()
+        speculation.cancel()
@@ -1,6 +1,8 @@
-from typing import Literal, Optional
+import operator
+from typing import Annotated, Literal, Optional
 from typing_extensions import TypedDict
 from langgraph.graph import MessagesState
+from pydantic import BaseModel, Field
 
 from src.config import TEAM_MEMBERS
 from typing import Dict
@@ -13,6 +15,25 @@ class Router(TypedDict):
     next: Literal[*OPTIONS]
 
 
+class Step(BaseModel):
+    """A single step of the plan, executed by one agent."""
+
+    agent_name: Literal[*TEAM_MEMBERS]
+    title: str
+    description: str
+    note: Optional[str] = None
+    # 依赖的前序步骤序号（从 0 开始），执行时只带上这些步骤的完整结果
+    depends_on: Optional[list[int]] = None
+
+
+class Plan(BaseModel):
+    """The plan produced by the planner."""
+
+    thought: str
+    title: str
+    steps: list[Step] = Field(min_length=1)
+
+
 class State(MessagesState):
     """State for the agent system, extends MessagesState with next field."""
 
@@ -27,4 +48,14 @@ class State(MessagesState):
     user_feedback: Optional[str] = None # 新增一个栏位
     image_base64: Optional[str] = None  # 用来存储图片
     # 用于追踪每个任务的重试次数
-    task_retry_counts: Dict[str, int]
\ No newline at end of file
+    task_retry_counts: Dict[str, int]
+    # 规划器提前派发的第一个步骤: {"key": ..., "agent_name": ...}
+    early_dispatch: Optional[dict]
+    # 与协调器并行启动的投机规划任务
+    speculation_key: Optional[str]
+    # worker 的完整输出，messages 中只保留摘要: [{"agent_name", "content", "summary"}]
+    worker_outputs: Annotated[list[dict], operator.add]
+    # 上一个 worker 的执行结果: {"agent_name", "status", "error_class", "retryable", "latency"}
+    last_result: Optional[dict]
+    # supervisor 的路由决策签名，用于检测死循环
+    route_history: list[str]
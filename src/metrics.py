@@ -0,0 +1,44 @@
+import threading
+from collections import defaultdict
+from typing import Dict, Tuple
+
+
+class Metrics:
+    """Process-wide counters with derived ratios, exposed through the API."""
+
+    def __init__(self):
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._ratios: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """Increase counter `name` by `value`."""
+        with self._lock:
+            self._counters[name] += value
+
+    def register_ratio(self, name: str, numerator: str, denominator: str) -> None:
+        """Report `numerator / denominator` as `name` in snapshots."""
+        with self._lock:
+            self._ratios[name] = (numerator, denominator)
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return all counters plus the registered ratios."""
+        with self._lock:
+            result = dict(self._counters)
+            for name, (numerator, denominator) in self._ratios.items():
+                total = self._counters.get(denominator, 0)
+                result[name] = (
+                    self._counters.get(numerator, 0) / total if total else 0.0
+                )
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+
+metrics = Metrics()
@@ -1,28 +1,116 @@
+import logging
 import os
 import re
+import threading
 from datetime import datetime
+from string import Formatter
 
-from langchain_core.prompts import PromptTemplate
 from langgraph.prebuilt.chat_agent_executor import AgentState
 
+from src.config import PROMPT_CACHE_CONTROL, PROMPT_HOT_RELOAD
+
+logger = logging.getLogger(__name__)
+
+# 每次调用都会变化的变量，不放进 system prompt，保证它字节稳定，可以命中服务端的前缀缓存
+VOLATILE_VARIABLES = ("CURRENT_TIME",)
+
+
+class CompiledPrompt:
+    """A prompt template read and converted once, rendered with `str.format`."""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.mtime = os.path.getmtime(file_path)
+        # Explicitly specify encoding='utf-8' when opening the file.
+        with open(file_path, encoding="utf-8") as f:
+            template = f.read()
+        # Escape curly braces using backslash
+        template = template.replace("{", "{{").replace("}", "}}")
+        # Replace `<<VAR>>` with `{VAR}`
+        self.template = re.sub(r"<<([^>>]+)>>", r"{\1}", template)
+        self.variables = {name for _, name, _, _ in Formatter().parse(self.template) if name}
+
+    def render(self, values: dict) -> str:
+        if not self.variables:
+            return self.template
+        return self.template.format(**{name: values[name] for name in self.variables})
+
+
+_compiled: dict[str, CompiledPrompt] = {}
+_compiled_lock = threading.Lock()
+
+
+def get_compiled_prompt(prompt_name: str) -> CompiledPrompt:
+    """Return the precompiled template, recompiling it on change when hot reload is enabled."""
+    compiled = _compiled.get(prompt_name)
+    if compiled is not None and not PROMPT_HOT_RELOAD:
+        return compiled
 
-def get_prompt_template(prompt_name: str) -> str:
-    # --- The only change is in the line below ---
     file_path = os.path.join(os.path.dirname(__file__), f"{prompt_name}.md")
+    if compiled is not None and os.path.getmtime(file_path) == compiled.mtime:
+        return compiled
 
-    # Explicitly specify encoding='utf-8' when opening the file.
-    template = open(file_path, encoding='utf-8').read()  # <-- 关键改动：指定UTF-8编码
+    with _compiled_lock:
+        compiled = CompiledPrompt(file_path)
+        _compiled[prompt_name] = compiled
+    logger.debug(f"Compiled prompt template {prompt_name}")
+    return compiled
 
-    # Escape curly braces using backslash
-    template = template.replace("{", "{{").replace("}", "}}")
-    # Replace `<<VAR>>` with `{VAR}`
-    template = re.sub(r"<<([^>>]+)>>", r"{\1}", template)
-    return template
+
+def get_prompt_template(prompt_name: str) -> str:
+    return get_compiled_prompt(prompt_name).template
+
+
+def _volatile_values() -> dict:
+    return {"CURRENT_TIME": datetime.now().strftime("%a %b %d %Y %H:%M:%S %z")}
+
+
+def _with_context(message, context: str):
+    """Return a copy of a user message with `context` placed before its content."""
+    content = message["content"] if isinstance(message, dict) else message.content
+    if isinstance(content, str):
+        content = f"{context}\n\n{content}"
+    else:
+        content = [{"type": "text", "text": context}, *content]
+    if isinstance(message, dict):
+        return {**message, "content": content}
+    return message.model_copy(update={"content": content})
+
+
+def _is_user_message(message) -> bool:
+    # 带 name 的 human 消息是 worker 的输出，不是用户的提问
+    if isinstance(message, dict):
+        return message.get("role") == "user" and not message.get("name")
+    return message.type == "human" and not getattr(message, "name", None)
 
 
 def apply_prompt_template(prompt_name: str, state: AgentState) -> list:
-    system_prompt = PromptTemplate(
-        input_variables=["CURRENT_TIME"],
-        template=get_prompt_template(prompt_name),
-    ).format(CURRENT_TIME=datetime.now().strftime("%a %b %d %Y %H:%M:%S %z"), **state)
-    return [{"role": "system", "content": system_prompt}] + state["messages"]
+    """
+    Build the messages for an agent call.
+
+    The system prompt is static, so it stays byte-identical between calls and
+    can be served from the provider's prompt cache. The volatile values are
+    put in front of a copy of the latest user message rather than in a second
+    system message (many chat templates only accept one, at the start) or
+    after the conversation, where they would follow the tool results of a
+    ReAct loop. Without a user message they go in a trailing user message.
+    """
+    volatile = _volatile_values()
+    system_prompt = get_compiled_prompt(prompt_name).render({**state, **volatile})
+    if PROMPT_CACHE_CONTROL:
+        # 显式缓存标记（DashScope、Anthropic 兼容接口等支持），其他服务会自动做前缀缓存
+        system_content = [
+            {"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}
+        ]
+    else:
+        system_content = system_prompt
+
+    context = "\n".join(f"{name}: {volatile[name]}" for name in VOLATILE_VARIABLES)
+    messages = list(state["messages"])
+    for i in range(len(messages) - 1, -1, -1):
+        if _is_user_message(messages[i]):
+            messages[i] = _with_context(messages[i], context)
+            break
+    else:
+        messages.append({"role": "user", "content": context})
+    return [{"role": "system", "content": system_content}] + messages
@@ -22,10 +22,6 @@ logger = logging.getLogger(__name__)
 # Create the graph
 graph = build_graph()
 
-# Cache for coordinator messages
-coordinator_cache = []
-MAX_CACHE_SIZE = 2
-
 # 在文件顶部添加导入
 from src.service.chat_service import ChatService
 from src.database import get_db
@@ -54,11 +50,11 @@ async def run_agent_workflow(
     workflow_id = str(uuid.uuid4())
     streaming_llm_agents = [*TEAM_MEMBERS, "planner", "coordinator"]
 
-    # 重置协调器缓存
-    global coordinator_cache
-    coordinator_cache = []
-    global is_handoff_case
-    is_handoff_case = False
+    # handoff 由 coordinator 节点识别并通过 handoff 事件告知，
+    # 协调器可展示的回复也由节点以 agent_message 转发
+    handed_off = False
+    # 识别出 handoff 后节点会关闭流，收不到 on_chat_model_end，需要自行补发 end_of_llm
+    coordinator_llm_open = False
 
     # 收集完整的助手响应
     assistant_response_parts = []
@@ -111,11 +107,15 @@ async def run_agent_workflow(
                     },
                 }
             elif kind == "on_chat_model_start" and node in streaming_llm_agents:
+                if node == "coordinator":
+                    coordinator_llm_open = True
                 ydata = {
                     "event": "start_of_llm",
                     "data": {"agent_name": node},
                 }
             elif kind == "on_chat_model_end" and node in streaming_llm_agents:
+                if node == "coordinator":
+                    coordinator_llm_open = False
                 ydata = {
                     "event": "end_of_llm",
                     "data": {"agent_name": node},
@@ -137,43 +137,48 @@ async def run_agent_workflow(
                         },
                     }
                 else:
+                    if node == "coordinator":
+                        continue
+
                     # 🔥 关键修复：收集所有助手响应内容
                     assistant_response_parts.append(content)
                     logger.debug(f"📝 Collected content from {node}: {content[:50]}...")
 
-                    # 处理协调器逻辑...
-                    if node == "coordinator":
-                        if len(coordinator_cache) < MAX_CACHE_SIZE:
-                            coordinator_cache.append(content)
-                            cached_content = "".join(coordinator_cache)
-                            if cached_content.startswith("handoff"):
-                                is_handoff_case = True
-                                continue
-                            if len(coordinator_cache) < MAX_CACHE_SIZE:
-                                continue
-                            ydata = {
-                                "event": "message",
-                                "data": {
-                                    "message_id": data["chunk"].id,
-                                    "delta": {"content": cached_content},
-                                },
-                            }
-                        elif not is_handoff_case:
-                            ydata = {
-                                "event": "message",
-                                "data": {
-                                    "message_id": data["chunk"].id,
-                                    "delta": {"content": content},
-                                },
-                            }
-                    else:
-                        ydata = {
-                            "event": "message",
-                            "data": {
-                                "message_id": data["chunk"].id,
-                                "delta": {"content": content},
-                            },
-                        }
+                    ydata = {
+                        "event": "message",
+                        "data": {
+                            "message_id": data["chunk"].id,
+                            "delta": {"content": content},
+                        },
+                    }
+            elif kind == "on_custom_event" and name == "agent_message":
+                assistant_response_parts.append(data["content"])
+                ydata = {
+                    "event": "message",
+                    "data": {
+                        "message_id": data["message_id"],
+                        "delta": {"content": data["content"]},
+                    },
+                }
+            elif kind == "on_custom_event" and name == "handoff":
+                handed_off = True
+                if not coordinator_llm_open:
+                    continue
+                coordinator_llm_open = False
+                ydata = {
+                    "event": "end_of_llm",
+                    "data": {"agent_name": "coordinator"},
+                }
+            elif kind == "on_custom_event" and name == "plan_step":
+                ydata = {
+                    "event": "plan_step",
+                    "data": {"workflow_id": workflow_id, **data},
+                }
+            elif kind == "on_custom_event" and name == "token_usage":
+                ydata = {
+                    "event": "token_usage",
+                    "data": {"workflow_id": workflow_id, **data},
+                }
             elif kind == "on_tool_start" and node in TEAM_MEMBERS:
                 ydata = {
                     "event": "tool_call",
@@ -186,9 +191,14 @@ async def run_agent_workflow(
             elif kind == "on_tool_end" and node in TEAM_MEMBERS:
                 # 安全处理tool_result
                 tool_result = ""
+                tool_display = None
                 if data.get("output"):
                     if hasattr(data["output"], 'content'):
                         tool_result = data["output"].content
+                        # 日常工具给 LLM 的是紧凑 JSON，格式化的展示文本放在 artifact 中
+                        artifact = getattr(data["output"], "artifact", None)
+                        if isinstance(artifact, str):
+                            tool_display = artifact
                     else:
                         tool_result = str(data["output"])
 
@@ -200,6 +210,8 @@ async def run_agent_workflow(
                         "tool_result": tool_result,
                     },
                 }
+                if tool_display is not None:
+                    ydata["data"]["tool_display"] = tool_display
             else:
                 continue
             yield ydata
@@ -236,7 +248,7 @@ async def run_agent_workflow(
                 }
             }
 
-        if is_handoff_case:
+        if handed_off:
             yield {
                 "event": "end_of_workflow",
                 "data": {
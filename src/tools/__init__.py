@@ -1,4 +1,4 @@
-from .crawl import crawl_tool
+from .crawl import crawl_many_tool, crawl_tool
 from .file_management import write_file_tool
 from .python_repl import python_repl_tool
 from .search import tavily_tool
@@ -11,6 +11,7 @@ from .kuaidi_tool import track_logistics
 __all__ = [
     "bash_tool",
     "crawl_tool",
+    "crawl_many_tool",
     "tavily_tool",
     "python_repl_tool",
     "write_file_tool",
@@ -5,10 +5,17 @@ from typing import Optional, ClassVar, Type
 from langchain.tools import BaseTool
 from browser_use import AgentHistoryList, Browser, BrowserConfig
 from browser_use import Agent as BrowserAgent
-from src.agents.llm import vl_llm
 from src.tools.decorators import create_logged_tool
 from src.config import CHROME_INSTANCE_PATH
 
+
+def _vision_llm():
+    # 延迟导入：src.agents 导入了 src.tools，在模块顶层导入会形成循环导入
+    from src.agents.llm import vl_llm
+
+    return vl_llm
+
+
 # 在模块开始时设置事件循环策略
 if platform.system() == 'Windows':
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
@@ -54,7 +61,7 @@ class BrowserTool(BaseTool):
             # 创建 BrowserAgent
             self._agent = BrowserAgent(
                 task=instruction,
-                llm=vl_llm,
+                llm=_vision_llm(),
                 browser=expected_browser,
             )
 
@@ -88,7 +95,7 @@ class BrowserTool(BaseTool):
         """实际的异步执行逻辑"""
         self._agent = BrowserAgent(
             task=instruction,
-            llm=vl_llm,
+            llm=_vision_llm(),
             browser=expected_browser,
         )
         result = await self._agent.run()
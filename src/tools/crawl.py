@@ -1,26 +1,79 @@
 import logging
-from typing import Annotated
+import threading
+from typing import Annotated, Any, Dict, List, Optional, Tuple
 
 from langchain_core.messages import HumanMessage
 from langchain_core.tools import tool
 from .decorators import log_io
+from .mcp_pool import LoopThread
 
-from src.crawler import Crawler
+from src.config import CRAWL_MANY_MAX_URLS
+from src.crawler import get_async_crawler
 
 logger = logging.getLogger(__name__)
 
+# 爬虫的连接池和并发限制属于一个事件循环；同步的工具调用统一提交到这个后台循环上执行
+_crawler_loop: Optional[LoopThread] = None
+_crawler_loop_lock = threading.Lock()
 
-@tool
+
+def get_crawler_loop() -> LoopThread:
+    global _crawler_loop
+    if _crawler_loop is None:
+        with _crawler_loop_lock:
+            if _crawler_loop is None:
+                _crawler_loop = LoopThread(name="crawler")
+    return _crawler_loop
+
+
+# 两个工具的 artifact 记录每个网址是否命中抓取缓存，不进入 LLM 上下文
+@tool(response_format="content_and_artifact")
 @log_io
 def crawl_tool(
     url: Annotated[str, "The url to crawl."],
-) -> HumanMessage:
+) -> Tuple[HumanMessage, Dict[str, Any]]:
     """Use this to crawl a url and get a readable content in markdown format."""
     try:
-        crawler = Crawler()
-        article = crawler.crawl(url)
-        return {"role": "user", "content": article.to_message()}
+        article = get_crawler_loop().run(get_async_crawler().crawl(url))
+        return {"role": "user", "content": article.to_message()}, {
+            "url": url,
+            "cache_hit": article.cache_hit,
+        }
     except BaseException as e:
         error_msg = f"Failed to crawl. Error: {repr(e)}"
         logger.error(error_msg)
-        return error_msg
+        return error_msg, {"url": url, "cache_hit": False}
+
+
+@tool(response_format="content_and_artifact")
+@log_io
+def crawl_many_tool(
+    urls: Annotated[List[str], f"The urls to crawl, at most {CRAWL_MANY_MAX_URLS}."],
+) -> Tuple[HumanMessage, Dict[str, Any]]:
+    """Use this to crawl several urls in parallel and get their readable content in markdown format, in the given order."""
+    urls = list(dict.fromkeys(url.strip() for url in urls if url and url.strip()))
+    skipped = urls[CRAWL_MANY_MAX_URLS:]
+    urls = urls[:CRAWL_MANY_MAX_URLS]
+    try:
+        results = get_crawler_loop().run(get_async_crawler().crawl_many(urls))
+    except BaseException as e:
+        error_msg = f"Failed to crawl. Error: {repr(e)}"
+        logger.error(error_msg)
+        return error_msg, {
+            "results": [{"url": url, "cache_hit": False} for url in urls]
+        }
+
+    # 多个页面的图片不逐一展开为图片消息，保留为 markdown 链接，避免占满上下文
+    sections, artifact = [], []
+    for index, (url, result) in enumerate(zip(urls, results), 1):
+        if isinstance(result, BaseException):
+            logger.error(f"Failed to crawl {url}: {result!r}")
+            sections.append(f"## [{index}] {url}\n\nFailed to crawl. Error: {result!r}")
+        else:
+            sections.append(f"## [{index}] {url}\n\n{result.to_markdown()}")
+        artifact.append({"url": url, "cache_hit": getattr(result, "cache_hit", False)})
+    if skipped:
+        sections.append(
+            f"Not crawled (over the limit of {CRAWL_MANY_MAX_URLS} urls): {', '.join(skipped)}"
+        )
+    return {"role": "user", "content": "\n\n".join(sections)}, {"results": artifact}
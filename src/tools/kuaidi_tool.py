@@ -1,18 +1,20 @@
-import os
 import json
-import hashlib
-import requests
+from typing import Optional
+
+import httpx
 from langchain_core.tools import tool
-from src.config import KUAIDI100_API_KEY,CUSTOMER_ID
+
+from src.daily_tools_mcp.tools.kuaidi100 import get_kuaidi100_client
+from .mcp_pool import get_mcp_loop
 
 @tool
-def track_logistics(com: str, num: str, phone: str = "", ship_from: str = "", ship_to: str = "") -> str:
+def track_logistics(num: str, com: Optional[str] = None, phone: str = "", ship_from: str = "", ship_to: str = "") -> str:
     """
     Queries real-time logistics tracking information for a package.
 
     Args:
-        com (str): The courier company's code, in all lowercase (e.g., 'yuantong', 'shunfeng').
         num (str): The tracking number, with a maximum length of 32 characters.
+        com (str): Optional courier company name or code (e.g., '顺丰', 'shunfeng'). Detected from the tracking number when omitted; a number whose format identifies the courier overrides this value.
         phone (str): The recipient's or sender's phone number. Can be the last four digits.
         ship_from (str): The origin city in 'province-city-district' format. Providing this improves accuracy.
         ship_to (str): The destination city in 'province-city-district' format. Providing this improves accuracy.
@@ -20,46 +22,12 @@ def track_logistics(com: str, num: str, phone: str = "", ship_from: str = "", sh
     Returns:
         str: The API response text, typically a JSON string with tracking details.
     """
-    # --- Get credentials securely from environment variables ---
-    api_key = KUAIDI100_API_KEY
-    customer_id = CUSTOMER_ID
-
-    if not api_key or not customer_id:
-        return "Error: KUAIDI100_KEY and KUAIDI100_CUSTOMER environment variables must be set."
-
-    url = 'https://poll.kuaidi100.com/poll/query.do'
-
-    param = {
-        'com': com,
-        'num': num,
-        'phone': phone,
-        'from': ship_from,
-        'to': ship_to,
-        'resultv2': '1',  # Enable administrative area parsing
-        'show': '0',      # Return format: json
-        'order': 'desc'   # Sort order: descending
-    }
-    param_str = json.dumps(param)
-
-    # --- Signature Generation ---
-    # The signature is an MD5 hash of (param_json_string + api_key + customer_id) in uppercase.
-    temp_sign = param_str + api_key + customer_id
-    md = hashlib.md5()
-    md.update(temp_sign.encode())
-    sign = md.hexdigest().upper()
-
-    request_data = {
-        'customer': customer_id,
-        'param': param_str,
-        'sign': sign
-    }
-
-    # --- Send Request ---
+    # 与 MCP 的 LogisticsTool 共用同一个客户端（快递公司识别、状态缓存、订阅结果），在 MCP 事件循环上执行
     try:
-        response = requests.post(url, data=request_data, timeout=10)
-        response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-        return response.text
-    except requests.exceptions.RequestException as e:
+        return get_mcp_loop().run(get_kuaidi100_client().query(num, com, phone, ship_from, ship_to))
+    except ValueError as e:
+        return f"Error: {e}"
+    except httpx.HTTPError as e:
         return f"Error during API request: {e}"
 
 
@@ -1,11 +1,13 @@
 # src/tools/langchain_wrappers.py
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Literal, Optional, Tuple
 from langchain_core.tools import BaseTool
 from pydantic import BaseModel, Field
 import logging
 import json
 
+from src.daily_tools_mcp.tools.base_tool import OUTPUT_MODE_ARG
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,6 +21,10 @@ class MCPToolWrapper(BaseTool):
     # LangChain 会根据 Pydantic 模型自动推断，或者我们可以用 tool_input 来定义。
     # 这里我们保持原样，因为 create_langchain_tools 会动态创建。
     args_schema: Optional[Dict[str, Any]] = Field(default=None)
+    # 工具同时返回两种形式：紧凑 JSON 作为消息内容进入 LLM 上下文，格式化文本作为 artifact 供界面展示
+    response_format: Literal["content", "content_and_artifact"] = "content_and_artifact"
+    # 工具声明支持的输出形式；只有内置的日常工具支持，其他 MCP 工具不会收到 `_output_mode`
+    output_modes: Optional[List[str]] = Field(default=None)
 
     def _extract_args(self, **kwargs: Any) -> Dict[str, Any]:
         """提取并清理参数"""
@@ -27,9 +33,22 @@ class MCPToolWrapper(BaseTool):
         else:
             args = kwargs
         logger.info(f"Extracted kwargs for tool {self.tool_name}: {args}")
-        return args
+        if self.output_modes and "both" in self.output_modes:
+            return {**args, OUTPUT_MODE_ARG: "both"}
+        return dict(args)
 
-    def _run(self, **kwargs: Any) -> str:
+    @staticmethod
+    def _split_output(result: str) -> Tuple[str, Optional[str]]:
+        """拆分 both 形式的结果为 (紧凑内容, 展示文本)；错误提示等纯文本结果没有展示文本"""
+        try:
+            payload = json.loads(result)
+        except ValueError:
+            return result, None
+        if isinstance(payload, dict) and set(payload) == {"compact", "display"}:
+            return payload["compact"], payload["display"]
+        return result, None
+
+    def _run(self, **kwargs: Any) -> Tuple[str, Optional[str]]:
         """运行工具"""
         from .mcp_tools import call_mcp_tool_sync
 
@@ -41,12 +60,12 @@ class MCPToolWrapper(BaseTool):
             logger.info(f"Calling MCP tool {self.tool_name} with args: {args}")
             result = call_mcp_tool_sync(self.tool_name, args)
             logger.info(f"MCP tool {self.tool_name} result: {result}")
-            return result
+            return self._split_output(result)
         except Exception as e:
             logger.error(f"Error calling MCP tool {self.tool_name}: {e}")
-            return f"工具调用失败: {str(e)}"
+            return f"工具调用失败: {str(e)}", None
 
-    async def _arun(self, **kwargs: Any) -> str:
+    async def _arun(self, **kwargs: Any) -> Tuple[str, Optional[str]]:
         """异步运行工具"""
         from .mcp_tools import call_mcp_tool_async
 
@@ -57,40 +76,56 @@ class MCPToolWrapper(BaseTool):
             logger.info(f"Async calling MCP tool {self.tool_name} with args: {args}")
             result = await call_mcp_tool_async(self.tool_name, args)
             logger.info(f"MCP tool {self.tool_name} async result: {result}")
-            return result
+            return self._split_output(result)
         except Exception as e:
             logger.error(f"Error calling MCP tool {self.tool_name}: {e}")
-            return f"工具调用失败: {str(e)}"
+            return f"工具调用失败: {str(e)}", None
+
+
+# (目录哈希, 工具列表)：只有 MCP 工具目录变化时才重新创建包装器
+_langchain_tools: Optional[Tuple[str, List[BaseTool]]] = None
+
+
+def get_tool_catalog_hash() -> Optional[str]:
+    """当前 MCP 工具目录的哈希，目录尚未加载时为 None"""
+    from .mcp_tools import get_mcp_tools_sync
+
+    return get_mcp_tools_sync().catalog_hash
 
 
 def get_langchain_tools() -> List[BaseTool]:
-    """获取 LangChain 工具列表（每次都重新创建，不使用缓存）"""
-    logger.info("开始获取 LangChain 工具列表")
+    """获取 LangChain 工具列表（按工具目录哈希缓存）"""
+    global _langchain_tools
 
-    tools = create_langchain_tools()
+    catalog_hash = get_tool_catalog_hash()
+    if catalog_hash is None or _langchain_tools is None or _langchain_tools[0] != catalog_hash:
+        logger.info("开始获取 LangChain 工具列表")
+        tools = create_langchain_tools()
 
-    if tools:
-        logger.info(f"成功创建 {len(tools)} 个工具: {[tool.name for tool in tools]}")
-    else:
-        logger.error("没有创建任何工具！")
+        if tools:
+            logger.info(f"成功创建 {len(tools)} 个工具: {[tool.name for tool in tools]}")
+            _langchain_tools = (get_tool_catalog_hash(), tools)
+        else:
+            logger.error("没有创建任何工具！")
+        return tools
 
-    return tools
+    return _langchain_tools[1]
 
 
 def create_langchain_tools() -> List[BaseTool]:
     """创建 LangChain 工具列表"""
+    from src.config import MCP_INIT_TIMEOUT
     from .mcp_tools import get_mcp_tools_sync
 
     tools = []
 
     try:
-        # 每次都重新获取 MCP 工具实例
         mcp_tools_instance = get_mcp_tools_sync()
 
-        # 确保连接是活跃的
-        if not mcp_tools_instance.is_initialized:
-            import asyncio
-            asyncio.run(mcp_tools_instance.connect_to_mcp_server())
+        # 没有缓存的工具目录时等待后台初始化完成；有缓存时直接使用，连接在后台继续
+        if not mcp_tools_instance.get_available_tools():
+            if not mcp_tools_instance.wait_until_ready(MCP_INIT_TIMEOUT):
+                logger.warning(f"MCP initialization did not finish within {MCP_INIT_TIMEOUT}s")
 
         # 获取工具列表
         mcp_tools_list = mcp_tools_instance.get_available_tools()
@@ -100,7 +135,8 @@ def create_langchain_tools() -> List[BaseTool]:
                 name=tool_info["name"],
                 description=tool_info["description"],
                 tool_name=tool_info["name"],
-                args_schema=tool_info.get("input_schema")
+                args_schema=tool_info.get("input_schema"),
+                output_modes=tool_info.get("output_modes"),
             )
             tools.append(tool)
 
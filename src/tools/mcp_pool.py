@@ -0,0 +1,377 @@
+# src/tools/mcp_pool.py
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, TypeVar, Union
+
+import anyio
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
+from mcp.types import (
+    CONNECTION_CLOSED,
+    CallToolResult,
+    ServerNotification,
+    Tool,
+    ToolListChangedNotification,
+)
+
+from src.config import (
+    MCP_CALL_TIMEOUT,
+    MCP_POOL_HEALTH_INTERVAL,
+    MCP_POOL_IDLE_TIMEOUT,
+    MCP_POOL_MAX_IN_FLIGHT,
+    MCP_POOL_MIN_SIZE,
+    MCP_POOL_SIZE,
+)
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 写入请求时底层流已经断开（服务进程退出等）：请求没有发出
+_UNSENT_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError)
+
+
+def _connection_lost(e: Exception) -> bool:
+    """Whether the session died after the request was written, so the tool may have run."""
+    if isinstance(e, anyio.EndOfStream):
+        return True
+    return isinstance(e, McpError) and e.error.code == CONNECTION_CLOSED
+
+
+class LoopThread:
+    """
+    An event loop running forever in a daemon thread.
+
+    MCP sessions are bound to the loop they were created on, while tools are
+    called both from sync code and from other event loops. Every session of
+    the pool therefore lives on this loop and callers submit work to it.
+    """
+
+    def __init__(self, name: str = "mcp-pool"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Awaitable[T]) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """Run `coro` on the loop and block until it finishes."""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("LoopThread.run() would block its own event loop")
+        return self.submit(coro).result(timeout)
+
+    async def arun(self, coro: Awaitable[T]) -> T:
+        """Await `coro` on the loop from any other event loop."""
+        if asyncio.get_running_loop() is self.loop:
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+
+
+_loop_thread: Optional[LoopThread] = None
+_loop_thread_lock = threading.Lock()
+
+
+def get_mcp_loop() -> LoopThread:
+    """Return the process-wide event loop thread used by MCP sessions."""
+    global _loop_thread
+    if _loop_thread is None:
+        with _loop_thread_lock:
+            if _loop_thread is None:
+                _loop_thread = LoopThread()
+    return _loop_thread
+
+
+# stdio 服务器的启动参数，或 streamable HTTP 服务的地址（如 http://127.0.0.1:8765/mcp）
+ServerTarget = Union[StdioServerParameters, str]
+
+
+class PooledSession:
+    """
+    One initialized `ClientSession`: a server subprocess for stdio targets,
+    or a session on a shared server for HTTP URLs.
+    """
+
+    _ids = 0
+
+    def __init__(self, server_params: ServerTarget, message_handler=None):
+        PooledSession._ids += 1
+        self.id = PooledSession._ids
+        self.server_params = server_params
+        self.message_handler = message_handler
+        self.session: Optional[ClientSession] = None
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        return (
+            self.session is not None
+            and self._task is not None
+            and not self._task.done()
+        )
+
+    async def start(self, timeout: float) -> None:
+        ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run(ready))
+        try:
+            await asyncio.wait_for(asyncio.shield(ready), timeout)
+        except Exception:
+            await self.close()
+            raise
+
+    def _open_streams(self):
+        if isinstance(self.server_params, str):
+            # 每个会话持有一个 httpx 客户端，连接保持 keep-alive，请求之间复用
+            return streamablehttp_client(self.server_params)
+        return stdio_client(self.server_params)
+
+    async def _run(self, ready: asyncio.Future) -> None:
+        # 传输客户端和 ClientSession 必须在同一个任务中进入和退出，因此整个会话生命周期都在这个任务里
+        try:
+            async with self._open_streams() as streams:
+                read, write = streams[0], streams[1]
+                async with ClientSession(
+                    read, write, message_handler=self.message_handler
+                ) as session:
+                    await session.initialize()
+                    self.session = session
+                    ready.set_result(None)
+                    logger.info(f"MCP session {self.id} started")
+                    await self._stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.warning(f"MCP session {self.id} crashed: {e}")
+        finally:
+            self.session = None
+
+    async def close(self) -> None:
+        self._stop.set()
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._task, 5)
+        except Exception:
+            self._task.cancel()
+        logger.info(f"MCP session {self.id} closed")
+
+
+class MCPSessionPool:
+    """
+    A pool of long-lived MCP sessions shared by all tool calls.
+
+    A `ClientSession` multiplexes concurrent requests by id, so calls go to
+    the least busy session and a new one is only started when every session
+    already has `max_in_flight` requests running. A background task pings
+    the sessions, replaces the ones that died and closes idle sessions
+    above `min_size`. When a server sends `notifications/tools/list_changed`,
+    `on_tools_changed` is scheduled on the pool loop.
+
+    A call on a broken session is retried once on a new session if the
+    request was never sent, or if the tool is annotated as read-only or
+    idempotent; otherwise a call that may already have run is not repeated.
+
+    All coroutines run on the loop of `get_mcp_loop()`; use `acall_tool`,
+    `alist_tools` and friends from other threads or loops.
+    """
+
+    def __init__(
+        self,
+        server_params: ServerTarget,
+        size: int = MCP_POOL_SIZE,
+        min_size: int = MCP_POOL_MIN_SIZE,
+        max_in_flight: int = MCP_POOL_MAX_IN_FLIGHT,
+        idle_timeout: float = MCP_POOL_IDLE_TIMEOUT,
+        health_interval: float = MCP_POOL_HEALTH_INTERVAL,
+        call_timeout: float = MCP_CALL_TIMEOUT,
+        on_tools_changed: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        self.server_params = server_params
+        self.size = max(1, size)
+        self.min_size = max(1, min(min_size, self.size))
+        self.max_in_flight = max_in_flight
+        self.idle_timeout = idle_timeout
+        self.health_interval = health_interval
+        self.call_timeout = call_timeout
+        self.on_tools_changed = on_tools_changed
+        self.loop_thread = get_mcp_loop()
+        self._sessions: List[PooledSession] = []
+        self._spawning = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._health_task: Optional[asyncio.Task] = None
+        # 可以安全重复调用的工具（readOnlyHint 或 idempotentHint），由 list_tools 更新
+        self._idempotent_tools: Set[str] = set()
+
+    # --- 在会话池事件循环上运行的协程 ---
+
+    async def start(self) -> None:
+        self._lock = asyncio.Lock()
+        for _ in range(self.min_size):
+            await self._spawn()
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def _spawn(self) -> PooledSession:
+        self._spawning += 1
+        try:
+            session = PooledSession(self.server_params, self._handle_message)
+            await session.start(self.call_timeout)
+        finally:
+            self._spawning -= 1
+        self._sessions.append(session)
+        metrics.incr("mcp_sessions_started")
+        return session
+
+    async def _handle_message(self, message) -> None:
+        if not isinstance(message, ServerNotification) or not isinstance(
+            message.root, ToolListChangedNotification
+        ):
+            return
+        logger.info("MCP server reported a changed tool list")
+        if self.on_tools_changed:
+            # 消息处理器运行在会话的接收循环里，在这里等待新的请求会死锁，因此放到独立任务中
+            asyncio.create_task(self.on_tools_changed())
+
+    async def _spawn_in_background(self) -> None:
+        try:
+            await self._spawn()
+        except Exception as e:
+            logger.warning(f"Failed to grow MCP session pool: {e}")
+
+    async def _acquire(self) -> PooledSession:
+        async with self._lock:
+            self._sessions = [session for session in self._sessions if session.alive]
+            session = min(self._sessions, key=lambda s: s.in_flight, default=None)
+            total = len(self._sessions) + self._spawning
+            if session is None:
+                session = await self._spawn()
+            elif session.in_flight >= self.max_in_flight and total < self.size:
+                # 所有会话都很忙时扩容，当前请求不等待，仍然使用最空闲的会话
+                asyncio.create_task(self._spawn_in_background())
+            session.in_flight += 1
+            return session
+
+    def _release(self, session: PooledSession) -> None:
+        session.in_flight -= 1
+        session.last_used = time.monotonic()
+
+    async def _discard(self, session: PooledSession) -> None:
+        if session in self._sessions:
+            self._sessions.remove(session)
+        await session.close()
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> CallToolResult:
+        for attempt in range(2):
+            session = await self._acquire()
+            try:
+                return await session.session.call_tool(
+                    name,
+                    arguments,
+                    read_timeout_seconds=timedelta(seconds=self.call_timeout),
+                )
+            except Exception as e:
+                unsent = isinstance(e, _UNSENT_ERRORS)
+                if not unsent and not _connection_lost(e):
+                    raise
+                metrics.incr("mcp_sessions_broken")
+                await self._discard(session)
+                # 请求没有发出时在新会话上重试一次；已经发出的请求可能已经执行，只重试幂等的工具
+                if attempt or not (unsent or name in self._idempotent_tools):
+                    raise
+                logger.warning(
+                    f"MCP session {session.id} is broken ({type(e).__name__}), retrying"
+                )
+            finally:
+                self._release(session)
+
+    async def list_tools(self) -> List[Tool]:
+        session = await self._acquire()
+        try:
+            tools = (await session.session.list_tools()).tools
+        finally:
+            self._release(session)
+        self._idempotent_tools = {
+            tool.name
+            for tool in tools
+            if tool.annotations
+            and (tool.annotations.readOnlyHint or tool.annotations.idempotentHint)
+        }
+        return tools
+
+    async def check_health(self) -> None:
+        """Ping every session, replace dead ones and shrink the pool when idle."""
+        now = time.monotonic()
+        for session in list(self._sessions):
+            if not session.alive:
+                await self._discard(session)
+                metrics.incr("mcp_sessions_broken")
+                continue
+            idle = (
+                session.in_flight == 0 and now - session.last_used > self.idle_timeout
+            )
+            if idle and len(self._sessions) > self.min_size:
+                logger.info(f"Closing idle MCP session {session.id}")
+                await self._discard(session)
+                continue
+            try:
+                await asyncio.wait_for(session.session.send_ping(), 5)
+            except Exception as e:
+                logger.warning(f"MCP session {session.id} failed its health check: {e}")
+                metrics.incr("mcp_sessions_broken")
+                await self._discard(session)
+
+        while len(self._sessions) + self._spawning < self.min_size:
+            try:
+                await self._spawn()
+            except Exception as e:
+                logger.error(f"Failed to respawn MCP session: {e}")
+                break
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.error(f"MCP pool health check failed: {e}")
+
+    async def close(self) -> None:
+        if self._health_task:
+            self._health_task.cancel()
+        for session in list(self._sessions):
+            await self._discard(session)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "in_flight": sum(session.in_flight for session in self._sessions),
+        }
+
+    # --- 可在任意线程或事件循环中调用的入口 ---
+
+    async def astart(self) -> None:
+        await self.loop_thread.arun(self.start())
+
+    async def acall_tool(self, name: str, arguments: Dict[str, Any]) -> CallToolResult:
+        return await self.loop_thread.arun(self.call_tool(name, arguments))
+
+    async def alist_tools(self) -> List[Tool]:
+        return await self.loop_thread.arun(self.list_tools())
+
+    async def aclose(self) -> None:
+        await self.loop_thread.arun(self.close())
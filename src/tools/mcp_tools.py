@@ -1,28 +1,51 @@
 # src/tools/mcp_tools.py
 
 import asyncio
-import subprocess
+import concurrent.futures
+import hashlib
 import sys
 import os
 import logging
 import json
-from typing import List, Dict, Any, Optional
-import time
+from typing import List, Dict, Any, Optional, Union
 import threading
 
 # MCP 客户端导入
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+from mcp import StdioServerParameters
+
+from src.config import MCP_CATALOG_CACHE, MCP_SERVER_URL, MCP_TRANSPORT
+from .mcp_pool import MCPSessionPool, get_mcp_loop
 
 logger = logging.getLogger(__name__)
 
 
+def resolve_transport() -> str:
+    """把 MCP_TRANSPORT 解析为实际使用的传输方式：inprocess、stdio 或 http"""
+    if MCP_TRANSPORT == "auto":
+        return "http" if MCP_SERVER_URL else "inprocess"
+    return MCP_TRANSPORT
+
+
+def catalog_hash(tools: List[Dict[str, Any]]) -> str:
+    """工具目录（名称、描述、参数架构）的稳定哈希，目录不变时哈希不变"""
+    payload = json.dumps(tools, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
 class MCPTools:
     def __init__(self):
         self.available_tools: List[Dict[str, Any]] = []
-        self.server_params: Optional[StdioServerParameters] = None
+        self.catalog_hash: Optional[str] = None
+        # stdio 服务器的启动参数，或 http 传输时的服务地址
+        self.server_params: Optional[Union[StdioServerParameters, str]] = None
+        self.pool: Optional[MCPSessionPool] = None
+        # 进程内传输使用的内置工具注册表，为 None 时走 stdio 会话池
+        self.registry = None
         self.is_initialized = False
-        self._connection_lock = threading.Lock()  # 添加连接锁
+        # 初始化结束（无论成功与否）时置位，调用方等待它而不是 sleep
+        self.ready = threading.Event()
+        self._init_future: Optional[concurrent.futures.Future] = None
+        self._init_lock = threading.Lock()
 
     def __iter__(self):
         """使对象可迭代"""
@@ -32,54 +55,142 @@ class MCPTools:
         """返回工具数量"""
         return len(self.available_tools)
 
+    def start_initialization(self) -> concurrent.futures.Future:
+        """在 MCP 事件循环上开始连接并立即返回；初始化进行中或已成功时返回同一个任务"""
+        with self._init_lock:
+            if self._init_future is None or (self._init_future.done() and not self.is_initialized):
+                self.ready.clear()
+                self._init_future = get_mcp_loop().submit(self.connect_to_mcp_server())
+            return self._init_future
+
+    async def ainitialize(self) -> bool:
+        """异步初始化：等待连接完成但不阻塞当前事件循环"""
+        await asyncio.wrap_future(self.start_initialization())
+        return self.is_initialized
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """阻塞等待初始化结束，超时返回 False"""
+        self.start_initialization()
+        return self.ready.wait(timeout)
+
+    def _set_catalog(self, tools: List[Dict[str, Any]]) -> bool:
+        """更新工具目录并写入磁盘缓存，返回目录是否发生了变化"""
+        new_hash = catalog_hash(tools)
+        self.available_tools = tools
+        if new_hash == self.catalog_hash:
+            return False
+        logger.info(f"MCP tool catalog changed: {self.catalog_hash} -> {new_hash}")
+        self.catalog_hash = new_hash
+        self._save_catalog()
+        return True
+
+    def load_cached_catalog(self) -> bool:
+        """从磁盘加载上次的工具目录，使 Agent 在连接完成前就能构建（热启动）"""
+        if not MCP_CATALOG_CACHE or not os.path.exists(MCP_CATALOG_CACHE):
+            return False
+        try:
+            with open(MCP_CATALOG_CACHE, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("transport") != resolve_transport() or catalog_hash(cached["tools"]) != cached.get("hash"):
+                return False
+            self.available_tools = cached["tools"]
+            self.catalog_hash = cached["hash"]
+            logger.info(f"Loaded {len(self.available_tools)} MCP tools from catalog cache {self.catalog_hash}")
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to read MCP tool catalog cache: {e}")
+            return False
+
+    def _save_catalog(self) -> None:
+        if not MCP_CATALOG_CACHE:
+            return
+        try:
+            os.makedirs(os.path.dirname(MCP_CATALOG_CACHE), exist_ok=True)
+            tmp_path = f"{MCP_CATALOG_CACHE}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"transport": resolve_transport(), "hash": self.catalog_hash, "tools": self.available_tools},
+                    f,
+                    ensure_ascii=False,
+                    default=str,
+                )
+            os.replace(tmp_path, MCP_CATALOG_CACHE)
+        except Exception as e:
+            logger.warning(f"Failed to write MCP tool catalog cache: {e}")
+
+    def _on_registry_changed(self) -> None:
+        self._set_catalog(self.registry.list_tools())
+
+    async def refresh_tools(self) -> None:
+        """收到 tools/list_changed 通知后重新获取工具目录"""
+        if self.registry:
+            self._on_registry_changed()
+        elif self.pool:
+            await self._load_tools()
+
     async def call_mcp_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
-        """调用 MCP 工具 - 每次调用都创建新连接"""
-        if not self.is_initialized or not self.server_params:
+        """调用 MCP 工具 - 复用会话池中长期存活的会话，多个调用可以并发进行"""
+        if not self.is_initialized or not (self.pool or self.registry):
             logger.error("MCP not initialized. Please connect first.")
             return "Error: No MCP connection available"
 
-        # 使用连接锁确保线程安全
-        with self._connection_lock:
-            try:
-                logger.info(f"Calling MCP tool: {tool_name} with arguments: {arguments}")
-
-                # 每次调用都创建新的连接
-                async with stdio_client(self.server_params) as (read, write):
-                    async with ClientSession(read, write) as session:
-                        # 初始化会话
-                        await session.initialize()
-
-                        # 调用工具
-                        result = await session.call_tool(tool_name, arguments)
-
-                        # 处理结果
-                        if result.isError:
-                            error_msg = "Tool execution error"
-                            if result.content:
-                                error_msg = str(result.content[0].text if result.content[0].text else error_msg)
-                            logger.error(f"Tool {tool_name} returned error: {error_msg}")
-                            return f"Error: {error_msg}"
-
-                        # 成功结果
-                        if result.content and len(result.content) > 0:
-                            response = str(result.content[0].text)
-                            logger.info(f"Tool {tool_name} executed successfully")
-                            return response
-                        else:
-                            logger.warning(f"Tool {tool_name} returned empty result")
-                            return "Tool executed but returned no content"
+        if self.registry:
+            # 内置工具直接在进程内执行，结果和错误文本与 MCP 服务器完全一致
+            logger.info(f"Calling in-process tool: {tool_name} with arguments: {arguments}")
+            return await self.registry.call(tool_name, arguments)
 
-            except Exception as e:
-                error_msg = f"Error calling tool {tool_name}: {e}"
-                logger.exception(error_msg)
+        try:
+            logger.info(f"Calling MCP tool: {tool_name} with arguments: {arguments}")
+
+            # 调用工具
+            result = await self.pool.acall_tool(tool_name, arguments)
+
+            # 处理结果
+            if result.isError:
+                error_msg = "Tool execution error"
+                if result.content:
+                    error_msg = str(result.content[0].text if result.content[0].text else error_msg)
+                logger.error(f"Tool {tool_name} returned error: {error_msg}")
                 return f"Error: {error_msg}"
 
+            # 成功结果
+            if result.content and len(result.content) > 0:
+                response = str(result.content[0].text)
+                logger.info(f"Tool {tool_name} executed successfully")
+                return response
+            else:
+                logger.warning(f"Tool {tool_name} returned empty result")
+                return "Tool executed but returned no content"
+
+        except Exception as e:
+            error_msg = f"Error calling tool {tool_name}: {e}"
+            logger.exception(error_msg)
+            return f"Error: {error_msg}"
+
     async def connect_to_mcp_server(self, max_retries: int = 3, retry_delay: float = 1.0) -> bool:
-        """初始化 MCP 服务器连接参数"""
-        logger.info("Initializing MCP server connection parameters...")
+        """启动 MCP 会话池并获取工具列表，结束时置位 `ready`"""
+        try:
+            return await self._connect(max_retries, retry_delay)
+        finally:
+            self.ready.set()
+
+    async def _connect(self, max_retries: int, retry_delay: float) -> bool:
+        logger.info("Initializing MCP server connection pool...")
 
+        transport = resolve_transport()
         for attempt in range(max_retries):
             try:
+                # 独立运行的工具服务：多个 API worker 共享同一个服务，通过 streamable HTTP 连接
+                if transport == "http":
+                    if not MCP_SERVER_URL:
+                        logger.error("MCP_TRANSPORT is http but MCP_SERVER_URL is not set")
+                        return False
+                    logger.info(f"Connecting to MCP server at {MCP_SERVER_URL}")
+                    self.server_params = MCP_SERVER_URL
+                    if await self._start_pool():
+                        return True
+                    continue
+
                 # 确定服务器脚本的绝对路径
                 script_dir = os.path.dirname(os.path.abspath(__file__))
                 project_root = os.path.join(script_dir, '..', '..')
@@ -91,18 +202,25 @@ class MCPTools:
 
                 logger.info(f"Server script found at: {server_script}")
 
+                # 配置的就是内置的 DailyToolsMCPServer，无需子进程和序列化，直接使用共享的工具注册表
+                if transport == "inprocess":
+                    from src.daily_tools_mcp.registry import get_registry
+
+                    self.registry = get_registry()
+                    self.registry.remove_listener(self._on_registry_changed)
+                    self.registry.add_listener(self._on_registry_changed)
+                    self._set_catalog(self.registry.list_tools())
+                    self.is_initialized = True
+                    logger.info(f"Using in-process transport with {len(self.available_tools)} tools")
+                    return True
+
                 # 创建并保存服务器参数
                 self.server_params = StdioServerParameters(
                     command=sys.executable,
                     args=[server_script],
                     env=None
                 )
-
-                # 测试连接并获取工具列表
-                success = await self._test_connection_and_get_tools()
-                if success:
-                    self.is_initialized = True
-                    logger.info("MCP server connection parameters initialized successfully")
+                if await self._start_pool():
                     return True
 
             except Exception as e:
@@ -115,36 +233,44 @@ class MCPTools:
 
         return False
 
-    async def _test_connection_and_get_tools(self) -> bool:
-        """测试连接并获取工具列表"""
+    async def _start_pool(self) -> bool:
+        """为 `server_params` 启动会话池并获取工具列表"""
+        if self.pool:
+            await self.pool.aclose()
+        self.pool = MCPSessionPool(self.server_params, on_tools_changed=self.refresh_tools)
+        await self.pool.astart()
+
+        # 获取工具列表
+        success = await self._load_tools()
+        if success:
+            self.is_initialized = True
+            logger.info("MCP server connection pool initialized successfully")
+        return success
+
+    async def _load_tools(self) -> bool:
+        """通过会话池获取工具列表"""
         try:
-            async with stdio_client(self.server_params) as (read, write):
-                async with ClientSession(read, write) as session:
-                    logger.info("Testing connection to MCP server")
-
-                    # 初始化连接
-                    init_result = await session.initialize()
-                    logger.info(f"Server initialization result: {init_result}")
-
-                    # 获取可用工具列表
-                    tools_result = await session.list_tools()
-                    logger.info(f"Retrieved {len(tools_result.tools)} tools from server")
-
-                    # 存储工具信息
-                    self.available_tools = []
-                    for tool in tools_result.tools:
-                        tool_info = {
-                            'name': tool.name,
-                            'description': tool.description,
-                            'input_schema': tool.inputSchema
-                        }
-                        self.available_tools.append(tool_info)
-                        logger.info(f"Available tool: {tool.name} - {tool.description}")
-
-                    return True
+            tools = await self.pool.alist_tools()
+            logger.info(f"Retrieved {len(tools)} tools from server")
+
+            # 存储工具信息
+            available_tools = []
+            for tool in tools:
+                tool_info = {
+                    'name': tool.name,
+                    'description': tool.description,
+                    'input_schema': tool.inputSchema,
+                    # 内置工具服务在 _meta 中声明支持的输出形式，其他 MCP 服务没有
+                    'output_modes': (tool.meta or {}).get('output_modes'),
+                }
+                available_tools.append(tool_info)
+                logger.info(f"Available tool: {tool.name} - {tool.description}")
+            self._set_catalog(available_tools)
+
+            return True
 
         except Exception as e:
-            logger.error(f"Failed to test connection: {e}")
+            logger.error(f"Failed to list tools: {e}")
             return False
 
 
@@ -153,10 +279,19 @@ class MCPTools:
         return self.available_tools
 
     async def close_connection(self):
-        """清理连接信息"""
+        """关闭会话池并清理连接信息"""
+        if self.pool:
+            await self.pool.aclose()
+            self.pool = None
+        if self.registry:
+            self.registry.remove_listener(self._on_registry_changed)
+        self.registry = None
         self.server_params = None
         self.is_initialized = False
         self.available_tools = []
+        self.catalog_hash = None
+        self._init_future = None
+        self.ready.clear()
         logger.info("MCP connection info cleared")
 
 
@@ -188,20 +323,12 @@ def get_mcp_tools_sync() -> MCPTools:
     if _mcp_tools_instance is None:
         with _instance_lock:
             if _mcp_tools_instance is None:
-                _mcp_tools_instance = MCPTools()
-
-                # 在后台线程中初始化连接
-                def init_in_background():
-                    try:
-                        asyncio.run(_mcp_tools_instance.connect_to_mcp_server())
-                    except Exception as e:
-                        logger.error(f"Failed to initialize MCP in background: {e}")
-
-                init_thread = threading.Thread(target=init_in_background, daemon=True)
-                init_thread.start()
-
-                # 给初始化一些时间
-                time.sleep(2)
+                instance = MCPTools()
+                # 先加载磁盘上的工具目录，再在 MCP 事件循环上后台连接，不阻塞调用方。
+                # 需要连接结果的调用方使用 wait_until_ready() / ainitialize() 等待
+                instance.load_cached_catalog()
+                instance.start_initialization()
+                _mcp_tools_instance = instance
 
     return _mcp_tools_instance
 
@@ -211,45 +338,23 @@ async def call_mcp_tool_async(tool_name: str, arguments: Dict[str, Any]) -> str:
     # [MODIFIED] 修改了这里，确保调用 get_mcp_tools_sync() 获取实例
     mcp_tools = get_mcp_tools_sync()
 
-    # 如果未初始化，尝试连接
+    # 等待后台初始化完成；上次初始化失败时会重新连接
     if not mcp_tools.is_initialized:
-        logger.info("MCP not initialized, attempting to connect...")
-        success = await mcp_tools.connect_to_mcp_server()
-        if not success:
+        logger.info("MCP not initialized, waiting for the connection...")
+        if not await mcp_tools.ainitialize():
             return "Error: Failed to connect to MCP server"
 
     return await mcp_tools.call_mcp_tool(tool_name, arguments)
 
 
-# [MODIFIED] START: 完全替换旧的 call_mcp_tool_sync 函数
 def call_mcp_tool_sync(tool_name: str, arguments: Dict[str, Any]) -> str:
-    """同步调用 MCP 工具（修正版）"""
-    try:
-        # 检查当前线程中是否有正在运行的事件循环
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        # 如果没有事件循环，这是最简单的情况：
-        # 直接使用 asyncio.run() 来启动并运行 async 函数
-        logger.debug("No running event loop, using asyncio.run()")
-        return asyncio.run(call_mcp_tool_async(tool_name, arguments))
-
-    # 如果代码执行到这里，说明事件循环已经存在
-    if loop.is_running():
-        # 如果事件循环正在运行，我们不能阻塞它。
-        # 必须使用 run_coroutine_threadsafe 将 async 函数提交到该循环，
-        # 然后等待结果。这是从同步代码与正在运行的异步代码交互的正确方法。
-        logger.debug("Event loop is running, using run_coroutine_threadsafe()")
-        future = asyncio.run_coroutine_threadsafe(
-            call_mcp_tool_async(tool_name, arguments),
-            loop
-        )
-        # 设置超时等待结果
-        return future.result(timeout=30)
-    else:
-        # 如果循环存在但已停止，我们可以安全地使用它来运行我们的函数
-        logger.debug("Event loop exists but is not running, using loop.run_until_complete()")
-        return loop.run_until_complete(call_mcp_tool_async(tool_name, arguments))
-# [MODIFIED] END: 替换结束
+    """
+    同步调用 MCP 工具。
+
+    调用在会话池的事件循环线程上执行，因此当前线程有没有正在运行的事件循环都不影响，
+    也不会像在运行中的循环上 run_coroutine_threadsafe 再阻塞等待那样死锁。
+    """
+    return get_mcp_loop().run(call_mcp_tool_async(tool_name, arguments))
 
 
 # [MODIFIED] START: 修正了下面所有兼容性函数的逻辑，以消除循环调用
@@ -25,9 +25,8 @@ from mcp.types import (
     TextContent,
 )
 
-# 导入工具
-from src.daily_tools_mcp.tools import *
-from src.daily_tools_mcp.tools.base_tool import BaseTool
+# 工具通过插件发现注册，实现模块在第一次调用时才导入
+from src.daily_tools_mcp.registry import create_default_registry
 
 # 设置日志 - 确保日志立即刷新
 handler = logging.StreamHandler(sys.stderr)
@@ -45,28 +44,17 @@ logger = logging.getLogger(__name__)
 server = Server("daily_tools_mcp")
 
 # 工具注册表
-tools_registry: dict[str, BaseTool] = {}
+tools_registry = {}
 
 
 def load_and_register_tools():
     """加载和注册工具"""
     logger.info("Starting to load and register tools...")
 
-    # 根据你的工具结构来注册
-    tool_classes_to_register = [
-        LogisticsTool,
-        # 未来可以添加更多工具
-        # WeatherTool,
-        # TranslatorTool,
-    ]
-
-    for tool_class in tool_classes_to_register:
-        try:
-            instance = tool_class()
-            tools_registry[instance.get_name()] = instance
-            logger.info(f"Successfully registered tool: {instance.get_name()}")
-        except Exception as e:
-            logger.exception(f"Failed to register tool {tool_class.__name__}: {e}")
+    try:
+        tools_registry.update(create_default_registry().tools)
+    except Exception as e:
+        logger.exception(f"Failed to discover tools: {e}")
 
     logger.info(f"Total tools registered: {len(tools_registry)}")
 
@@ -108,7 +96,7 @@ async def handle_call_tool(name: str, arguments: dict) -> CallToolResult:
 
     try:
         # 调用你的工具实例
-        result = await instance.execute(arguments)
+        result = await instance.run(arguments)
         logger.info(f"Tool {name} executed successfully")
         logger.debug(f"Tool result: {result[:200]}...")  # 只显示前200个字符
 
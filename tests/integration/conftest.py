@@ -0,0 +1,48 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from src.crawler import Article
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    # 默认的 listen 队列只有 5，并发测试的连接超出后要等约 1 秒的 SYN 重传
+    request_queue_size = 64
+
+
+class TitleExtractor:
+    """Extractor for the stub pages: takes the `<title>` and keeps the HTML as is."""
+
+    def extract_article(self, html):
+        return Article(
+            title=html.split("<title>")[1].split("</title>")[0], html_content=html
+        )
+
+
+@pytest.fixture
+def stub_server():
+    """
+    Start local HTTP servers for the test.
+
+    Call the fixture with a `BaseHTTPRequestHandler` subclass; it returns the
+    base URL of a server on a free port. The servers are shut down after the
+    test.
+    """
+    servers = []
+
+    def start(handler):
+        server = StubHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def title_extractor():
+    return TitleExtractor()
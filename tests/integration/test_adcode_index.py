@@ -0,0 +1,30 @@
+import pytest
+
+from src.daily_tools_mcp.tools.adcode_index import AdcodeIndex, LearnedAdcodes
+
+
+@pytest.mark.parametrize(
+    "query, adcode",
+    [
+        ("北京", "110000"),
+        ("Shenzhen", "440300"),
+        ("Hong Kong", "810000"),
+        ("朝阳", "211300"),
+        ("北京市朝阳区", "110105"),
+        ("长春朝阳区", "220104"),
+        ("乌鲁木", "650100"),
+        ("hangzou", "330100"),
+    ],
+)
+def test_lookup(query, adcode):
+    assert AdcodeIndex().lookup(query).adcode == adcode
+
+
+def test_unknown_places_miss():
+    assert AdcodeIndex().lookup("中关村") is None
+
+
+def test_learned_adcodes_are_persisted(tmp_path):
+    path = str(tmp_path / "adcodes.json")
+    LearnedAdcodes(path).add("中关村", "110108", "北京市海淀区中关村")
+    assert LearnedAdcodes(path).get(" 中关村 ").adcode == "110108"
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+import pytest
+
+from src.crawler import AsyncCrawler
+
+DELAY = 0.2
+
+
+class StubReaderHandler(BaseHTTPRequestHandler):
+    """Jina Reader stand-in: returns a small page per URL and records concurrency per target host."""
+
+    failures = 0
+    active = {}
+    peak = {}
+    total_active = 0
+    total_peak = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        url = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["url"]
+        host = urlsplit(url).netloc
+        if StubReaderHandler.failures:
+            StubReaderHandler.failures -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        with StubReaderHandler.lock:
+            StubReaderHandler.active[host] = StubReaderHandler.active.get(host, 0) + 1
+            StubReaderHandler.peak[host] = max(
+                StubReaderHandler.peak.get(host, 0), StubReaderHandler.active[host]
+            )
+            StubReaderHandler.total_active += 1
+            StubReaderHandler.total_peak = max(
+                StubReaderHandler.total_peak, StubReaderHandler.total_active
+            )
+        time.sleep(DELAY)
+        with StubReaderHandler.lock:
+            StubReaderHandler.active[host] -= 1
+            StubReaderHandler.total_active -= 1
+        body = f"<html><head><title>{url}</title></head><body><p>{url}</p></body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def crawler(stub_server, title_extractor):
+    StubReaderHandler.failures = 0
+    StubReaderHandler.active = {}
+    StubReaderHandler.peak = {}
+    StubReaderHandler.total_active = 0
+    StubReaderHandler.total_peak = 0
+    return AsyncCrawler(
+        reader_url=stub_server(StubReaderHandler) + "/",
+        timeout=5,
+        max_retries=1,
+        max_concurrency=8,
+        per_host_limit=2,
+        extractor=title_extractor,
+        backends=["jina"],
+    )
+
+
+def test_crawl_many_is_parallel_ordered_and_limited_per_host(crawler):
+    urls = [f"https://site{i % 4}.example/page{i}" for i in range(8)]
+
+    async def run():
+        # 先用一个无关请求预热客户端和连接，再清零统计
+        await crawler.crawl_many(["https://warmup.example/"])
+        with StubReaderHandler.lock:
+            StubReaderHandler.peak = {}
+            StubReaderHandler.total_peak = 0
+        return await crawler.crawl_many(urls)
+
+    results = asyncio.run(run())
+    assert [article.title for article in results] == urls
+    # 8 个页面分属 4 个站点：请求之间有重叠，但每个站点最多 2 个并发
+    assert StubReaderHandler.total_peak > 1
+    assert max(StubReaderHandler.peak.values()) <= 2
+
+
+def test_failures_are_retried_and_returned_in_place(crawler):
+    StubReaderHandler.failures = 1
+    results = asyncio.run(crawler.crawl_many(["https://a.example/1"]))
+    assert results[0].title == "https://a.example/1"
+
+    crawler.policy.fetchers[0].max_retries = 0
+    StubReaderHandler.failures = 1
+    results = asyncio.run(
+        crawler.crawl_many(["https://a.example/1", "https://b.example/2"])
+    )
+    assert isinstance(results[0], Exception) != isinstance(results[1], Exception)
@@ -0,0 +1,61 @@
+import json
+
+from langchain_core.messages import HumanMessage
+
+from src.graph.compaction import (
+    expand_worker_outputs,
+    progress_message,
+    summarize_output,
+    worker_update,
+)
+
+
+def build_state(*updates, full_plan=None):
+    state = {
+        "messages": [HumanMessage(content="research and plot")],
+        "worker_outputs": [],
+    }
+    for update in updates:
+        state["messages"] = state["messages"] + update["messages"]
+        state["worker_outputs"] = state["worker_outputs"] + update["worker_outputs"]
+    if full_plan:
+        state["full_plan"] = full_plan
+    return state
+
+
+def test_short_outputs_are_kept_verbatim():
+    assert summarize_output("done") == "done"
+
+
+def test_long_outputs_are_summarized_once():
+    content = "head " + "x" * 5000 + " tail"
+    update = worker_update("researcher", content)
+    message = update["messages"][0]
+    assert len(message.content) < 1000
+    assert "head" in message.content and "tail" in message.content
+    assert update["worker_outputs"][0]["content"] == content
+
+
+def test_reporter_sees_full_outputs():
+    content = "y" * 5000
+    state = build_state(
+        worker_update("researcher", content), worker_update("coder", "ok")
+    )
+    messages = expand_worker_outputs(state)
+    assert content in messages[1].content
+    assert messages[2] is state["messages"][2]
+
+
+def test_progress_marks_finished_steps():
+    plan = json.dumps(
+        {
+            "steps": [
+                {"agent_name": "researcher", "title": "Search"},
+                {"agent_name": "coder", "title": "Plot"},
+            ]
+        }
+    )
+    state = build_state(worker_update("researcher", "found"), full_plan=plan)
+    content = progress_message(state).content
+    assert "- [x] Step 1 (researcher): Search" in content
+    assert "- [ ] Step 2 (coder): Plot" in content
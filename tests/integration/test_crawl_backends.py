@@ -0,0 +1,185 @@
+import asyncio
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+import httpx
+import pytest
+
+from src.crawler import AsyncCrawler, DirectFetcher, FetchError
+from src.crawler import fetchers
+from src.crawler.fetchers import decode_html, is_public_address
+
+ARTICLE = (
+    "<html><head><meta charset='gbk'><title>新闻</title></head><body><p>"
+    + "北京今天晴，" * 60
+    + "</p></body></html>"
+)
+SHELL = "<html><head><title>App</title></head><body><div id='root'></div><script>render()</script></body></html>"
+READER = "<html><head><title>Rendered</title></head><body><p>rendered</p></body></html>"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Origin site with a static page, a JavaScript shell and a disallowed path; POST is Jina Reader."""
+
+    posts = []
+    gets = []
+    hosts = []
+
+    def do_POST(self):
+        StubHandler.posts.append(self.rfile.read(int(self.headers["Content-Length"])))
+        self._send(READER.encode(), "text/html")
+
+    def do_GET(self):
+        StubHandler.gets.append(self.path)
+        StubHandler.hosts.append(self.headers["Host"])
+        if self.path.startswith("/redirect"):
+            self.send_response(302)
+            self.send_header("Location", self.path.split("?to=", 1)[1])
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path == "/robots.txt":
+            self._send(b"User-agent: *\nDisallow: /private\n", "text/plain")
+        elif self.path == "/article":
+            self._send(ARTICLE.encode("gbk"), "text/html")
+        else:
+            self._send(SHELL.encode(), "text/html; charset=utf-8")
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base(stub_server):
+    StubHandler.posts = []
+    StubHandler.gets = []
+    StubHandler.hosts = []
+    return stub_server(StubHandler)
+
+
+def test_decode_html_prefers_declared_charsets():
+    assert (
+        decode_html("<p>天气</p>".encode("gbk"), "text/html; charset=GB2312")
+        == "<p>天气</p>"
+    )
+    assert decode_html("<meta charset='gbk'><p>天气</p>".encode("gbk")).endswith(
+        "天气</p>"
+    )
+    assert decode_html("<p>天气</p>".encode("utf-8")) == "<p>天气</p>"
+
+
+def test_direct_first_with_per_host_fallback_to_jina(base, title_extractor):
+    crawler = AsyncCrawler(
+        reader_url=f"{base}/",
+        timeout=5,
+        extractor=title_extractor,
+        backends=["direct", "jina"],
+    )
+    crawler.policy.fetchers[0].allow_private_hosts = True
+
+    async def fetch(path):
+        return await crawler.fetch(f"{base}{path}")
+
+    # 静态页面直接抓取，按 meta 中声明的编码解码
+    result = asyncio.run(fetch("/article"))
+    assert result.backend == "direct" and "北京今天晴" in result.html
+    assert StubHandler.posts == []
+
+    # robots.txt 禁止或需要 JavaScript 渲染的页面交给 Jina Reader
+    assert asyncio.run(fetch("/private/page")).backend == "jina"
+    assert asyncio.run(fetch("/app")).backend == "jina"
+    assert len(StubHandler.posts) == 2
+
+    # 记住这个站点最后可用的后端，之后先用它
+    host = urlsplit(base).netloc
+    assert crawler.policy.remembered(host) == "jina"
+    assert [fetcher.name for fetcher in crawler.policy.order(host)] == [
+        "jina",
+        "direct",
+    ]
+
+
+def test_direct_fetcher_refuses_non_public_hosts(base, title_extractor):
+    for address in (
+        "127.0.0.1",
+        "10.1.2.3",
+        "192.168.0.1",
+        "169.254.169.254",
+        "::1",
+        "fe80::1",
+        "::ffff:10.0.0.1",
+    ):
+        assert not is_public_address(address)
+    assert is_public_address("8.8.8.8") and is_public_address("2606:4700::1111")
+
+    crawler = AsyncCrawler(
+        reader_url=f"{base}/",
+        timeout=5,
+        extractor=title_extractor,
+        backends=["direct", "jina"],
+    )
+    result = asyncio.run(crawler.fetch(f"{base}/article"))
+    assert result.backend == "jina"
+    # 拒绝发生在任何请求之前，连 robots.txt 也不探测
+    assert StubHandler.gets == []
+
+
+def test_every_redirect_hop_and_robots_probe_is_checked(base, monkeypatch):
+    checked = []
+
+    async def check(url):
+        checked.append(url)
+        # 把 127.0.0.1 当作公网地址，localhost 当作内网地址
+        if urlsplit(url).hostname == "localhost":
+            raise FetchError("non-public address")
+
+    monkeypatch.setattr(fetchers, "check_public_host", check)
+    internal = f"http://localhost:{urlsplit(base).port}/article"
+    fetcher = DirectFetcher(timeout=5)
+
+    async def fetch(url):
+        async with httpx.AsyncClient() as client:
+            return await fetcher.fetch(client, url, {})
+
+    assert "北京今天晴" in asyncio.run(fetch(f"{base}/redirect?to=/article")).html
+    assert checked == [
+        f"{base}/redirect?to=/article",
+        f"{base}/robots.txt",
+        f"{base}/article",
+    ]
+
+    checked.clear()
+    StubHandler.gets = []
+    with pytest.raises(FetchError):
+        asyncio.run(fetch(f"{base}/redirect?to={internal}"))
+    assert checked[-1] == internal
+    assert StubHandler.gets == ["/redirect?to=" + internal]
+
+
+def test_requests_connect_to_the_checked_address(base, monkeypatch):
+    port = urlsplit(base).port
+
+    async def check(url):
+        # 检查时解析到的地址；之后再解析这个主机名会失败，不能再次解析
+        assert urlsplit(url).hostname == "pinned.example"
+        return "127.0.0.1"
+
+    monkeypatch.setattr(fetchers, "check_public_host", check)
+    fetcher = DirectFetcher(timeout=5)
+
+    async def fetch(url):
+        async with httpx.AsyncClient() as client:
+            return await fetcher.fetch(client, url, {})
+
+    origin = f"http://pinned.example:{port}"
+    result = asyncio.run(fetch(f"{origin}/redirect?to=/article"))
+    assert "北京今天晴" in result.html
+    # 结果和重定向都使用原始主机名，请求带原始 Host 头
+    assert result.url == f"{origin}/article"
+    assert StubHandler.hosts == [f"pinned.example:{port}"] * 3
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from src.crawler import Article, AsyncCrawler, CrawlCache, normalize_url
+from src.crawler.cache import ttl_for
+
+ETAG = '"v1"'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Jina Reader (POST) and the origin site (GET with ETag, no robots.txt) on one server."""
+
+    posts = 0
+    gets = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        StubHandler.posts += 1
+        body = b"<html><head><title>Page</title></head><body><p>Hello</p></body></html>"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/robots.txt":
+            self.send_error(404)
+            return
+        StubHandler.gets.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = (
+            b"<html><head><title>Page</title></head><body><p>"
+            + b"Hello " * 50
+            + b"</p></body></html>"
+        )
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base(stub_server):
+    StubHandler.posts = 0
+    StubHandler.gets = []
+    return stub_server(StubHandler)
+
+
+def test_normalize_url_and_domain_ttls():
+    assert (
+        normalize_url("HTTPS://Example.COM:443/a?b=2&utm_source=x&a=1#top")
+        == "https://example.com/a?a=1&b=2"
+    )
+    assert normalize_url("http://example.com") == "http://example.com/"
+    ttls = {"wikipedia.org": 86400, "en.wikipedia.org": 600}
+    assert ttl_for("https://zh.wikipedia.org/wiki/X", ttls, 60) == 86400
+    assert ttl_for("https://en.wikipedia.org/wiki/X", ttls, 60) == 600
+    assert ttl_for("https://example.com/", ttls, 60) == 60
+
+
+def test_hits_and_revalidation(base, tmp_path, title_extractor):
+    cache = CrawlCache(str(tmp_path / "crawl.db"))
+    crawler = AsyncCrawler(
+        reader_url=f"{base}/",
+        timeout=5,
+        extractor=title_extractor,
+        cache=cache,
+    )
+    # 测试源站在本机，需要允许直接抓取回环地址
+    for fetcher in crawler.policy.fetchers:
+        fetcher.allow_private_hosts = True
+    url = f"{base}/article"
+
+    first = asyncio.run(crawler.crawl(url))
+    assert not first.cache_hit and StubHandler.gets == [None]
+
+    # 同一页面换了跟踪参数仍命中，且不再请求任何上游
+    second = asyncio.run(crawler.crawl(url + "?utm_source=feed"))
+    assert second.cache_hit and StubHandler.gets == [None]
+    assert second.to_markdown() == first.to_markdown()
+
+    # 过期后用 ETag 条件请求，源站返回 304 时继续使用缓存
+    cache._connect().execute(
+        "UPDATE crawl_cache SET expires_at = ?", (time.time() - 1,)
+    )
+    third = asyncio.run(crawler.crawl(url))
+    assert third.cache_hit and StubHandler.gets == [None, ETAG]
+    assert StubHandler.posts == 0
+    assert cache.get(url).fresh
+
+
+def test_lru_eviction_keeps_total_size_bounded(tmp_path):
+    cache = CrawlCache(str(tmp_path / "crawl.db"), max_bytes=10**9)
+    page = Article(title="t", html_content="", markdown="x")
+    for i in range(3):
+        cache.put(f"https://example.com/{i}", f"<p>{i}</p>" * 50, page)
+    entry_size = cache.stats()["bytes"] // 3
+    cache.max_bytes = entry_size * 3
+    time.sleep(0.01)
+    cache.get("https://example.com/0")
+
+    cache.put("https://example.com/3", "<p>3</p>" * 50, page)
+    assert cache.get("https://example.com/1") is None
+    assert all(cache.get(f"https://example.com/{i}") for i in (0, 2, 3))
+    assert cache.stats()["bytes"] <= cache.max_bytes
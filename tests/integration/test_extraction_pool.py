@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from src.crawler import ExtractionPool
+from src.crawler.extraction import prepare_html
+from src.metrics import metrics
+
+PAGE = (
+    "<html><head><title>Weather</title><style>p { color: red }</style></head><body>"
+    "<nav><a href='/'>Home</a></nav><article><h1>Beijing</h1>"
+    + "<p>Sunny with a light breeze in the afternoon.</p>" * 10
+    + "<img src='data:image/png;base64,"
+    + "A" * 1000
+    + "'><script>track()</script></article></body></html>"
+)
+
+
+def test_prepare_html_drops_heavy_blocks_and_truncates_at_a_tag():
+    prepared = prepare_html(PAGE, max_chars=10**6)
+    assert (
+        "track()" not in prepared
+        and "color: red" not in prepared
+        and "AAAA" not in prepared
+    )
+    assert "Sunny" in prepared
+
+    truncated = prepare_html(PAGE, max_chars=300)
+    assert len(truncated) <= 300 and truncated.endswith(">")
+
+
+def test_extraction_runs_in_worker_processes_with_a_timeout():
+    pool = ExtractionPool(workers=1, timeout=60)
+    try:
+        article = asyncio.run(pool.extract(PAGE, "fast"))
+        assert article.title == "Weather"
+        assert article.to_markdown().startswith("# Weather\n\n# Beijing\n\nSunny")
+        assert "Home" not in article.markdown
+
+        # 超时后结束工作进程、重建进程池
+        pool.timeout = 0
+        timeouts = metrics.get("crawler_extract_timeouts")
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(pool.extract(PAGE, "fast"))
+        assert metrics.get("crawler_extract_timeouts") == timeouts + 1
+        assert pool._executor is None
+    finally:
+        pool.shutdown()
+
+
+def test_fast_retry_runs_on_the_rebuilt_pool(monkeypatch):
+    pool = ExtractionPool(workers=1, timeout=60)
+    run = pool._run
+    modes = []
+
+    async def slow_unless_fast(html, mode):
+        modes.append(mode)
+        if mode != "fast":
+            raise asyncio.TimeoutError
+        return await run(html, mode)
+
+    monkeypatch.setattr(pool, "_run", slow_unless_fast)
+    try:
+        article = asyncio.run(pool.extract(PAGE, "readabilipy"))
+        assert "Sunny" in article.markdown
+        assert modes == ["readabilipy", "fast"]
+        # 重试在工作进程中进行，不在服务进程的线程里
+        assert pool._executor is not None
+
+        # 重试同样受超时限制
+        pool.timeout = 0
+        pool.shutdown()
+        timeouts = metrics.get("crawler_extract_timeouts")
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(pool.extract(PAGE, "readabilipy"))
+        assert metrics.get("crawler_extract_timeouts") == timeouts + 2
+    finally:
+        pool.shutdown()
+
+
+def test_jobs_wait_for_a_free_worker_before_the_timeout_starts(monkeypatch):
+    pool = ExtractionPool(workers=1, timeout=60)
+    running, peak = [0], [0]
+    get_executor = pool._get_executor
+
+    class CountingExecutor:
+        def submit(self, fn, *args):
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            future = get_executor().submit(fn, *args)
+            future.add_done_callback(lambda _: running.__setitem__(0, running[0] - 1))
+            return future
+
+    monkeypatch.setattr(pool, "_get_executor", CountingExecutor)
+
+    async def run():
+        return await asyncio.gather(*(pool.extract(PAGE, "fast") for _ in range(4)))
+
+    try:
+        articles = asyncio.run(run())
+        assert [article.title for article in articles] == ["Weather"] * 4
+        # 4 个任务、1 个工作进程：任务逐个提交，没有在进程池中排队
+        assert peak[0] == 1
+    finally:
+        pool.shutdown()
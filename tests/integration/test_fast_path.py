@@ -0,0 +1,97 @@
+import json
+
+from src.classifier import (
+    Decision,
+    FastPathClassifier,
+    NgramClassifier,
+    RuleClassifier,
+    normalize_query,
+)
+from src.classifier.ngram import train_from_log
+
+
+def test_rules_answer_greetings_with_a_template():
+    fast_path = FastPathClassifier([RuleClassifier()])
+    decision = fast_path.classify("你好！")
+    assert decision.label == "chat"
+    assert "BuptManus" in decision.reply
+
+    decision = fast_path.classify("Hello!")
+    assert decision.reply.startswith("Hello")
+
+
+def test_rules_route_obvious_tasks_to_the_planner():
+    fast_path = FastPathClassifier([RuleClassifier()])
+    assert fast_path.classify("帮我查询一下北京明天的天气").label == "task"
+    assert fast_path.classify("Please research the history of MCP").label == "task"
+    assert fast_path.classify("what do you think about that") is None
+
+
+def test_small_talk_with_task_keywords_goes_to_the_llm():
+    fast_path = FastPathClassifier([RuleClassifier()], threshold=0.9)
+    for query in [
+        "thanks for the report",
+        "谢谢你的报告",
+        "今天天气真好啊",
+        "are you open source?",
+        "the weather report was great",
+        "我觉得这个分析不错",
+    ]:
+        decision = fast_path.classify(query)
+        assert decision is None or decision.label == "chat", query
+    # 只有关键词、没有明确请求句式时，置信度低于阈值
+    assert RuleClassifier().classify(normalize_query("北京明天的天气")).confidence < 0.9
+
+
+def test_ngram_classifier_learns_from_samples():
+    samples = [
+        (normalize_query(q), "chat")
+        for q in ["how are you", "how is it going", "nice to meet you"]
+    ]
+    samples += [
+        (normalize_query(q), "task")
+        for q in ["price of nvidia stock", "price of gold today", "latest stock price"]
+    ]
+    classifier = NgramClassifier().train(samples)
+
+    assert classifier.classify("stock price of apple").label == "task"
+    assert classifier.classify("how are you doing").label == "chat"
+
+
+def test_llm_decisions_are_cached_logged_and_trainable(tmp_path):
+    log_path = tmp_path / "decisions.jsonl"
+    fast_path = FastPathClassifier([], decision_log=str(log_path))
+
+    assert fast_path.classify("Tell me about Nanjing tangbao") is None
+    fast_path.record("Tell me about Nanjing tangbao", "task")
+    assert fast_path.classify("tell me about nanjing tangbao?") == Decision(
+        label="task", confidence=1.0, source="llm"
+    )
+
+    fast_path.record("how are you", "chat")
+    records = [
+        json.loads(line) for line in log_path.read_text(encoding="utf-8").splitlines()
+    ]
+    assert [r["label"] for r in records] == ["task", "chat"]
+
+    model_path = tmp_path / "model.json"
+    train_from_log(str(log_path), str(model_path))
+    assert NgramClassifier.load(str(model_path)).doc_counts == {"task": 1, "chat": 1}
+
+
+def test_follow_up_turns_are_cached_with_the_previous_message(tmp_path):
+    log_path = tmp_path / "decisions.jsonl"
+    fast_path = FastPathClassifier([], decision_log=str(log_path))
+
+    fast_path.record("what about tomorrow", "chat", context="Nice to meet you too!")
+    assert (
+        fast_path.classify("what about tomorrow", context="Nice to meet you too!").label
+        == "chat"
+    )
+    # 同一句话跟在别的回复后面，或作为第一轮，都不能复用这个决定
+    assert (
+        fast_path.classify("what about tomorrow", context="Beijing is sunny today.")
+        is None
+    )
+    assert fast_path.classify("what about tomorrow") is None
+    assert not log_path.exists()
@@ -0,0 +1,49 @@
+from src.graph.handoff import HandoffDetector
+
+
+def run(chunks, window=8):
+    detector = HandoffDetector(window=window)
+    forwarded = [detector.feed(chunk) for chunk in chunks]
+    return detector, "".join(forwarded), detector.flush()
+
+
+def test_handoff_prefix_is_hidden():
+    """The handoff token is never forwarded, even when split across chunks."""
+    detector, forwarded, flushed = run(["hand", "off_to", "_planner", "()"])
+    assert detector.handoff
+    assert forwarded == "" and flushed == ""
+
+
+def test_fenced_handoff_is_hidden():
+    detector, forwarded, _ = run(["```", "python\n", "handoff_to_planner()", "\n```"])
+    assert detector.handoff
+    assert forwarded == ""
+
+
+def test_direct_answer_is_forwarded_immediately():
+    """A greeting diverges from the token on the first chunk and is not buffered."""
+    detector = HandoffDetector()
+    assert detector.feed("Hello") == "Hello"
+    assert detector.feed(", I am Buptmanus") == ", I am Buptmanus"
+    assert not detector.handoff
+
+
+def test_ambiguous_prefix_is_released_on_divergence():
+    detector = HandoffDetector()
+    assert detector.feed("ha") == ""
+    assert detector.feed("ppy to help") == "happy to help"
+    assert not detector.handoff
+
+
+def test_token_after_text_within_window():
+    """The token is still recognised after some text, and the partial token is held back."""
+    detector, forwarded, _ = run(["Sure. ", "hand", "off_to_planner()"])
+    assert detector.handoff
+    assert forwarded == "Sure. "
+
+
+def test_token_outside_window_is_ignored():
+    chunks = ["word "] * 3 + ["handoff_to_planner"]
+    detector, forwarded, _ = run(chunks, window=2)
+    assert not detector.handoff
+    assert forwarded == "".join(chunks)
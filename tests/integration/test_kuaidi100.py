@@ -0,0 +1,190 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs
+
+import pytest
+
+from src.daily_tools_mcp.tools import kuaidi100
+from src.daily_tools_mcp.tools.kuaidi100 import (
+    Kuaidi100Client,
+    SubscriptionStore,
+    detect_couriers,
+    resolve_courier,
+    sign,
+    status_ttl,
+)
+from src.daily_tools_mcp.tools.logistics_batch_tool import LogisticsBatchTool
+
+
+class StubKuaidi100Handler(BaseHTTPRequestHandler):
+    queries = []
+    subscriptions = []
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        param = json.loads(form["param"][0])
+        if self.path == "/poll":
+            StubKuaidi100Handler.subscriptions.append(param)
+            self.reply({"result": True, "returnCode": "200", "message": "提交成功"})
+            return
+        StubKuaidi100Handler.queries.append(param)
+        event_time = (datetime.now() - timedelta(hours=2)).strftime("%Y-%m-%d %H:%M:%S")
+        self.reply(
+            {
+                "message": "ok",
+                "state": "0",
+                "ischeck": "0",
+                "com": param["com"],
+                "nu": param["num"],
+                "data": [
+                    {
+                        "time": event_time,
+                        "ftime": event_time,
+                        "context": "快件已到达【北京转运中心】",
+                    }
+                ],
+            }
+        )
+
+    def reply(self, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url(stub_server):
+    StubKuaidi100Handler.queries = []
+    StubKuaidi100Handler.subscriptions = []
+    return stub_server(StubKuaidi100Handler)
+
+
+def make_client(base_url, tmp_path, callback_url=""):
+    return Kuaidi100Client(
+        base_url=base_url,
+        api_key="key",
+        customer_id="customer",
+        callback_url=callback_url,
+        callback_salt="salt",
+        store=SubscriptionStore(str(tmp_path / "kuaidi100.db")),
+    )
+
+
+def test_detect_courier_from_tracking_number():
+    assert detect_couriers("SF1234567890123") == (["shunfeng"], True)
+    assert detect_couriers("jt1234567890123") == (["jtexpress"], True)
+    assert detect_couriers("EA123456789CN") == (["ems"], True)
+    # 纯数字号段只作为候选，用户给出的快递公司优先
+    assert resolve_courier("731234567890", None) == "zhongtong"
+    assert resolve_courier("731234567890", "韵达") == "yunda"
+    # 单号前缀能唯一确定时纠正模型猜错的快递公司
+    assert resolve_courier("SF1234567890123", "中通") == "shunfeng"
+
+
+def test_status_ttl_follows_last_event():
+    now = datetime(2024, 5, 1, 12, 0, 0)
+    fresh = {"data": [{"ftime": "2024-05-01 11:59:00"}]}
+    stale = {"data": [{"ftime": "2024-04-30 12:00:00"}]}
+    assert status_ttl(fresh, now) == 60
+    assert status_ttl(stale, now) == 30 * 60
+    assert status_ttl({"ischeck": "1", "data": []}, now) == 24 * 60 * 60
+
+
+def test_repeated_query_is_served_from_cache(stub_url, tmp_path):
+    client = make_client(stub_url, tmp_path)
+
+    async def run():
+        first = await client.query("SF1234567890123", "中通", "1234")
+        second = await client.query("SF1234567890123", "中通", "1234")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert [query["com"] for query in StubKuaidi100Handler.queries] == ["shunfeng"]
+
+
+def test_subscription_callback_answers_later_queries(stub_url, tmp_path):
+    client = make_client(
+        stub_url, tmp_path, callback_url="https://example.com/api/kuaidi100/callback"
+    )
+    asyncio.run(client.query("YT1234567890123"))
+    assert StubKuaidi100Handler.subscriptions[0]["number"] == "YT1234567890123"
+
+    pushed = json.dumps(
+        {
+            "lastResult": {
+                "message": "ok",
+                "state": "3",
+                "ischeck": "1",
+                "com": "yuantong",
+                "nu": "YT1234567890123",
+                "data": [{"ftime": "2024-05-01 12:00:00", "context": "已签收"}],
+            }
+        }
+    )
+    assert not asyncio.run(client.handle_callback(pushed, "bad-sign"))
+    assert asyncio.run(client.handle_callback(pushed, sign(pushed + "salt")))
+
+    result = json.loads(asyncio.run(client.query("YT1234567890123")))
+    assert result["state"] == "3"
+    assert len(StubKuaidi100Handler.queries) == 1
+
+    # 推送的结果超过状态 TTL 后不再使用，重新实时查询
+    client.store._connect().execute("UPDATE subscriptions SET updated_at = 0")
+    client._status_cache.clear()
+    result = json.loads(asyncio.run(client.query("YT1234567890123")))
+    assert result["state"] == "0"
+    assert len(StubKuaidi100Handler.queries) == 2
+
+
+def test_callbacks_need_a_salt(stub_url, tmp_path):
+    client = make_client(
+        stub_url, tmp_path, callback_url="https://example.com/api/kuaidi100/callback"
+    )
+    client.callback_salt = ""
+    pushed = json.dumps({"lastResult": {"com": "yuantong", "nu": "YT1234567890123"}})
+
+    assert not asyncio.run(client.handle_callback(pushed, sign(pushed)))
+    asyncio.run(client.query("YT1234567890123"))
+    assert StubKuaidi100Handler.subscriptions == []
+    assert client.store.get_result("yuantong", "YT1234567890123") is None
+
+
+def test_status_cache_is_bounded(stub_url, tmp_path, monkeypatch):
+    monkeypatch.setattr(kuaidi100, "MAX_STATUS_CACHE", 2)
+    client = make_client(stub_url, tmp_path)
+
+    async def run():
+        for i in range(3):
+            await client.query(f"SF12345678901{i:02d}")
+
+    asyncio.run(run())
+    assert list(client._status_cache) == [
+        ("shunfeng", "SF1234567890101"),
+        ("shunfeng", "SF1234567890102"),
+    ]
+
+
+def test_batch_tool_queries_each_number_once(stub_url, tmp_path, monkeypatch):
+    monkeypatch.setattr(kuaidi100, "_client", make_client(stub_url, tmp_path))
+    tool = LogisticsBatchTool()
+    tool.concurrency = 2
+    shipments = [{"tracking_number": f"SF12345678901{i:02d}"} for i in range(4)]
+    shipments += [{"tracking_number": "SF1234567890100"}, {"tracking_number": "12345"}]
+
+    result = asyncio.run(tool.run({"shipments": shipments}))
+    lines = result.splitlines()
+    assert lines[0] == "共查询 5 个单号，成功 4 个，失败 1 个。"
+    assert len(lines) == 3 + 5
+    assert (
+        "| SF1234567890100 | shunfeng | 在途 | 快件已到达【北京转运中心】 |" in result
+    )
+    assert len(StubKuaidi100Handler.queries) == 4
@@ -0,0 +1,97 @@
+import asyncio
+
+import anyio
+import pytest
+from mcp.shared.exceptions import McpError
+from mcp.types import (
+    CONNECTION_CLOSED,
+    ErrorData,
+    ListToolsResult,
+    Tool,
+    ToolAnnotations,
+)
+
+from src.tools.mcp_pool import MCPSessionPool
+
+
+class FakeSession:
+    """Pooled session whose `call_tool` raises the queued errors, then succeeds."""
+
+    def __init__(self, id, errors):
+        self.id = id
+        self.session = self
+        self.errors = errors
+        self.calls = 0
+
+    async def call_tool(self, name, arguments, read_timeout_seconds=None):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def make_pool(monkeypatch, errors, idempotent=()):
+    pool = MCPSessionPool("http://127.0.0.1:1/mcp")
+    pool._idempotent_tools = set(idempotent)
+    sessions = []
+
+    async def acquire():
+        sessions.append(FakeSession(len(sessions), errors))
+        return sessions[-1]
+
+    async def discard(session):
+        pass
+
+    monkeypatch.setattr(pool, "_acquire", acquire)
+    monkeypatch.setattr(pool, "_release", lambda session: None)
+    monkeypatch.setattr(pool, "_discard", discard)
+    return pool, sessions
+
+
+def connection_closed():
+    return McpError(ErrorData(code=CONNECTION_CLOSED, message="Connection closed"))
+
+
+def test_unsent_request_is_retried_on_a_new_session(monkeypatch):
+    pool, sessions = make_pool(monkeypatch, [anyio.BrokenResourceError()])
+    assert asyncio.run(pool.call_tool("subscribe", {})) == "ok"
+    assert len(sessions) == 2
+
+
+@pytest.mark.parametrize("error", [anyio.EndOfStream, connection_closed])
+def test_request_that_may_have_run_is_only_retried_when_idempotent(monkeypatch, error):
+    pool, sessions = make_pool(monkeypatch, [error()])
+    with pytest.raises(type(error())):
+        asyncio.run(pool.call_tool("subscribe", {}))
+    assert len(sessions) == 1
+
+    pool, sessions = make_pool(monkeypatch, [error()], idempotent=["weather"])
+    assert asyncio.run(pool.call_tool("weather", {})) == "ok"
+    assert len(sessions) == 2
+
+
+def test_idempotent_tools_come_from_annotations(monkeypatch):
+    pool = MCPSessionPool("http://127.0.0.1:1/mcp")
+    tools = [
+        Tool(
+            name="weather",
+            inputSchema={},
+            annotations=ToolAnnotations(readOnlyHint=True),
+        ),
+        Tool(
+            name="put", inputSchema={}, annotations=ToolAnnotations(idempotentHint=True)
+        ),
+        Tool(name="subscribe", inputSchema={}),
+    ]
+
+    class Listing(FakeSession):
+        async def list_tools(self):
+            return ListToolsResult(tools=tools)
+
+    async def acquire():
+        return Listing(0, [])
+
+    monkeypatch.setattr(pool, "_acquire", acquire)
+    monkeypatch.setattr(pool, "_release", lambda session: None)
+    assert asyncio.run(pool.list_tools()) == tools
+    assert pool._idempotent_tools == {"weather", "put"}
@@ -0,0 +1,53 @@
+import json
+
+from src.graph.plan_parser import IncrementalPlanParser
+
+PLAN = {
+    "thought": 'The user wants a "report" on {braces} and [brackets].',
+    "title": "steps",
+    "steps": [
+        {"agent_name": "researcher", "title": "Search", "description": "Find {x}"},
+        {"agent_name": "coder", "title": "Compute", "description": 'Say \\"hi\\"'},
+        {"agent_name": "reporter", "title": "Report", "description": "Write it"},
+    ],
+}
+
+
+def feed_in_chunks(parser, text, size):
+    completed = []
+    for i in range(0, len(text), size):
+        completed.extend(parser.feed(text[i : i + size]))
+    return completed
+
+
+def test_steps_are_emitted_as_soon_as_complete():
+    """Each step is emitted by the chunk that closes it, not at the end."""
+    text = json.dumps(PLAN, ensure_ascii=False)
+    parser = IncrementalPlanParser()
+
+    first_step = json.dumps(PLAN["steps"][0], ensure_ascii=False)
+    first_step_end = text.index(first_step) + len(first_step)
+    assert parser.feed(text[: first_step_end - 1]) == []
+    assert parser.feed(text[first_step_end - 1 : first_step_end]) == [
+        (0, PLAN["steps"][0])
+    ]
+
+
+def test_chunk_boundaries_do_not_matter():
+    """Strings, escapes and nested braces are handled across any split."""
+    text = "```json\n" + json.dumps(PLAN, ensure_ascii=False, indent=2) + "\n```"
+    for size in (1, 3, 7, 64):
+        parser = IncrementalPlanParser()
+        completed = feed_in_chunks(parser, text, size)
+        assert [step for _, step in completed] == PLAN["steps"]
+        assert [index for index, _ in completed] == [0, 1, 2]
+        assert parser.text == text
+
+
+def test_incomplete_plan_yields_only_finished_steps():
+    """A truncated response still reports the steps that were completed."""
+    text = json.dumps(PLAN)
+    truncated = text[: text.index('"Compute"')]
+    parser = IncrementalPlanParser()
+    completed = feed_in_chunks(parser, truncated, 5)
+    assert completed == [(0, PLAN["steps"][0])]
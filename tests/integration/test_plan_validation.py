@@ -0,0 +1,173 @@
+import json
+import threading
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from pydantic import ValidationError
+
+import src.graph.nodes as nodes
+from src.graph.background import BackgroundTasks
+from src.config import TEAM_MEMBERS
+from src.graph.types import Plan
+from src.metrics import metrics
+
+PLAN = {
+    "thought": "Look it up",
+    "title": "Weather",
+    "steps": [
+        {"agent_name": "researcher", "title": "Search", "description": "Find it"},
+    ],
+}
+
+
+class FakePlannerLLM:
+    """Streams `response` and answers the repair request with `repair`."""
+
+    def __init__(self, response, repair=None):
+        self.response = response
+        self.repair = repair
+        self.repair_calls = []
+
+    def bind(self, **kwargs):
+        return self
+
+    def stream(self, messages):
+        for i in range(0, len(self.response), 7):
+            yield AIMessageChunk(content=self.response[i : i + 7])
+
+    def invoke(self, messages):
+        self.repair_calls.append(messages)
+        if isinstance(self.repair, Exception):
+            raise self.repair
+        return AIMessage(content=self.repair)
+
+    def with_structured_output(self, schema):
+        llm = self
+
+        class Structured:
+            def invoke(self, messages):
+                return schema.model_validate_json(llm.invoke(messages).content)
+
+        return Structured()
+
+
+@pytest.fixture
+def counters():
+    names = (
+        "planner_plans_total",
+        "planner_plans_parsed",
+        "planner_plans_repaired",
+        "planner_plans_failed",
+    )
+    before = {name: metrics.get(name) for name in names}
+    return lambda: {name: metrics.get(name) - before[name] for name in names}
+
+
+def plan_with(monkeypatch, llm, structured=False):
+    monkeypatch.setattr(nodes, "get_llm_by_type", lambda llm_type: llm)
+    monkeypatch.setattr(
+        nodes, "STRUCTURED_OUTPUT_LLM_TYPES", ["basic"] if structured else []
+    )
+    state = {
+        "messages": [HumanMessage(content="天气怎么样")],
+        "TEAM_MEMBERS": TEAM_MEMBERS,
+    }
+    return nodes.generate_plan(state)
+
+
+def test_step_must_name_a_team_member():
+    with pytest.raises(ValidationError):
+        Plan.model_validate(
+            {**PLAN, "steps": [{**PLAN["steps"][0], "agent_name": "x"}]}
+        )
+    with pytest.raises(ValidationError):
+        Plan.model_validate({**PLAN, "steps": []})
+
+
+def test_valid_plan_is_parsed_without_repair(monkeypatch, counters):
+    llm = FakePlannerLLM("```json\n" + json.dumps(PLAN) + "\n```")
+    plan = plan_with(monkeypatch, llm)
+
+    assert plan.steps[0].agent_name == "researcher"
+    assert llm.repair_calls == []
+    assert counters() == {
+        "planner_plans_total": 1,
+        "planner_plans_parsed": 1,
+        "planner_plans_repaired": 0,
+        "planner_plans_failed": 0,
+    }
+
+
+def test_malformed_json_is_repaired_once(monkeypatch, counters):
+    broken = json.dumps(PLAN)[:-5]
+    llm = FakePlannerLLM(broken, repair=json.dumps(PLAN))
+    plan = plan_with(monkeypatch, llm)
+
+    assert plan == Plan.model_validate(PLAN)
+    assert len(llm.repair_calls) == 1
+    # 修复请求带上原始回复和校验错误
+    assert llm.repair_calls[0][-2].content == broken
+    assert "Validation errors" in llm.repair_calls[0][-1].content
+    assert counters() == {
+        "planner_plans_total": 1,
+        "planner_plans_parsed": 0,
+        "planner_plans_repaired": 1,
+        "planner_plans_failed": 0,
+    }
+
+
+def test_schema_invalid_plan_is_repaired_with_structured_output(monkeypatch, counters):
+    invalid = json.dumps({**PLAN, "steps": [{"agent_name": "nobody", "title": "x"}]})
+    llm = FakePlannerLLM(invalid, repair=json.dumps(PLAN))
+    plan = plan_with(monkeypatch, llm, structured=True)
+
+    assert plan == Plan.model_validate(PLAN)
+    assert "agent_name" in llm.repair_calls[0][-1].content
+    assert counters()["planner_plans_repaired"] == 1
+
+
+def test_failed_repair_returns_none(monkeypatch, counters):
+    llm = FakePlannerLLM("not json", repair="still not json")
+    assert plan_with(monkeypatch, llm) is None
+    assert len(llm.repair_calls) == 1
+    assert counters() == {
+        "planner_plans_total": 1,
+        "planner_plans_parsed": 0,
+        "planner_plans_repaired": 0,
+        "planner_plans_failed": 1,
+    }
+
+
+def test_repair_does_not_hide_unexpected_errors(monkeypatch):
+    llm = FakePlannerLLM("not json", repair=ConnectionError("down"))
+    with pytest.raises(ConnectionError):
+        plan_with(monkeypatch, llm)
+
+
+def test_early_dispatch_is_cancelled_when_planning_fails(monkeypatch):
+    tasks = BackgroundTasks(max_workers=1)
+    release = threading.Event()
+    tasks._executor.submit(release.wait, 5)
+    ran = []
+    monkeypatch.setattr(nodes, "background_tasks", tasks)
+    monkeypatch.setattr(nodes, "PLANNER_EARLY_DISPATCH", True)
+    monkeypatch.setattr(nodes, "_EARLY_DISPATCH_RUNNERS", {"researcher": ran.append})
+
+    # 第一个步骤完整输出后计划才变得无效，修复也失败
+    broken = json.dumps(PLAN)[:-2] + ", oops"
+    llm = FakePlannerLLM(broken, repair="still not json")
+    monkeypatch.setattr(nodes, "get_llm_by_type", lambda llm_type: llm)
+    monkeypatch.setattr(nodes, "STRUCTURED_OUTPUT_LLM_TYPES", [])
+    state = {
+        "messages": [HumanMessage(content="天气怎么样")],
+        "TEAM_MEMBERS": TEAM_MEMBERS,
+    }
+    command = RunnableLambda(nodes.planner_node).invoke(state)
+
+    assert command.goto == "__end__"
+    assert tasks._tasks == {}
+    release.set()
+    tasks._executor.shutdown(wait=True)
+    # 排队中的任务被取消，不会再运行
+    assert ran == []
@@ -0,0 +1,61 @@
+import json
+
+from langchain_core.messages import HumanMessage
+
+from src.graph.compaction import worker_update
+from src.graph.projection import project_worker_input
+
+PLAN = json.dumps(
+    {
+        "thought": "Collect the data, then plot it.",
+        "title": "Plot",
+        "steps": [
+            {"agent_name": "researcher", "title": "Search A", "description": "find A"},
+            {"agent_name": "researcher", "title": "Search B", "description": "find B"},
+            {
+                "agent_name": "coder",
+                "title": "Plot A",
+                "description": "plot A",
+                "depends_on": [0],
+            },
+        ],
+    }
+)
+
+
+def build_state():
+    user = HumanMessage(
+        content=[
+            {"type": "text", "text": "plot A"},
+            {"type": "image_url", "image_url": {"url": "data:image/png;base64,xx"}},
+        ]
+    )
+    state = {
+        "messages": [user, HumanMessage(content=PLAN, name="planner")],
+        "full_plan": PLAN,
+    }
+    for content in ["A" * 3000, "B" * 3000]:
+        update = worker_update("researcher", content)
+        state["messages"] = state["messages"] + update["messages"]
+        state["worker_outputs"] = (
+            state.get("worker_outputs", []) + update["worker_outputs"]
+        )
+    return state
+
+
+def test_worker_gets_only_declared_dependencies():
+    messages = project_worker_input(build_state(), "coder")["messages"]
+    assert len(messages) == 3
+    assert "A" * 3000 in messages[1].content
+    assert all("B" * 100 not in message.content for message in messages[1:])
+    assert messages[2].content.startswith("# Plot A")
+
+
+def test_images_are_dropped_for_workers():
+    user = project_worker_input(build_state(), "coder")["messages"][0]
+    assert user.content == [{"type": "text", "text": "plot A"}]
+
+
+def test_without_open_step_the_state_is_passed_through():
+    state = build_state()
+    assert project_worker_input(state, "browser") is state
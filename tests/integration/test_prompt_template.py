@@ -0,0 +1,59 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from src.config import TEAM_MEMBERS
+from src.prompts.template import apply_prompt_template, get_compiled_prompt
+
+
+def test_templates_are_compiled_once():
+    assert get_compiled_prompt("supervisor") is get_compiled_prompt("supervisor")
+
+
+def test_static_prefix_is_byte_stable():
+    state = {"messages": [HumanMessage(content="hi")], "TEAM_MEMBERS": TEAM_MEMBERS}
+    first = apply_prompt_template("supervisor", state)
+    second = apply_prompt_template("supervisor", state)
+    assert first[0] == second[0]
+    assert "CURRENT_TIME" not in first[0]["content"]
+    assert ", ".join(["'researcher'", "'coder'"]) in first[0]["content"]
+
+
+def test_volatile_values_go_in_the_latest_user_message():
+    state = {"messages": [HumanMessage(content="hi")]}
+    messages = apply_prompt_template("researcher", state)
+    assert messages[1].content.startswith("CURRENT_TIME: ")
+    assert messages[1].content.endswith("\n\nhi")
+    # 状态中的消息不会被修改
+    assert state["messages"][0].content == "hi"
+
+
+def test_system_prompt_is_the_only_system_message():
+    messages = apply_prompt_template(
+        "researcher", {"messages": [HumanMessage(content="hi")]}
+    )
+    roles = [m["role"] if isinstance(m, dict) else m.type for m in messages]
+    assert roles == ["system", "human"]
+
+
+def test_tool_results_stay_last_in_a_react_loop():
+    history = [
+        HumanMessage(content="search it"),
+        AIMessage(
+            content="",
+            tool_calls=[{"name": "search", "args": {"q": "it"}, "id": "call_1"}],
+        ),
+        ToolMessage(content="found", tool_call_id="call_1"),
+    ]
+    messages = apply_prompt_template("researcher", {"messages": history})
+    assert [m.type for m in messages[1:]] == ["human", "ai", "tool"]
+    assert messages[1].content.startswith("CURRENT_TIME: ")
+    assert messages[-1] is history[-1]
+
+
+def test_worker_outputs_are_not_treated_as_user_messages():
+    history = [
+        HumanMessage(content="plan it"),
+        HumanMessage(content="done", name="researcher"),
+    ]
+    messages = apply_prompt_template("researcher", {"messages": history})
+    assert messages[1].content.startswith("CURRENT_TIME: ")
+    assert messages[2].content == "done"
@@ -0,0 +1,41 @@
+import httpx
+
+from src.graph.retry import RetryPolicy, route_signature, run_worker
+
+
+def fail(error):
+    def run():
+        raise error
+
+    return run
+
+
+def test_success_envelope():
+    content, result = run_worker("researcher", lambda: "找到的错误信息已汇总")
+    assert content == "找到的错误信息已汇总"
+    assert result["status"] == "success" and result["error_class"] is None
+
+
+def test_transient_errors_are_retryable():
+    _, result = run_worker("researcher", fail(httpx.ConnectTimeout("timed out")))
+    assert result["status"] == "error"
+    assert result["error_class"] == "ConnectTimeout" and result["retryable"]
+
+
+def test_permanent_errors_escalate():
+    content, result = run_worker("coder", fail(ValueError("bad input")))
+    assert "bad input" in content
+    assert not result["retryable"]
+    assert not RetryPolicy(max_retries=2).should_retry(result, 0)
+
+
+def test_backoff_is_capped_and_bounded():
+    policy = RetryPolicy(max_retries=5, base_delay=1.0, max_delay=4.0)
+    for attempt in range(6):
+        assert 0 <= policy.backoff(attempt) <= min(4.0, 2**attempt)
+
+
+def test_route_signature_changes_with_output():
+    first = route_signature("researcher", {"content": "a"})
+    assert first == route_signature("researcher", {"content": "a"})
+    assert first != route_signature("researcher", {"content": "b"})
@@ -0,0 +1,123 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessageChunk, HumanMessage
+
+import src.graph.nodes as nodes
+import src.graph.speculation as speculation
+from src.config import TEAM_MEMBERS
+from src.graph.background import background_tasks
+from src.metrics import metrics
+
+
+def test_queued_speculation_is_cancelled_instead_of_awaited(monkeypatch):
+    monkeypatch.setattr(speculation, "_executor", ThreadPoolExecutor(max_workers=1))
+    release = threading.Event()
+    ran = []
+
+    busy = speculation.start_speculation(lambda state, spec: release.wait(5), None)
+    queued = speculation.start_speculation(
+        lambda state, spec: ran.append(state), "queued"
+    )
+
+    # 提前派发不受投机任务占满线程的影响
+    assert background_tasks._executor.submit(lambda: "step").result(timeout=5) == "step"
+
+    not_started = metrics.get("speculative_planning_not_started")
+    assert speculation.commit_speculation(queued, timeout=5) is None
+    assert metrics.get("speculative_planning_not_started") == not_started + 1
+
+    release.set()
+    assert speculation.commit_speculation(busy, timeout=5) is True
+    speculation._executor.shutdown(wait=True)
+    assert ran == []
+
+
+def counters():
+    return {
+        name: metrics.get(name)
+        for name in ("speculative_planning_hits", "speculative_planning_wasted_tokens")
+    }
+
+
+def deltas(before):
+    return {name: value - before[name] for name, value in counters().items()}
+
+
+def speculate(tokens, result, started=None, release=None):
+    def run(state, spec):
+        spec.add_tokens(tokens)
+        if started is not None:
+            started.set()
+            release.wait(5)
+        return result
+
+    return speculation.start_speculation(run, None)
+
+
+def wait_until_finished(key):
+    # 刚提交、还在排队的任务在提交时会被取消，先等它运行完
+    speculation._speculations[key][1].result(timeout=5)
+
+
+def test_committed_result_is_a_hit_and_nothing_is_wasted():
+    before = counters()
+    key = speculate(7, "plan")
+    wait_until_finished(key)
+    assert speculation.commit_speculation(key, timeout=5) == "plan"
+    assert deltas(before) == {
+        "speculative_planning_hits": 1,
+        "speculative_planning_wasted_tokens": 0,
+    }
+
+
+def test_discarded_runs_count_their_tokens_as_waste():
+    # 已经结束的投机任务被丢弃
+    before = counters()
+    key = speculate(7, "plan")
+    wait_until_finished(key)
+    speculation.cancel_speculation(key)
+    assert deltas(before) == {
+        "speculative_planning_hits": 0,
+        "speculative_planning_wasted_tokens": 7,
+    }
+
+    # 运行中被丢弃，结束时才计入
+    started, release = threading.Event(), threading.Event()
+    key = speculate(5, "plan", started, release)
+    future = speculation._speculations[key][1]
+    assert started.wait(5)
+    speculation.cancel_speculation(key)
+    release.set()
+    future.result(timeout=5)
+    assert deltas(before)["speculative_planning_wasted_tokens"] == 12
+
+    # 没有得到结果时由调用方重新执行，同样算浪费
+    key = speculate(3, None)
+    wait_until_finished(key)
+    assert speculation.commit_speculation(key, timeout=5) is None
+    assert deltas(before) == {
+        "speculative_planning_hits": 0,
+        "speculative_planning_wasted_tokens": 15,
+    }
+
+
+def test_prompt_tokens_are_counted(monkeypatch):
+    class FakePlannerLLM:
+        def bind(self, **kwargs):
+            return self
+
+        def stream(self, messages):
+            yield AIMessageChunk(content="{")
+
+    monkeypatch.setattr(nodes, "get_llm_by_type", lambda llm_type: FakePlannerLLM())
+    monkeypatch.setattr(nodes, "count_messages_tokens", lambda messages, model: 100)
+    monkeypatch.setattr(nodes, "count_text_tokens", lambda text, model: 1)
+    monkeypatch.setattr(nodes, "repair_plan", lambda *args: None)
+    spec = speculation.Speculation()
+    state = {
+        "messages": [HumanMessage(content="天气怎么样")],
+        "TEAM_MEMBERS": TEAM_MEMBERS,
+    }
+    assert nodes.generate_plan(state, speculation=spec) is None
+    assert spec.tokens == 101
@@ -0,0 +1,43 @@
+from langchain_core.messages import HumanMessage, ToolMessage
+
+from src.agents.token_budget import (
+    approximate_tokens,
+    context_limit,
+    count_messages_tokens,
+    fit_messages,
+)
+
+
+def test_approximation_counts_cjk_per_character():
+    assert approximate_tokens("你好世界") == 4
+    assert approximate_tokens("abcdefgh") == 2
+
+
+def test_context_limit_uses_longest_prefix():
+    assert context_limit("qwen-vl-max") == 32000
+    assert context_limit("qwen-plus") == 128000
+    assert context_limit("unknown-model") == 32000
+
+
+def test_small_prompts_are_untouched():
+    messages = [
+        {"role": "system", "content": "You are a researcher."},
+        HumanMessage(content="hi"),
+    ]
+    trimmed, usage = fit_messages("researcher", messages)
+    assert trimmed == messages
+    assert not usage.trimmed
+
+
+def test_oversized_tool_outputs_are_truncated_first():
+    tool = ToolMessage(content="word " * 200000, tool_call_id="1")
+    messages = [
+        {"role": "system", "content": "prompt"},
+        HumanMessage(content="query"),
+        tool,
+    ]
+    trimmed, usage = fit_messages("researcher", messages)
+    assert usage.trimmed and usage.prompt_tokens <= usage.budget
+    assert trimmed[1].content == "query"
+    assert tool.content == "word " * 200000
+    assert count_messages_tokens(trimmed, usage.model) == usage.prompt_tokens
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.daily_tools_mcp.tools import cache
+from src.daily_tools_mcp.tools.base_tool import BaseTool
+from src.daily_tools_mcp.tools.cache import ToolCache
+
+
+class CountingTool(BaseTool):
+    cache_ttl = 60
+    cache_key_fields = ["city"]
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def get_name(self):
+        return "counting"
+
+    def get_description(self):
+        return "Counts executions"
+
+    def get_input_schema(self):
+        return {"type": "object", "properties": {"city": {"type": "string"}}}
+
+    async def execute(self, arguments):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return (
+            f"error: {arguments['city']}"
+            if arguments["city"] == "fail"
+            else f"ok: {arguments['city']}"
+        )
+
+    def should_cache(self, result):
+        return result.startswith("ok")
+
+
+@pytest.fixture
+def tool(monkeypatch):
+    monkeypatch.setattr(cache, "_tool_cache", ToolCache(max_entries=8, db_path=""))
+    return CountingTool()
+
+
+def test_repeated_and_concurrent_calls_execute_once(tool):
+    async def run():
+        await asyncio.gather(
+            *(tool.run({"city": "Beijing", "request_id": i}) for i in range(5))
+        )
+        return await tool.run({"city": " beijing "})
+
+    assert asyncio.run(run()) == "ok: Beijing"
+    assert tool.calls == 1
+    assert cache.get_tool_cache().stats["counting"] == {
+        "hits": 1,
+        "misses": 1,
+        "deduplicated": 4,
+        "stores": 1,
+    }
+
+
+def test_failed_results_are_not_cached(tool):
+    asyncio.run(tool.run({"city": "fail"}))
+    asyncio.run(tool.run({"city": "fail"}))
+    assert tool.calls == 2
+
+
+def test_sqlite_spill_survives_a_new_cache(tmp_path):
+    db_path = str(tmp_path / "tool_cache.db")
+    ToolCache(db_path=db_path).set("counting:key", "ok: Beijing", 60)
+    assert ToolCache(db_path=db_path).get("counting:key") == "ok: Beijing"
+    ToolCache(db_path=db_path).set("counting:old", "ok: Shanghai", -1)
+    assert ToolCache(db_path=db_path).get("counting:old") is None
+
+
+def test_sqlite_io_runs_off_the_event_loop(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "tool_cache.db")
+    ToolCache(db_path=db_path).set("counting:spilled", "ok: Beijing", 60)
+    tool_cache = ToolCache(db_path=db_path)
+    threads = []
+    for name in ("_load", "_store"):
+        original = getattr(tool_cache, name)
+
+        def record(*args, _original=original):
+            threads.append(threading.current_thread())
+            return _original(*args)
+
+        monkeypatch.setattr(tool_cache, name, record)
+
+    async def run():
+        spilled = await tool_cache.get_or_run(
+            "counting", "counting:spilled", 60, None, lambda result: True
+        )
+        fresh = await tool_cache.get_or_run(
+            "counting", "counting:fresh", 60, lambda: asyncio.sleep(0, "ok"), bool
+        )
+        return spilled, fresh
+
+    assert asyncio.run(run()) == ("ok: Beijing", "ok")
+    assert len(threads) == 3 and threading.main_thread() not in threads
+    assert ToolCache(db_path=db_path).get("counting:fresh") == "ok"
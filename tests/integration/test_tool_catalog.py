@@ -0,0 +1,27 @@
+from src.daily_tools_mcp.registry import create_default_registry
+from src.tools import mcp_tools
+from src.tools.mcp_tools import MCPTools, catalog_hash
+
+
+def test_catalog_hash_tracks_schema_changes():
+    tools = create_default_registry().list_tools()
+    assert catalog_hash(tools) == catalog_hash(create_default_registry().list_tools())
+    tools[0]["input_schema"]["properties"]["extra"] = {"type": "string"}
+    assert catalog_hash(tools) != catalog_hash(create_default_registry().list_tools())
+
+
+def test_catalog_cache_warm_start(tmp_path, monkeypatch):
+    monkeypatch.setattr(mcp_tools, "MCP_CATALOG_CACHE", str(tmp_path / "catalog.json"))
+    cold = MCPTools()
+    assert not cold.load_cached_catalog()
+    assert cold._set_catalog(create_default_registry().list_tools())
+
+    warm = MCPTools()
+    assert warm.load_cached_catalog()
+    assert warm.catalog_hash == cold.catalog_hash
+    assert [tool["name"] for tool in warm.available_tools] == [
+        "logistics_tracking",
+        "logistics_tracking_batch",
+        "weather_query",
+    ]
+    assert not warm.is_initialized
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import sys
+
+import src.config as config
+from src.daily_tools_mcp.discovery import PLUGIN_PACKAGE, discover_tools
+
+PLUGIN = """
+from src.daily_tools_mcp.tools.base_tool import BaseTool
+
+
+class EchoTool(BaseTool):
+    def get_name(self):
+        return "echo"
+
+    def get_description(self):
+        return "Echoes the text back"
+
+    def get_input_schema(self):
+        return {"type": "object", "properties": {"text": {"type": "string"}}}
+
+    async def execute(self, arguments):
+        return arguments["text"]
+"""
+
+
+def test_plugins_are_listed_from_manifest_and_imported_on_first_call(tmp_path):
+    plugin_dir = tmp_path / "plugins"
+    plugin_dir.mkdir()
+    (plugin_dir / "echo_tool.py").write_text(PLUGIN)
+    manifest = str(tmp_path / "manifest.json")
+    module = f"{PLUGIN_PACKAGE}.echo_tool"
+
+    # 第一次发现需要导入模块读取元数据，并写入清单
+    cold = {
+        tool.name: tool
+        for tool in discover_tools(
+            [str(plugin_dir)], manifest, include_entry_points=False
+        )
+    }
+    assert {"echo", "logistics_tracking", "weather_query"} <= set(cold)
+    assert cold["echo"].loaded and os.path.exists(manifest)
+
+    # 清单有效时只从清单注册，第一次调用时才导入
+    sys.modules.pop(module, None)
+    warm = {
+        tool.name: tool
+        for tool in discover_tools(
+            [str(plugin_dir)], manifest, include_entry_points=False
+        )
+    }
+    assert not any(tool.loaded for tool in warm.values())
+    assert module not in sys.modules
+    assert warm["echo"].get_input_schema() == cold["echo"].get_input_schema()
+    assert asyncio.run(warm["echo"].run({"text": "hi"})) == "hi"
+    assert warm["echo"].loaded and module in sys.modules
+
+    # 文件变化后清单失效，重新读取元数据
+    (plugin_dir / "echo_tool.py").write_text(
+        PLUGIN.replace("Echoes the text back", "Repeats the text")
+    )
+    sys.modules.pop(module, None)
+    changed = {
+        tool.name: tool
+        for tool in discover_tools(
+            [str(plugin_dir)], manifest, include_entry_points=False
+        )
+    }
+    assert changed["echo"].get_description() == "Repeats the text"
+    sys.modules.pop(module, None)
+
+
+def test_manifest_is_rebuilt_when_the_environment_changes(tmp_path, monkeypatch):
+    plugin_dir = tmp_path / "plugins"
+    plugin_dir.mkdir()
+    (plugin_dir / "echo_tool.py").write_text(PLUGIN)
+    manifest = str(tmp_path / "manifest.json")
+    module = f"{PLUGIN_PACKAGE}.echo_tool"
+
+    discover_tools([str(plugin_dir)], manifest, include_entry_points=False)
+    sys.modules.pop(module, None)
+
+    # 工具文件没变，但配置变了：清单整体失效，重新导入读取元数据
+    monkeypatch.setattr(
+        config, "KUAIDI100_MAX_CONCURRENCY", config.KUAIDI100_MAX_CONCURRENCY + 1
+    )
+    rebuilt = {
+        tool.name: tool
+        for tool in discover_tools(
+            [str(plugin_dir)], manifest, include_entry_points=False
+        )
+    }
+    assert rebuilt["echo"].loaded
+    sys.modules.pop(module, None)
+
+    warm = {
+        tool.name: tool
+        for tool in discover_tools(
+            [str(plugin_dir)], manifest, include_entry_points=False
+        )
+    }
+    assert not warm["echo"].loaded
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from src.daily_tools_mcp.registry import create_default_registry
+from src.daily_tools_mcp.tools import weather_tool
+from src.daily_tools_mcp.tools.adcode_index import LearnedAdcodes
+from src.daily_tools_mcp.tools.weather_tool import WeatherTool
+from src.tools.langchain_wrappers import MCPToolWrapper
+
+DELAY = 0.3
+
+
+class StubAmapHandler(BaseHTTPRequestHandler):
+    failures = 0
+    geocode_calls = 0
+
+    def do_GET(self):
+        if self.path.startswith("/v3/geocode/geo"):
+            StubAmapHandler.geocode_calls += 1
+            self.reply(
+                {
+                    "status": "1",
+                    "geocodes": [
+                        {"adcode": "110108", "formatted_address": "北京市海淀区中关村"}
+                    ],
+                }
+            )
+            return
+        if StubAmapHandler.failures:
+            StubAmapHandler.failures -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        time.sleep(DELAY)
+        self.reply(
+            {
+                "status": "1",
+                "lives": [{"city": "北京市", "weather": "晴", "temperature": "20"}],
+            }
+        )
+
+    def reply(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def weather(monkeypatch, stub_server):
+    monkeypatch.setattr(weather_tool, "AMAP_API_KEY", "test-key")
+    tool = WeatherTool()
+    tool.base_url = stub_server(StubAmapHandler)
+    # 测的是 HTTP 并发，关闭结果缓存以免相同调用被合并
+    tool.cache_ttl = 0
+    return tool
+
+
+def test_parallel_calls_take_about_one_latency(weather):
+    async def run():
+        # 先预热客户端、连接和城市索引，只计并发调用的时间
+        await weather.run({"city": "110000"})
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(weather.run({"city": "110000"}) for _ in range(8))
+        )
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(run())
+    assert all("北京市" in result for result in results)
+    assert elapsed < DELAY * 3
+
+
+def test_geocode_only_on_index_miss(weather, tmp_path, monkeypatch):
+    learned = LearnedAdcodes(str(tmp_path / "adcodes.json"))
+    monkeypatch.setattr(weather_tool, "get_learned_adcodes", lambda: learned)
+    StubAmapHandler.geocode_calls = 0
+    asyncio.run(weather.run({"city": "北京市朝阳区"}))
+    assert StubAmapHandler.geocode_calls == 0
+    # 索引中没有的地名只调用一次地理编码，之后使用写回的结果
+    asyncio.run(weather.run({"city": "中关村"}))
+    asyncio.run(weather.run({"city": "中关村"}))
+    assert StubAmapHandler.geocode_calls == 1
+
+
+def test_transient_errors_are_retried(weather):
+    StubAmapHandler.failures = 1
+    assert "北京市" in asyncio.run(weather.run({"city": "110000"}))
+
+
+def test_output_modes(weather):
+    compact = json.loads(
+        asyncio.run(weather.run({"city": "110000", "_output_mode": "compact"}))
+    )
+    assert compact["city"] == "北京市" and compact["temp"] == "20"
+
+    both = asyncio.run(weather.run({"city": "110000", "_output_mode": "both"}))
+    content, display = MCPToolWrapper._split_output(both)
+    assert json.loads(content) == compact
+    assert display.startswith("📍 北京市 实时天气")
+    # 错误提示在各输出形式下都是纯文本，没有展示文本
+    assert (
+        MCPToolWrapper._split_output(
+            asyncio.run(weather.run({"city": "", "_output_mode": "both"}))
+        )[1]
+        is None
+    )
+
+
+def test_output_mode_is_only_sent_to_tools_that_support_it():
+    info = create_default_registry().list_tools()[0]
+    daily = MCPToolWrapper(
+        name=info["name"],
+        description=info["description"],
+        tool_name=info["name"],
+        output_modes=info["output_modes"],
+    )
+    assert daily._extract_args(city="北京") == {"city": "北京", "_output_mode": "both"}
+
+    external = MCPToolWrapper(name="fetch", description="", tool_name="fetch")
+    assert external._extract_args(url="https://example.com") == {
+        "url": "https://example.com"
+    }
+
+
+def test_wrappers_import_in_a_fresh_interpreter():
+    # 单独运行本文件时 src.tools 最先被导入，不能依赖其他测试先导入 src.agents
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    result = subprocess.run(
+        [sys.executable, "-c", "import src.tools.langchain_wrappers"],
+        cwd=root,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,40 @@
+import asyncio
+
+from src.daily_tools_mcp.registry import ToolRegistry, create_default_registry
+from src.daily_tools_mcp.tools.base_tool import BaseTool
+
+
+class BrokenTool(BaseTool):
+    def get_name(self):
+        return "broken"
+
+    def get_description(self):
+        return "Always fails"
+
+    def get_input_schema(self):
+        return {"type": "object", "properties": {}}
+
+    async def execute(self, arguments):
+        raise ValueError("upstream down")
+
+
+def test_default_registry_lists_bundled_tools():
+    tools = create_default_registry().list_tools()
+    assert [tool["name"] for tool in tools] == [
+        "logistics_tracking",
+        "logistics_tracking_batch",
+        "weather_query",
+    ]
+    assert all(tool["input_schema"]["type"] == "object" for tool in tools)
+
+
+def test_errors_are_returned_as_text():
+    registry = ToolRegistry()
+    registry.register(BrokenTool())
+    assert asyncio.run(registry.call("missing", {})).startswith(
+        "Error: Tool 'missing' not found"
+    )
+    assert (
+        asyncio.run(registry.call("broken", {}))
+        == "Error: Error executing tool broken: upstream down"
+    )
@@ -0,0 +1,84 @@
+import asyncio
+
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.graph import StateGraph
+from langgraph.types import Command
+
+import src.graph.nodes as nodes
+import src.service.workflow_service as workflow_service
+from src.graph.types import State
+
+
+def planner_stub(state: State) -> Command:
+    return Command(
+        goto="__end__", update={"messages": [AIMessage(content="plan", name="planner")]}
+    )
+
+
+def run(messages):
+    async def collect():
+        return [event async for event in workflow_service.run_agent_workflow(messages)]
+
+    return asyncio.run(collect())
+
+
+def use_tiny_graph(monkeypatch):
+    builder = StateGraph(State)
+    builder.set_entry_point("coordinator")
+    builder.add_node("coordinator", nodes.coordinator_node)
+    builder.add_node("planner", planner_stub)
+    monkeypatch.setattr(workflow_service, "graph", builder.compile())
+
+
+def use_coordinator_reply(monkeypatch, reply):
+    llm = GenericFakeChatModel(messages=iter([AIMessage(content=reply)]))
+    monkeypatch.setattr(nodes, "get_llm_by_type", lambda llm_type: llm)
+    monkeypatch.setattr(nodes, "COORDINATOR_FAST_PATH", False)
+    monkeypatch.setattr(nodes, "SPECULATIVE_PLANNING", False)
+
+
+def coordinator_events(events):
+    return [
+        (event["event"], event["data"].get("delta", {}).get("content"))
+        for event in events
+        if event["event"] in ("start_of_llm", "end_of_llm", "message")
+        and event["data"].get("agent_name", "coordinator") == "coordinator"
+    ]
+
+
+def test_fast_path_handoff_ends_the_workflow(monkeypatch):
+    use_tiny_graph(monkeypatch)
+    monkeypatch.setattr(nodes, "COORDINATOR_FAST_PATH", True)
+
+    events = run([{"role": "user", "content": "帮我查询一下北京明天的天气"}])
+
+    names = [event["event"] for event in events]
+    assert "start_of_workflow" in names
+    assert names[-1] == "end_of_workflow"
+    assert events[-1]["data"]["messages"][-1]["content"] == "plan"
+
+
+def test_llm_handoff_closes_the_coordinator_llm_events(monkeypatch):
+    use_tiny_graph(monkeypatch)
+    use_coordinator_reply(monkeypatch, "handoff_to_planner() and some trailing words")
+
+    events = run([{"role": "user", "content": "look into this for me"}])
+
+    assert coordinator_events(events) == [("start_of_llm", None), ("end_of_llm", None)]
+    assert events[-1]["event"] == "end_of_workflow"
+
+
+def test_direct_answer_is_forwarded_once_before_end_of_llm(monkeypatch):
+    use_tiny_graph(monkeypatch)
+    use_coordinator_reply(monkeypatch, "handoff is not needed here")
+
+    events = run([{"role": "user", "content": "hi"}])
+
+    sequence = coordinator_events(events)
+    assert sequence[0] == ("start_of_llm", None)
+    assert sequence[-1] == ("end_of_llm", None)
+    assert [name for name, _ in sequence].count("end_of_llm") == 1
+    text = "".join(content for name, content in sequence if name == "message")
+    assert text == "handoff is not needed here"
+    assert events[-1]["event"] != "end_of_workflow"
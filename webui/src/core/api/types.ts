@@ -39,7 +39,7 @@ export interface ToolCallEvent
 export interface ToolCallResultEvent
   extends GenericChatEvent<
     "tool_call_result",
-    { tool_call_id: string; tool_result: string }
+    { tool_call_id: string; tool_result: string; tool_display?: string }
   > {}
 
 export interface StartOfLLMEvent
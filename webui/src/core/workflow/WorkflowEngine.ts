@@ -105,7 +105,8 @@ export class WorkflowEngine {
           );
           if (toolCallTask) {
             toolCallTask.state = "success";
-            toolCallTask.payload.output = event.data.tool_result;
+            toolCallTask.payload.output =
+              event.data.tool_display ?? event.data.tool_result;
             pendingToolCallTasks = pendingToolCallTasks.filter(
               (task) => task.id !== event.data.tool_call_id,
             );